@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for feet-inches dimension parsing (iguide/dimensions.py).
+
+Times parse_inches per string, the to_inches batch, and find_inches over
+OCR-style room labels, against the old per-call regex helper that
+group_ocr_with_dimensions.py used before.
+
+Usage:
+  python3 bench/bench_dimensions.py [--n 100000] [--repeat 5] [--seed 0]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide.dimensions import find_inches, parse_inches, to_inches
+
+
+def legacy_feet_inches(text):
+    match = re.search(r"(\d+)[^\d]+(\d+)?", text)
+    if not match:
+        return None
+    feet = int(match.group(1))
+    inches = int(match.group(2)) if match.group(2) else 0
+    return feet + inches / 12.0
+
+
+def make_cells(n, rng):
+    forms = [
+        lambda f, i: f"{f}' {i}\"",
+        lambda f, i: f"{f}'{i}",
+        lambda f, i: f"{f}-{i}",
+        lambda f, i: f"{f}°{i}”",
+        lambda f, i: f"{f} ft {i} in",
+        lambda f, i: f"{(f * 12 + i) * 0.0254:.2f}m",
+        lambda f, i: f"{f + i / 12:.2f}",
+    ]
+    return [rng.choice(forms)(rng.randint(4, 30), rng.randint(0, 11)) for _ in range(n)]
+
+
+def make_labels(n, rng):
+    names = ["BEDROOM", "KITCHEN", "LIVING", "3PC BATH", "GARAGE", "PRIMARY"]
+    return [
+        f"{rng.choice(names)} {rng.randint(4, 30)}'{rng.randint(0, 11)}\" x "
+        f"{rng.randint(4, 30)}'{rng.randint(0, 11)}\" {rng.randint(20, 400)} sq ft"
+        for _ in range(n)
+    ]
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dimension parsing micro-benchmark.")
+    parser.add_argument("--n", type=int, default=100_000, help="Strings per run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cells = make_cells(args.n, rng)
+    labels = make_labels(args.n, rng)
+
+    cases = {
+        "legacy extract_feet_inches": lambda: [legacy_feet_inches(c) for c in cells],
+        "parse_inches (per cell)": lambda: [parse_inches(c) for c in cells],
+        "to_inches (batch)": lambda: to_inches(cells),
+        "find_inches (OCR labels)": lambda: [find_inches(t, ocr=True) for t in labels],
+    }
+    parsed = sum(v is not None for v in to_inches(cells))
+    print(f"📏 {args.n} strings, {parsed} parsed by to_inches, median of {args.repeat}")
+    for name, fn in cases.items():
+        secs = timed(fn, args.repeat)
+        print(f"  {name:<28} {secs * 1000:8.1f} ms  {secs / args.n * 1e6:6.2f} µs/string")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Synthetic claim-job generator for benchmarks.
+
+Usage:
+  python3 bench/make_job.py bench/jobs/bench-large --rooms 200 --photos 50 \
+      --pages 120 --csv-rows 20000
+
+Writes a job folder shaped like data/<job_id>/:
+
+  iguide/<n>.XML             iGUIDE sketch with N SKETCHROOMs (walls, openings)
+  photo_0001.png ...         M damage photos
+  policy.pdf                 K-page policy with the usual coverage phrases
+  rooms.csv                  large room table (Room Name, Width/Length/Area)
+  job_metadata.json, policy_summary.json
+
+Everything is derived from --seed, so the same arguments always produce
+the same bytes. Only the standard library is used.
+"""
+
+import argparse
+import csv
+import json
+import random
+import struct
+import sys
+import textwrap
+import zlib
+from pathlib import Path
+
+ROOM_NAMES = [
+    "Living Room",
+    "Kitchen",
+    "Bedroom",
+    "Primary Bedroom",
+    "Bathroom",
+    "Hallway",
+    "Dining Room",
+    "Laundry",
+    "Closet",
+    "Office",
+    "Family Room",
+    "Foyer",
+]
+
+POLICY_PHRASES = [
+    "Coverage D provides additional living expense while the dwelling is uninhabitable.",
+    "Ordinance or law coverage applies to increased costs of construction.",
+    "The mold limit for fungi, wet or dry rot, or bacteria is $10,000.",
+    "We do not cover loss caused by flood, surface water or overflow of a body of water.",
+    "Earth movement including earthquake is excluded.",
+    "Wear and tear, marring and deterioration are not covered.",
+    "Neglect of an insured to use all reasonable means to save property is excluded.",
+]
+
+FILLER = (
+    "The insured must give prompt notice of loss and protect the property from "
+    "further damage. Payment will be made within sixty days after proof of loss "
+    "is received and the amount of loss is agreed to in writing."
+)
+
+# iGUIDE sketch units are 0.2 mm (see iguide/geometry.py)
+UNITS_PER_MM = 5
+WALL_THICKNESS = 508.0
+FLOOR_ELEVATION = 152400.0
+
+
+# --- iGUIDE XML ---
+def make_iguide_xml(n_rooms: int, rng: random.Random) -> str:
+    """
+    Rectangular rooms laid out on a grid, in the SKETCHDOCUMENT layout the
+    iGUIDE exports use: level vertices, rooms and walls under SKETCHLEVEL,
+    then one COORDINATE3 list (vertices first, then opening corners).
+    """
+    next_id = [3]
+
+    def new_id():
+        next_id[0] += 1
+        return next_id[0]
+
+    cols = max(1, int(n_rooms**0.5))
+    coords = []
+    vertices = []  # (id, coord index, [wall ids])
+    rooms = []  # (id, name, ceiling mm, [wall ids])
+    walls = []  # (id, room id, (v1, v2), [(opening id, coord indexes, type)])
+    openings = []  # (wall id, corner coords, type)
+
+    for i in range(n_rooms):
+        w = rng.randint(2500, 7000) * UNITS_PER_MM
+        l = rng.randint(2500, 7000) * UNITS_PER_MM
+        x0 = (i % cols) * 8000.0 * UNITS_PER_MM
+        y0 = -(i // cols) * 8000.0 * UNITS_PER_MM
+        corners = [(x0, y0), (x0 + w, y0), (x0 + w, y0 - l), (x0, y0 - l)]
+        room_id = new_id()
+        vids = []
+        for x, y in corners:
+            vids.append(len(vertices))
+            vertices.append([new_id(), len(coords), []])
+            coords.append((x, y, FLOOR_ELEVATION))
+        wall_ids = []
+        for k in range(4):
+            a, b = vids[k], vids[(k + 1) % 4]
+            wall_id = new_id()
+            wall_ids.append(wall_id)
+            vertices[a][2].append(wall_id)
+            vertices[b][2].append(wall_id)
+            wall = (wall_id, room_id, (vertices[a][0], vertices[b][0]), [])
+            walls.append(wall)
+            # A door on the first wall, the odd window elsewhere
+            if k == 0 or rng.random() < 0.3:
+                kind = "2" if k == 0 else "0"
+                (ax, ay), (bx, by) = corners[k], corners[(k + 1) % 4]
+                width = (810.0 if kind == "2" else 1200.0) * UNITS_PER_MM
+                z0, z1 = (0.0, 2032.0) if kind == "2" else (900.0, 2100.0)
+                z0, z1 = z0 * UNITS_PER_MM, z1 * UNITS_PER_MM
+                length = max(abs(bx - ax), abs(by - ay))
+                t0 = 0.5 - width / (2 * length)
+                t1 = 0.5 + width / (2 * length)
+                p0 = (ax + (bx - ax) * t0, ay + (by - ay) * t0)
+                p1 = (ax + (bx - ax) * t1, ay + (by - ay) * t1)
+                openings.append((wall, (p0, p1, z0, z1), kind))
+        name = ROOM_NAMES[i % len(ROOM_NAMES)]
+        if i >= len(ROOM_NAMES):
+            name += f" {i // len(ROOM_NAMES) + 1}"
+        ceiling = rng.choice([2438, 2743, 3048]) * UNITS_PER_MM
+        rooms.append((room_id, name, ceiling, wall_ids))
+
+    for wall, (p0, p1, z0, z1), kind in openings:
+        start = len(coords)
+        for (x, y), z in ((p0, z0), (p1, z0), (p1, z1), (p0, z1)):
+            coords.append((x, y, FLOOR_ELEVATION + z))
+        wall[3].append((new_id(), range(start, start + 4), kind))
+
+    lines = [
+        "<FIF>",
+        "  <SKETCH_FILES>",
+        '    <SKETCHDOCUMENT id="SKT1" minorVersion="27">',
+        f'      <SKETCHLEVEL id="SKT2" floorElevation="{FLOOR_ELEVATION}">',
+    ]
+    for vid, idx, wids in vertices:
+        wall_ids = " ".join(map(str, wids))
+        lines.append(
+            f'        <SKETCHLEVELVERTEX id="SKT{vid}" vertex="{idx}" wallIDs="{wall_ids}" />'
+        )
+    for room_id, name, ceiling, wids in rooms:
+        wall_ids = " ".join(map(str, wids))
+        lines += [
+            f'        <SKETCHROOM id="SKT{room_id}" wallIDs="{wall_ids}" ceilingHeight="{ceiling}">',
+            f'          <SKETCHLABEL id="SKT{new_id()}" flags="3">',
+            f"            <SKETCHCDATACHILD>{name}</SKETCHCDATACHILD>",
+            "          </SKETCHLABEL>",
+            "        </SKETCHROOM>",
+        ]
+    for wall_id, room_id, (v1, v2), wall_openings in walls:
+        lines.append(
+            f'        <SKETCHWALL id="SKT{wall_id}" roomIDs="{room_id}" '
+            f'vertexIDs="{v1} {v2}" thickness="{WALL_THICKNESS}">'
+        )
+        for op_id, idx, kind in wall_openings:
+            door = ' doorType="0"' if kind == "2" else ""
+            coord_index = " ".join(map(str, idx))
+            lines.append(
+                f'          <SKETCHWALLOPENING id="SKT{op_id}" coordIndex="{coord_index}" '
+                f'flags="552" type="{kind}"{door} />'
+            )
+        lines.append("        </SKETCHWALL>")
+    lines.append("      </SKETCHLEVEL>")
+    flat = " ".join(f"{v:.1f}" for xyz in coords for v in xyz)
+    lines += [f"      <COORDINATE3>{flat}</COORDINATE3>", "    </SKETCHDOCUMENT>"]
+    lines += ["  </SKETCH_FILES>", "</FIF>", ""]
+    return "\n".join(lines)
+
+
+# --- photos ---
+def make_png(width: int, height: int, rng: random.Random) -> bytes:
+    """A noisy RGB PNG: blotchy enough that decoders and detectors do real work."""
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    base = rng.randrange(256)
+    noise = rng.randbytes(width * 3)
+    raw = bytearray()
+    for y in range(height):
+        shade = base + (y * 255) // max(1, height - 1)
+        shift = (y * 7) % len(noise)
+        table = bytes((b + shade) & 0xFF for b in range(256))
+        raw += b"\x00" + (noise[shift:] + noise[:shift]).translate(table)
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(bytes(raw), 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+# --- policy PDF ---
+def _pdf_text(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_policy_pdf(n_pages: int, rng: random.Random) -> bytes:
+    """Plain-text PDF with uncompressed content streams (extractable by PyPDF2)."""
+    # Spread the coverage phrases across the document
+    placed = {}
+    for phrase in POLICY_PHRASES:
+        placed.setdefault(rng.randrange(n_pages), []).append(phrase)
+
+    objects = []  # object bodies, numbered from 1
+    font_num = 3
+    page_nums = []
+    for p in range(n_pages):
+        text = [f"HOMEOWNERS POLICY - PAGE {p + 1}"]
+        text += placed.get(p, [])
+        text += [FILLER] * 30
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        for line in text:
+            for chunk in textwrap.wrap(line, 100):
+                ops.append(f"({_pdf_text(chunk)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_num = 4 + 2 * p
+        page_num = content_num + 1
+        objects.append(
+            (content_num, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        )
+        objects.append(
+            (
+                page_num,
+                (
+                    f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 {font_num} 0 R >> >> "
+                    f"/Contents {content_num} 0 R >>"
+                ).encode(),
+            )
+        )
+        page_nums.append(page_num)
+
+    kids = " ".join(f"{n} 0 R" for n in page_nums)
+    objects = [
+        (1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        (2, f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode()),
+        (font_num, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"),
+    ] + objects
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num, body in objects:
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    total = len(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % total
+    for num in range(1, total):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (total, xref)
+    return bytes(out)
+
+
+# --- tables ---
+def write_rooms_csv(path: Path, n_rows: int, rng: random.Random) -> None:
+    with path.open("w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Room Name", "Width (ft)", "Length (ft)", "Area (ft²)"])
+        for i in range(n_rows):
+            width = rng.randint(6, 24)
+            length = rng.randint(6, 24)
+            name = f"{ROOM_NAMES[i % len(ROOM_NAMES)].upper()} {i + 1}"
+            w.writerow([name, width, length, width * length])
+
+
+def make_job(
+    dest, rooms=20, photos=5, pages=10, csv_rows=0, photo_size=(640, 480), seed=0
+) -> Path:
+    """Create (or overwrite) a synthetic job folder at dest and return it."""
+    dest = Path(dest)
+    rng = random.Random(seed)
+    (dest / "iguide").mkdir(parents=True, exist_ok=True)
+
+    for old in dest.glob("photo_*.png"):
+        old.unlink()
+
+    xml = make_iguide_xml(rooms, rng)
+    (dest / "iguide" / f"{3900000000 + seed}.XML").write_text(xml, encoding="utf-8")
+
+    for i in range(photos):
+        (dest / f"photo_{i + 1:04d}.png").write_bytes(make_png(*photo_size, rng))
+
+    if pages:
+        (dest / "policy.pdf").write_bytes(make_policy_pdf(pages, rng))
+
+    rooms_csv = dest / "rooms.csv"
+    if csv_rows:
+        write_rooms_csv(rooms_csv, csv_rows, rng)
+    elif rooms_csv.exists():
+        rooms_csv.unlink()
+
+    meta = {
+        "job_id": dest.name,
+        "cause_of_loss": "flood",
+        "water_height_in": rng.choice([2, 6, 18]),
+        "pre_mitigation_photos": True,
+    }
+    (dest / "job_metadata.json").write_text(json.dumps(meta, indent=2))
+    policy = {"ALE": True, "MoldLimit": 10000, "exclusions": ["earthquake"]}
+    (dest / "policy_summary.json").write_text(json.dumps(policy, indent=2))
+    return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic claim job.")
+    parser.add_argument("dest", help="Job folder to create (its name is the job id)")
+    parser.add_argument("--rooms", type=int, default=20, help="SKETCHROOMs in the XML")
+    parser.add_argument("--photos", type=int, default=5, help="Damage photos")
+    parser.add_argument("--pages", type=int, default=10, help="Policy PDF pages")
+    parser.add_argument("--csv-rows", type=int, default=0, help="Rows in rooms.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dest = make_job(
+        args.dest,
+        rooms=args.rooms,
+        photos=args.photos,
+        pages=args.pages,
+        csv_rows=args.csv_rows,
+        seed=args.seed,
+    )
+    print(f"✅ Synthetic job written to: {dest}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""
+Pipeline benchmarks on synthetic jobs.
+
+Usage:
+  python3 bench/run_bench.py                       # small + medium, 5 repeats
+  python3 bench/run_bench.py --sizes large --repeat 3 --scripts
+  python3 bench/run_bench.py --rooms 300 --photos 40 --pages 80 --csv-rows 50000
+  python3 bench/run_bench.py --compare bench/results/bench_1755000000.json
+
+For each job size a synthetic job is generated under bench/jobs/ (see
+make_job.py) and the in-process pipeline runs --repeat times with the
+stage cache off ("cold") and on ("warm"). Per-stage latency comes from the
+runner's metrics (mytools/metrics.py); throughput is rows out per second.
+With --scripts the standalone heavy steps (policy PDF parsing, photo
+detection) are timed too, when their dependencies are installed.
+
+Results go to bench/results/bench_<ts>.json. With --compare, stages whose
+median got slower than the baseline by more than --threshold are listed
+and the exit code is 1.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import run_pipeline
+from bench.make_job import make_job
+from mytools.job_context import JobContext
+from mytools.logger_helper import get_job_metrics
+
+BENCH = ROOT / "bench"
+JOBS_DIR = BENCH / "jobs"
+OUT_DIR = BENCH / "out"
+RESULTS_DIR = BENCH / "results"
+
+PRESETS = {
+    "small": dict(rooms=10, photos=3, pages=5, csv_rows=0),
+    "medium": dict(rooms=100, photos=20, pages=50, csv_rows=2000),
+    "large": dict(rooms=500, photos=100, pages=200, csv_rows=20000),
+}
+
+# Standalone scripts timed with --scripts: (name, script, required module)
+SCRIPTS = [
+    ("parse_policy", ROOT / "policy" / "parse_policy.py", "PyPDF2"),
+    ("process_images", ROOT / "detect" / "process_images.py", "ultralytics"),
+]
+
+# Ignore slowdowns smaller than this; they are timer noise
+NOISE_FLOOR_SECONDS = 0.001
+
+
+def _stats(values):
+    values = sorted(values)
+    return {
+        "min": round(values[0], 6),
+        "median": round(statistics.median(values), 6),
+        "max": round(values[-1], 6),
+    }
+
+
+def prepare_job(name, params, seed=0):
+    job_dir = make_job(JOBS_DIR / f"bench-{name}", seed=seed, **params)
+    ctx = JobContext(job_dir.name, out_dir=OUT_DIR / job_dir.name, job_dir=job_dir)
+    # A large room table enters the pipeline the way manual dims/OCR do
+    merged = ctx.room_data_merged_csv
+    rooms_csv = job_dir / "rooms.csv"
+    if rooms_csv.exists():
+        shutil.copyfile(rooms_csv, merged)
+    elif merged.exists():
+        merged.unlink()
+    return ctx
+
+
+def time_pipeline(ctx, repeat, use_cache):
+    """Run the in-process pipeline `repeat` times; return per-stage and total timings."""
+    metrics = get_job_metrics(ctx.job_id)
+    totals = []
+    stages = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            ok = run_pipeline.run_in_process(ctx, use_cache=use_cache)
+        totals.append(time.perf_counter() - start)
+        if not ok:
+            raise RuntimeError(f"pipeline failed for {ctx.job_id}")
+        for rec in metrics.records:
+            stages.setdefault(rec["name"], []).append(rec)
+
+    report = {"end_to_end_seconds": _stats(totals), "stages": {}}
+    for name, recs in stages.items():
+        wall = _stats([r["wall_seconds"] for r in recs])
+        rows_out = recs[-1]["rows_out"] or 0
+        report["stages"][name] = {
+            "seconds": wall,
+            "cpu_seconds": _stats([r["cpu_seconds"] for r in recs]),
+            "rows_in": recs[-1]["rows_in"],
+            "rows_out": rows_out,
+            "rows_per_second": (
+                round(rows_out / wall["median"], 1) if wall["median"] else None
+            ),
+            "rss_bytes": max(r["rss_bytes"] or 0 for r in recs),
+            "peak_rss_growth_bytes": max(r["peak_rss_growth_bytes"] or 0 for r in recs),
+        }
+    return report
+
+
+def time_scripts(ctx, repeat):
+    report = {}
+    for name, script, module in SCRIPTS:
+        if importlib.util.find_spec(module) is None:
+            report[name] = {"skipped": f"{module} not installed"}
+            continue
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, str(script), str(ctx.input_dirs[0])],
+                cwd=str(ROOT),
+                capture_output=True,
+                text=True,
+            )
+            times.append(time.perf_counter() - start)
+            if proc.returncode != 0:
+                report[name] = {"failed": proc.stderr.strip()[-500:]}
+                break
+        else:
+            report[name] = {"seconds": _stats(times)}
+    return report
+
+
+def compare(current, baseline, threshold):
+    """List stages (and end-to-end runs) whose median slowed down past threshold."""
+    regressions = []
+    for size, res in current["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if not base or base.get("params") != res["params"]:
+            continue
+        for mode in ("cold", "warm"):
+            pairs = [("end_to_end", res[mode]["end_to_end_seconds"], base[mode]["end_to_end_seconds"])]
+            for stage, s in res[mode]["stages"].items():
+                b = base[mode]["stages"].get(stage)
+                if b:
+                    pairs.append((stage, s["seconds"], b["seconds"]))
+            for name, now, then in pairs:
+                new, old = now["median"], then["median"]
+                if new - old > NOISE_FLOOR_SECONDS and new > old * (1 + threshold):
+                    regressions.append(
+                        {
+                            "size": size,
+                            "mode": mode,
+                            "name": name,
+                            "baseline": old,
+                            "current": new,
+                            "change": round(new / old - 1, 3) if old else None,
+                        }
+                    )
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=str(ROOT),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic jobs.")
+    parser.add_argument(
+        "--sizes", nargs="+", choices=sorted(PRESETS), default=["small", "medium"]
+    )
+    parser.add_argument("--rooms", type=int, help="Custom size: SKETCHROOMs")
+    parser.add_argument("--photos", type=int, default=0, help="Custom size: photos")
+    parser.add_argument("--pages", type=int, default=0, help="Custom size: policy pages")
+    parser.add_argument("--csv-rows", type=int, default=0, help="Custom size: room rows")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scripts", action="store_true", help="Also time standalone scripts")
+    parser.add_argument("--compare", help="Baseline results JSON to check against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+    parser.add_argument("--out", help="Results file (default: bench/results/bench_<ts>.json)")
+    args = parser.parse_args()
+
+    sizes = {name: PRESETS[name] for name in args.sizes}
+    if args.rooms is not None:
+        sizes = {
+            "custom": dict(
+                rooms=args.rooms,
+                photos=args.photos,
+                pages=args.pages,
+                csv_rows=args.csv_rows,
+            )
+        }
+    repeat = max(1, args.repeat)
+
+    results = {
+        "created": time.time(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for name, params in sizes.items():
+        print(f"🧪 {name}: {params}")
+        ctx = prepare_job(name, params, seed=args.seed)
+        res = {"params": params}
+        res["cold"] = time_pipeline(ctx, repeat, use_cache=False)
+        res["warm"] = time_pipeline(ctx, repeat, use_cache=True)
+        if args.scripts:
+            res["scripts"] = time_scripts(ctx, repeat)
+        results["sizes"][name] = res
+
+        for mode in ("cold", "warm"):
+            total = res[mode]["end_to_end_seconds"]["median"]
+            print(f"   {mode:<4} end-to-end {total * 1000:9.2f} ms")
+        for stage, s in res["cold"]["stages"].items():
+            rate = s["rows_per_second"]
+            print(
+                f"   {stage:<26} {s['seconds']['median'] * 1000:9.2f} ms"
+                f"  {s['rows_out']:>7} rows  {rate or 0:>12,.0f} rows/s"
+            )
+        for script, s in res.get("scripts", {}).items():
+            if "seconds" in s:
+                print(f"   {script:<26} {s['seconds']['median'] * 1000:9.2f} ms")
+            else:
+                print(f"   {script:<26} {s.get('skipped') or 'failed'}")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench_{int(time.time())}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"📄 Results saved to: {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if not regressions:
+            print(f"✅ No regressions vs {args.compare}")
+            return 0
+        print(f"❌ {len(regressions)} regression(s) vs {args.compare}:")
+        for r in regressions:
+            print(
+                f"   {r['size']}/{r['mode']} {r['name']}: "
+                f"{r['baseline'] * 1000:.2f} ms → {r['current'] * 1000:.2f} ms "
+                f"(+{r['change']:.0%})"
+            )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Content-addressed cache of photo detections, shared by every job.
+
+Adjusters re-upload the same photos across revisions (the upload handlers
+just suffix _1, _2 onto duplicate names), so detections are stored by what
+the photo is rather than what it's called:
+
+  (image SHA-256, weights SHA-256, confidence threshold) -> boxes
+
+in cache/detections.sqlite3. File hashes are remembered by path, size and
+mtime, so a photo that hasn't changed isn't re-read to look it up.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+DB_PATH = BASE / "cache" / "detections.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detections (
+    image_sha   TEXT NOT NULL,
+    weights_sha TEXT NOT NULL,
+    conf        REAL NOT NULL,
+    boxes       TEXT NOT NULL,
+    created     REAL NOT NULL,
+    PRIMARY KEY (image_sha, weights_sha, conf)
+);
+"""
+
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def digest(conn: sqlite3.Connection, path) -> str:
+    """SHA-256 of a file, reusing the stored one while size/mtime match."""
+    path = Path(path).resolve()
+    st = path.stat()
+    row = conn.execute(
+        "SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (str(path),)
+    ).fetchone()
+    if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+        return row[2]
+    sha = file_sha256(path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, sha),
+        )
+    return sha
+
+
+def weights_digest(conn: sqlite3.Connection, weights) -> str:
+    """Hash of the weights file, or of its name if it hasn't been downloaded yet."""
+    path = Path(weights)
+    if path.is_file():
+        return digest(conn, path)
+    return "name:" + hashlib.sha256(str(weights).encode("utf-8")).hexdigest()
+
+
+def lookup(conn: sqlite3.Connection, image_shas, weights_sha: str, conf: float) -> dict:
+    """{image_sha: boxes} for the hashes already detected with these weights/conf."""
+    found = {}
+    shas = list(dict.fromkeys(image_shas))
+    for i in range(0, len(shas), 500):
+        chunk = shas[i : i + 500]
+        marks = ",".join("?" * len(chunk))
+        for sha, boxes in conn.execute(
+            f"SELECT image_sha, boxes FROM detections WHERE weights_sha = ? AND conf = ? "
+            f"AND image_sha IN ({marks})",
+            (weights_sha, float(conf), *chunk),
+        ):
+            found[sha] = json.loads(boxes)
+    return found
+
+
+def store(conn: sqlite3.Connection, image_sha: str, weights_sha: str, conf: float, boxes) -> None:
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO detections (image_sha, weights_sha, conf, boxes, created) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (image_sha, weights_sha, float(conf), json.dumps(boxes), time.time()),
+        )
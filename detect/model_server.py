@@ -0,0 +1,365 @@
+"""
+Long-lived YOLO detection service with a warm model.
+
+Loading and warming up the weights is a large share of detection time for
+small claims, so instead of every process_images.py run (and the photo
+labeler) constructing its own YOLO model, one service keeps it loaded:
+
+  python3 -m detect.model_server [--weights yolov8n.pt] [--batch 16] [--wait-ms 20]
+
+It speaks HTTP over a Unix socket (queue/detect.sock, or
+CLAIM_AI_DETECT_SOCKET):
+
+  POST /predict  {"paths": [...], "conf": 0.25}  -> {"results": [{"path", "boxes", "error"}]}
+  GET  /health                                   -> weights, batches and images served
+
+Requests from concurrent jobs are queued and the model thread merges
+whatever arrives within --wait-ms into batches of up to --batch images.
+Clients call predict(paths); ensure_server() starts the service in the
+background if it isn't running, the same way job_queue.ensure_workers does.
+The running service holds an flock on queue/detect.lock, and starting one
+is serialized on queue/detect.spawn.lock (see mytools/service_lock.py).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from mytools import service_lock
+
+RUN_DIR = BASE / "queue"
+SOCKET_PATH = Path(os.environ.get("CLAIM_AI_DETECT_SOCKET", RUN_DIR / "detect.sock"))
+PID_FILE = RUN_DIR / "detect.pid"
+LOCK_FILE = RUN_DIR / "detect.lock"
+SPAWN_LOCK = RUN_DIR / "detect.spawn.lock"
+LOG_ROOT = BASE / "logs"
+
+WEIGHTS = "yolov8n.pt"  # Using a small pre-trained YOLOv8 model
+BATCH_SIZE = 16
+BATCH_WAIT_SECONDS = 0.02
+START_TIMEOUT_SECONDS = 60
+RETRY_SECONDS = 300  # after a failed start, don't spawn again for this long
+
+# time.monotonic() before which ensure_server() won't try another start
+_retry_after = 0.0
+
+
+def load_model(weights=WEIGHTS):
+    from ultralytics import YOLO
+
+    return YOLO(weights)
+
+
+def boxes_of(result):
+    """Detection rows (label, confidence, x1, y1, x2, y2) from one YOLO result."""
+    rows = []
+    for box in result.boxes:
+        cls = int(box.cls[0])
+        x1, y1, x2, y2 = box.xyxy[0]
+        rows.append(
+            {
+                "label": result.names[cls],
+                "confidence": float(box.conf[0]),
+                "x1": int(x1),
+                "y1": int(y1),
+                "x2": int(x2),
+                "y2": int(y2),
+            }
+        )
+    return rows
+
+
+def decode(path):
+    import cv2
+
+    return cv2.imread(str(path))
+
+
+class Batcher:
+    """Single model thread serving queued requests in merged batches."""
+
+    def __init__(self, model, batch_size=BATCH_SIZE, wait=BATCH_WAIT_SECONDS):
+        self.model = model
+        self.batch_size = batch_size
+        self.wait = wait
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.images = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, images, conf=None):
+        """Box lists for images, once the model thread has got to them."""
+        item = {"images": images, "conf": conf, "done": threading.Event()}
+        self.requests.put(item)
+        item["done"].wait()
+        if "error" in item:
+            raise RuntimeError(item["error"])
+        return item["results"]
+
+    def _collect(self):
+        pending = [self.requests.get()]
+        n = len(pending[0]["images"])
+        deadline = time.monotonic() + self.wait
+        while n < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            pending.append(item)
+            n += len(item["images"])
+        return pending
+
+    def _predict(self, images, conf):
+        kwargs = {"verbose": False}
+        if conf is not None:
+            kwargs["conf"] = conf
+        out = []
+        for i in range(0, len(images), self.batch_size):
+            chunk = images[i : i + self.batch_size]
+            out.extend(boxes_of(r) for r in self.model.predict(chunk, **kwargs))
+            self.batches += 1
+            self.images += len(chunk)
+        return out
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            # predict() takes one threshold, so merge requests per conf
+            by_conf = {}
+            for item in pending:
+                by_conf.setdefault(item["conf"], []).append(item)
+            for conf, items in by_conf.items():
+                try:
+                    results = self._predict([im for it in items for im in it["images"]], conf)
+                except Exception as e:
+                    for it in items:
+                        it["error"] = f"{type(e).__name__}: {e}"
+                        it["done"].set()
+                    continue
+                start = 0
+                for it in items:
+                    it["results"] = results[start : start + len(it["images"])]
+                    start += len(it["images"])
+                    it["done"].set()
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    address_family = socket.AF_UNIX
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "claim-ai-detect/1"
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._reply(404, {"error": "not found"})
+        b = self.server.batcher
+        self._reply(
+            200,
+            {
+                "ok": True,
+                "pid": os.getpid(),
+                "weights": self.server.weights,
+                "batches": b.batches,
+                "images": b.images,
+            },
+        )
+
+    def do_POST(self):
+        if self.path != "/predict":
+            return self._reply(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            paths = [str(p) for p in req.get("paths", [])]
+            conf = req.get("conf")
+        except (ValueError, TypeError) as e:
+            return self._reply(400, {"error": f"bad request: {e}"})
+
+        # Decode here, in the request's thread, so the model thread only predicts
+        results = [{"path": p, "boxes": [], "error": None} for p in paths]
+        images, slots = [], []
+        for i, p in enumerate(paths):
+            img = self.server.decode(p)
+            if img is None:
+                results[i]["error"] = "could not read image"
+            else:
+                images.append(img)
+                slots.append(i)
+        try:
+            boxes = self.server.batcher.submit(images, conf) if images else []
+        except RuntimeError as e:
+            return self._reply(500, {"error": str(e)})
+        for i, b in zip(slots, boxes):
+            results[i]["boxes"] = b
+        self._reply(200, {"results": results})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(weights=WEIGHTS, batch_size=BATCH_SIZE, wait=BATCH_WAIT_SECONDS,
+          socket_path=SOCKET_PATH, model=None, decoder=decode):
+    socket_path = Path(socket_path)
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if not service_lock.hold(LOCK_FILE):
+        print(f"⚠️ Detection service already running ({LOCK_FILE.relative_to(BASE)} is locked)")
+        return
+    PID_FILE.write_text(str(os.getpid()))
+    try:
+        socket_path.unlink()
+    except FileNotFoundError:
+        pass
+
+    started = time.perf_counter()
+    model = model or load_model(weights)
+    server = UnixHTTPServer(str(socket_path), Handler)
+    server.batcher = Batcher(model, batch_size, wait)
+    server.weights = str(weights)
+    server.decode = decoder
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(
+        f"🚀 Detection service ready in {time.perf_counter() - started:.1f}s "
+        f"on {socket_path} (batch {batch_size}, wait {wait * 1000:.0f} ms)"
+    )
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        try:
+            socket_path.unlink()
+            if PID_FILE.read_text().strip() == str(os.getpid()):
+                PID_FILE.unlink()
+        except OSError:
+            pass
+
+
+# --- client ---
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = str(path)
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def _request(method, url, payload=None, socket_path=SOCKET_PATH, timeout=300):
+    conn = _UnixConnection(socket_path, timeout)
+    try:
+        body = json.dumps(payload) if payload is not None else None
+        conn.request(method, url, body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        data = json.loads(resp.read() or b"{}")
+    finally:
+        conn.close()
+    if resp.status != 200:
+        raise RuntimeError(data.get("error") or f"detection service returned {resp.status}")
+    return data
+
+
+def health(socket_path=SOCKET_PATH):
+    """The service's /health reply, or None if it isn't answering."""
+    try:
+        return _request("GET", "/health", socket_path=socket_path, timeout=2)
+    except (OSError, RuntimeError, ValueError):
+        return None
+
+
+def predict(paths, conf=None, socket_path=SOCKET_PATH):
+    """[{"path", "boxes", "error"}] for each image path, from the running service."""
+    payload = {"paths": [str(Path(p).resolve()) for p in paths], "conf": conf}
+    return _request("POST", "/predict", payload, socket_path=socket_path)["results"]
+
+
+def ensure_server(weights=WEIGHTS, timeout=START_TIMEOUT_SECONDS) -> bool:
+    """Start the service in the background unless it's answering; True once it is.
+
+    A service that dies on startup (no ultralytics, missing weights) isn't
+    spawned again for RETRY_SECONDS; callers get False right away instead.
+    """
+    global _retry_after
+    if health():
+        return True
+    if time.monotonic() < _retry_after:
+        return False
+    proc = None
+    # Check and spawn under one lock so concurrent callers start one service
+    with service_lock.spawning(SPAWN_LOCK):
+        if not service_lock.is_held(LOCK_FILE):  # else: still loading the model
+            LOG_ROOT.mkdir(parents=True, exist_ok=True)
+            with open(LOG_ROOT / "detect_server.log", "ab") as log:
+                proc = subprocess.Popen(
+                    [sys.executable, "-m", "detect.model_server", "--weights", str(weights)],
+                    cwd=str(BASE),
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+            if not service_lock.wait_held(LOCK_FILE, proc, timeout):
+                if proc.poll() is not None:  # died on startup; see logs/detect_server.log
+                    _retry_after = time.monotonic() + RETRY_SECONDS
+                return False
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if health():
+            return True
+        if proc is not None and proc.poll() is not None:
+            _retry_after = time.monotonic() + RETRY_SECONDS
+            return False  # died on startup; see logs/detect_server.log
+        time.sleep(0.2)
+    return False  # still loading; the next call waits on the same service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve YOLO detections from a warm model.")
+    parser.add_argument("--weights", default=WEIGHTS)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Max images per model call")
+    parser.add_argument("--wait-ms", type=float, default=BATCH_WAIT_SECONDS * 1000,
+                        help="How long to gather concurrent requests into a batch")
+    parser.add_argument("--socket", default=str(SOCKET_PATH))
+    args = parser.parse_args()
+    serve(args.weights, max(1, args.batch), args.wait_ms / 1000, args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Photo-level peril classifier for the damage labeler.
+
+A small CPU-only model trained from data/labels.csv:
+
+  embed()   colour (HSV histogram, 4x4 region stats), layout (8x8
+            thumbnail) and texture (edge and local-binary-pattern
+            histograms) features of a photo, ~560 floats
+  Head      softmax regression over those features, class-balanced
+
+Embeddings are cached by photo SHA-256, so retraining after new labels
+only embeds the new photos. PredictionService precomputes predictions for
+the whole inbox on a background thread (retraining first whenever
+labels.csv has changed) and keeps them in memory and on disk, so the
+labeler's pages only look them up.
+
+  python3 -m detect.photo_classifier --train      # train and report accuracy
+  python3 -m detect.photo_classifier --predict    # refresh the inbox predictions
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parents[1]
+DATA = BASE / "data"
+INBOX = DATA / "label_inbox"
+LABELED_DIRS = (DATA / "label_done", DATA / "label_skip", INBOX)
+LABELS_CSV = DATA / "labels.csv"
+CACHE_DIR = BASE / "cache" / "photo_classifier"
+
+# Labels that say nothing about the peril
+IGNORED_LABELS = {"", "unknown", "other"}
+MIN_EXAMPLES = 3
+THUMB = 160
+GRID = 4
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+# Bump when embed() changes so cached embeddings are recomputed
+EMBED_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+_NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+
+def embed(path) -> np.ndarray:
+    """Colour, layout and texture features of one photo."""
+    from PIL import Image
+
+    with Image.open(path) as im:
+        im = im.convert("RGB")
+        im.thumbnail((THUMB, THUMB))
+        hsv = np.asarray(im.convert("HSV"), dtype=np.float32) / 255.0
+        gray = np.asarray(im.convert("L"), dtype=np.float32) / 255.0
+        layout = np.asarray(im.convert("L").resize((8, 8)), dtype=np.float32) / 255.0
+
+    h, s, v = (hsv[..., i].ravel() for i in range(3))
+    color, _ = np.histogramdd(
+        np.stack([h, s, v], axis=1), bins=(8, 4, 4), range=((0, 1),) * 3
+    )
+    color = color.ravel() / max(h.size, 1)
+
+    # Mean and spread of H, S, V in a 4x4 grid of regions
+    rows, cols = gray.shape
+    grid = []
+    for i in range(GRID):
+        for j in range(GRID):
+            block = hsv[
+                i * rows // GRID : (i + 1) * rows // GRID,
+                j * cols // GRID : (j + 1) * cols // GRID,
+            ].reshape(-1, 3)
+            grid.extend(block.mean(axis=0))
+            grid.extend(block.std(axis=0))
+
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    edges, _ = np.histogram(np.hypot(gx, gy), bins=16, range=(0, 1))
+    edges = edges / max(gx.size, 1)
+
+    # Local binary patterns: which of the 8 neighbours are at least as bright
+    center = gray[1:-1, 1:-1]
+    code = np.zeros(center.shape, dtype=np.int32)
+    for bit, (dy, dx) in enumerate(_NEIGHBOURS):
+        neighbour = gray[1 + dy : rows - 1 + dy, 1 + dx : cols - 1 + dx]
+        code |= (neighbour >= center).astype(np.int32) << bit
+    lbp = np.bincount(code.ravel(), minlength=256) / max(code.size, 1)
+
+    stats = np.array([h.mean(), s.mean(), v.mean(), s.std(), v.std(), gray.std()])
+    return np.concatenate(
+        [color, layout.ravel(), np.asarray(grid), edges, lbp, stats]
+    ).astype(np.float32)
+
+
+class EmbeddingStore:
+    """Embeddings by photo SHA-256, plus path/size/mtime -> SHA so photos aren't rehashed."""
+
+    def __init__(self, path: Path = CACHE_DIR / "embeddings.pickle"):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != EMBED_VERSION:
+                raise ValueError("stale embeddings")
+            self.vectors, self.hashes = data["vectors"], data["hashes"]
+        except Exception:
+            self.vectors, self.hashes = {}, {}
+        self.dirty = False
+
+    def sha(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path.resolve())
+        seen = self.hashes.get(key)
+        if seen and seen[0] == st.st_size and seen[1] == st.st_mtime_ns:
+            return seen[2]
+        sha = file_sha256(path)
+        with self.lock:
+            self.hashes[key] = (st.st_size, st.st_mtime_ns, sha)
+            self.dirty = True
+        return sha
+
+    def get(self, path: Path):
+        sha = self.sha(path)
+        vec = self.vectors.get(sha)
+        if vec is None:
+            vec = embed(path)
+            with self.lock:
+                self.vectors[sha] = vec
+                self.dirty = True
+        return sha, vec
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with self.lock:
+            data = {"version": EMBED_VERSION, "vectors": self.vectors, "hashes": self.hashes}
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.dirty = False
+        os.replace(tmp, self.path)
+
+
+class Head:
+    """Class-balanced softmax regression on standardized embeddings."""
+
+    def __init__(self, classes, w, b, mean, std):
+        self.classes, self.w, self.b, self.mean, self.std = classes, w, b, mean, std
+
+    @classmethod
+    def fit(cls, x, y, classes, epochs=200, lr=0.1, l2=0.1):
+        mean, std = x.mean(axis=0), x.std(axis=0) + 1e-6
+        xs = (x - mean) / std
+        n, k = len(y), len(classes)
+        onehot = np.eye(k, dtype=np.float32)[y]
+        counts = np.bincount(y, minlength=k).astype(np.float32)
+        weight = (n / (k * np.maximum(counts, 1)))[y][:, None]
+        w = np.zeros((xs.shape[1], k), dtype=np.float32)
+        b = np.zeros(k, dtype=np.float32)
+        for _ in range(epochs):
+            p = _softmax(xs @ w + b)
+            g = (p - onehot) * weight / n
+            w -= lr * (xs.T @ g + l2 * w)
+            b -= lr * g.sum(axis=0)
+        return cls(list(classes), w, b, mean, std)
+
+    def proba(self, x):
+        return _softmax(((np.atleast_2d(x) - self.mean) / self.std) @ self.w + self.b)
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def labeled_photos(csv_path: Path = LABELS_CSV, dirs=LABELED_DIRS):
+    """(path, label) for labeled photos still on disk; the latest label wins."""
+    latest = {}
+    if not csv_path.exists():
+        return []
+    with csv_path.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = (row.get("confirmed_label") or "").strip()
+            name = Path(row.get("image_relpath") or "").name
+            if name:
+                latest[name] = label
+    out = []
+    for name, label in latest.items():
+        if label in IGNORED_LABELS:
+            continue
+        path = next((d / name for d in dirs if (d / name).exists()), None)
+        if path:
+            out.append((path, label))
+    return out
+
+
+def train(store: EmbeddingStore, samples):
+    """A Head for labels with at least MIN_EXAMPLES photos, or None if < 2 such labels."""
+    counts = {}
+    for _, label in samples:
+        counts[label] = counts.get(label, 0) + 1
+    classes = sorted(c for c, n in counts.items() if n >= MIN_EXAMPLES)
+    if len(classes) < 2:
+        return None
+    index = {c: i for i, c in enumerate(classes)}
+    xs, ys = [], []
+    for path, label in samples:
+        if label in index:
+            try:
+                xs.append(store.get(path)[1])
+            except Exception as e:
+                print(f"⚠️ Skipping {path.name}: {e}")
+                continue
+            ys.append(index[label])
+    store.save()
+    if len(set(ys)) < 2:
+        return None  # too many unreadable photos left fewer than two classes
+    return Head.fit(np.stack(xs), np.asarray(ys), classes)
+
+
+def _labels_stamp(csv_path: Path) -> str:
+    try:
+        st = csv_path.stat()
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return ""
+
+
+class PredictionService:
+    """Inbox predictions computed in the background; pages only call get()."""
+
+    def __init__(self, inbox: Path = INBOX, labels_csv: Path = LABELS_CSV,
+                 cache_file: Path = CACHE_DIR / "predictions.json"):
+        self.inbox = inbox
+        self.labels_csv = labels_csv
+        self.cache_file = cache_file
+        self.store = EmbeddingStore()
+        self.head = None
+        self.trained_on = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.predictions = {}
+        try:
+            saved = json.loads(cache_file.read_text(encoding="utf-8"))
+            self.predictions = saved.get("predictions", {})
+            self.trained_on = saved.get("labels")
+        except Exception:
+            pass
+        self.thread = None
+
+    def get(self, path: Path):
+        """(label, confidence) for an inbox photo, or ("unknown", 0.0) if not computed yet.
+
+        The first call starts the background worker, so cached predictions
+        are brought up to date with the current inbox and labels.
+        """
+        if self.thread is None:
+            self.refresh_async()
+        try:
+            st = path.stat()
+        except OSError:
+            return "unknown", 0.0
+        hit = self.predictions.get(path.name)
+        if hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns:
+            return hit["label"], hit["conf"]
+        self.refresh_async()
+        return "unknown", 0.0
+
+    def refresh_async(self) -> None:
+        """Wake the background worker (starting it on first use)."""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, daemon=True)
+                self.thread.start()
+        self.wake.set()
+
+    def _loop(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Photo classifier refresh failed: {e}")
+
+    def refresh(self) -> int:
+        """Retrain if labels changed, then predict every inbox photo lacking a prediction."""
+        stamp = _labels_stamp(self.labels_csv)
+        retrained = False
+        if self.head is None or stamp != self.trained_on:
+            self.head = train(self.store, labeled_photos(self.labels_csv))
+            retrained = stamp != self.trained_on
+            self.trained_on = stamp
+        if self.head is None:
+            return 0
+
+        photos = sorted(p for p in self.inbox.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+        fresh = {} if retrained else dict(self.predictions)
+        todo = []
+        for p in photos:
+            st = p.stat()
+            hit = fresh.get(p.name)
+            if not (hit and hit["size"] == st.st_size and hit["mtime_ns"] == st.st_mtime_ns):
+                todo.append((p, st))
+        for p, st in todo:
+            try:
+                _, vec = self.store.get(p)
+            except Exception as e:
+                print(f"⚠️ Can't classify {p.name}: {e}")
+                continue
+            probs = self.head.proba(vec)[0]
+            best = int(probs.argmax())
+            fresh[p.name] = {
+                "label": self.head.classes[best],
+                "conf": round(float(probs[best]), 3),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+        names = {p.name for p in photos}
+        self.predictions = {k: v for k, v in fresh.items() if k in names}
+        self.store.save()
+        self._save()
+        return len(todo)
+
+    def _save(self):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps({"labels": self.trained_on, "predictions": self.predictions}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.cache_file)
+
+
+def evaluate(store: EmbeddingStore, samples, folds=5, seed=0):
+    """k-fold accuracy of the head on the labeled photos."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(samples))
+    hits = total = 0
+    for k in range(folds):
+        test = {int(i) for i in order[k::folds]}
+        head = train(store, [s for i, s in enumerate(samples) if i not in test])
+        if head is None:
+            continue
+        for i in test:
+            path, label = samples[i]
+            if label not in head.classes:
+                continue
+            probs = head.proba(store.get(path)[1])[0]
+            hits += head.classes[int(probs.argmax())] == label
+            total += 1
+    return hits / total if total else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train / run the photo peril classifier.")
+    parser.add_argument("--train", action="store_true", help="Train and cross-validate")
+    parser.add_argument("--predict", action="store_true", help="Refresh inbox predictions")
+    args = parser.parse_args()
+
+    if args.train:
+        store = EmbeddingStore()
+        samples = labeled_photos()
+        print(f"🏷️ {len(samples)} labeled photos")
+        acc = evaluate(store, samples)
+        head = train(store, samples)
+        if head is None:
+            print("❌ Need at least two labels with enough photos")
+            return 1
+        print(f"✅ Classes: {', '.join(head.classes)}")
+        if acc is not None:
+            print(f"📊 5-fold accuracy: {acc:.1%}")
+    if args.predict or not args.train:
+        n = PredictionService().refresh()
+        print(f"✅ Predicted {n} inbox photo(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,48 +1,257 @@
+"""
+Detect damage in a job's photos with YOLO.
+
+OUTPUT: out/<job_id>/<job_id>_detections.csv  (image, room, label, confidence, x1, y1, x2, y2)
+        out/<job_id>/detections/<photo>       annotated copies (skip with --no-annotate)
+
+Photos go to the detection service (detect/model_server.py), which keeps
+YOLO loaded between runs and is started in the background if needed, in
+fixed-size batches. With --local (or if the service can't be started) the
+model is loaded here instead: photos are decoded on a thread pool, one batch
+ahead of the model, and fed to YOLO.predict. Either way each batch's rows
+are appended to the CSV as soon as it finishes, and annotated images are
+rendered on a background thread so they never hold up the next batch.
+
+Photos are every image under each of the job's input folders (data/<job>/,
+uploads/<job>/, an explicit job folder), subfolders included, except the
+floorplan exports in iguide/ and floorplan/. The "image" column is the
+photo's path relative to its input folder.
+
+Photos sorted into a folder per room (data/<job>/photos/Kitchen/IMG_1.jpg,
+or data/<job>/Kitchen/IMG_1.jpg) get that folder's name in the "room"
+column; generate_room_estimates.py only turns detections with a room into
+rules/rules.yaml mapping line items. Loose photos get an empty room, which
+can also be filled in by hand.
+
+Photos already detected with the same weights and --conf, in this job or
+any other, are answered from detect/detection_cache.py without running the
+model; identical photos within a job are only detected once. Rows are
+written in photo order whichever photos came from the cache.
+
+Usage:
+  python3 detect/process_images.py job-0001 [--batch 16] [--conf 0.25] [--workers N]
+                                            [--no-annotate] [--local] [--no-cache]
+"""
+
+import argparse
+import csv
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import cv2
-import pandas as pd
-from ultralytics import YOLO
-
-model = YOLO("yolov8n.pt")  # Using a small pre-trained YOLOv8 model
-
-job_id = "job-0001"
-image_folder = f"data/{job_id}"
-output_folder = f"out/{job_id}_detections"
-os.makedirs(output_folder, exist_ok=True)
-
-results_data = []
-
-for img_file in os.listdir(image_folder):
-    if not img_file.lower().endswith((".jpg", ".jpeg", ".png")):
-        continue
-
-    img_path = os.path.join(image_folder, img_file)
-    results = model(img_path)
-
-    for box in results[0].boxes:
-        cls = int(box.cls[0])
-        label = results[0].names[cls]
-        conf = float(box.conf[0])
-        x1, y1, x2, y2 = box.xyxy[0]
-
-        results_data.append(
-            {
-                "image": img_file,
-                "label": label,
-                "confidence": conf,
-                "x1": int(x1),
-                "y1": int(y1),
-                "x2": int(x2),
-                "y2": int(y2),
-            }
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from detect import detection_cache, model_server
+from mytools.job_context import JobContext
+from mytools.logger_helper import get_job_metrics
+
+BATCH_SIZE = 16
+CONF = 0.25  # ultralytics' default threshold
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+FIELDS_OUT = ["image", "room", "label", "confidence", "x1", "y1", "x2", "y2"]
+
+
+# Input subfolders holding floorplan exports, not damage photos
+PLAN_DIRS = ("iguide", "floorplan")
+# Folders that group photos without naming a room
+PHOTO_DIRS = ("photos", "photo", "images", "pictures", "pics")
+
+
+def list_photos(folder):
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    return sorted(
+        p
+        for p in folder.rglob("*")
+        if p.suffix.lower() in IMAGE_EXTS
+        and p.is_file()
+        and p.relative_to(folder).parts[0].lower() not in PLAN_DIRS
+    )
+
+
+def photo_room(name: str) -> str:
+    """Room a photo was filed under: its innermost folder that isn't a generic photo folder."""
+    for folder in reversed(Path(name).parts[:-1]):
+        if folder.lower() not in PHOTO_DIRS:
+            return folder
+    return ""
+
+
+def job_photos(ctx):
+    """{path: name relative to its input folder} over every input folder, in order."""
+    photos = {}
+    for folder in ctx.input_dirs:
+        for p in list_photos(folder):
+            photos.setdefault(p.resolve(), p.relative_to(folder).as_posix())
+    return photos
+
+
+def decode(path):
+    img = cv2.imread(str(path))
+    if img is None:
+        print(f"⚠️ Could not read image: {path.name}")
+    return img
+
+
+def decoded_batches(paths, size, pool):
+    """(paths, images) per batch; the next batch decodes while the caller works."""
+    chunks = [paths[i : i + size] for i in range(0, len(paths), size)]
+    pending = [pool.submit(decode, p) for p in chunks[0]] if chunks else []
+    for k, chunk in enumerate(chunks):
+        images = [f.result() for f in pending]
+        pending = [pool.submit(decode, p) for p in chunks[k + 1]] if k + 1 < len(chunks) else []
+        ok = [(p, img) for p, img in zip(chunk, images) if img is not None]
+        if ok:
+            yield [p for p, _ in ok], [img for _, img in ok]
+
+
+def detect_local(model, paths, metrics, batch_size=BATCH_SIZE, conf=CONF, workers=None):
+    """Yield (path, boxes) per photo, running an in-process model one batch at a time."""
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch_paths, images in decoded_batches(paths, batch_size, pool):
+            with metrics.measure("model.predict", rows_in=len(images)) as rec:
+                predictions = model.predict(images, conf=conf, verbose=False)
+                results = [model_server.boxes_of(r) for r in predictions]
+                rec["rows_out"] = sum(len(b) for b in results)
+            yield from zip(batch_paths, results)
+
+
+def detect_remote(paths, metrics, batch_size=BATCH_SIZE, conf=CONF):
+    """Yield (path, boxes) per photo from the detection service, one batch per request."""
+    for i in range(0, len(paths), batch_size):
+        batch = paths[i : i + batch_size]
+        with metrics.measure("model_server.predict", rows_in=len(batch)) as rec:
+            results = model_server.predict(batch, conf=conf)
+            rec["rows_out"] = sum(len(r["boxes"]) for r in results)
+        for path, r in zip(batch, results):
+            if r["error"]:
+                print(f"⚠️ Could not read image: {path.name} ({r['error']})")
+                continue
+            yield path, r["boxes"]
+
+
+def run_model(paths, args, metrics):
+    """(path, boxes) for photos that need the model: the service, else in process."""
+    if not paths:
+        return
+    if not args.local and model_server.ensure_server():
+        served = (model_server.health() or {}).get("weights")
+        if served == str(model_server.WEIGHTS):
+            yield from detect_remote(paths, metrics, args.batch, args.conf)
+            return
+        print(f"⚠️ Detection service runs {served}, not {model_server.WEIGHTS}")
+    elif not args.local:
+        print("⚠️ Detection service unavailable; loading the model here")
+    with metrics.measure("YOLO load"):
+        model = model_server.load_model()
+    yield from detect_local(model, paths, metrics, args.batch, args.conf, args.workers)
+
+
+def detect_cached(photos, args, metrics):
+    """(path, boxes) per photo, running the model only on content not seen before."""
+    conn = detection_cache.connect()
+    try:
+        with metrics.measure("detection_cache.lookup", rows_in=len(photos)) as rec:
+            shas = {p: detection_cache.digest(conn, p) for p in photos}
+            weights_sha = detection_cache.weights_digest(conn, ROOT / model_server.WEIGHTS)
+            known = {}
+            if not args.no_cache:
+                known = detection_cache.lookup(conn, shas.values(), weights_sha, args.conf)
+            rec["rows_out"] = sum(s in known for s in shas.values())
+        print(f"♻️ {rec['rows_out']}/{len(photos)} photos already detected")
+
+        # One model run per distinct photo; duplicates reuse its boxes
+        copies = {}
+        for p, sha in shas.items():
+            copies.setdefault(sha, []).append(p)
+        boxes_of = {p: known[sha] for p, sha in shas.items() if sha in known}
+        todo = [paths[0] for sha, paths in copies.items() if sha not in known]
+        results = run_model(todo, args, metrics)
+        # Photo order: a cached photo waits only for earlier photos still at the model
+        for p in photos:
+            while p not in boxes_of:
+                path, boxes = next(results, (None, None))
+                if path is None:
+                    break  # the model couldn't read it; no rows
+                detection_cache.store(conn, shas[path], weights_sha, args.conf, boxes)
+                for q in copies[shas[path]]:
+                    boxes_of[q] = boxes
+            if p in boxes_of:
+                yield p, boxes_of.pop(p)
+    finally:
+        conn.close()
+
+
+def annotate(path, boxes, dest):
+    """Save a copy of the photo with its boxes and labels drawn on."""
+    img = cv2.imread(str(path))
+    if img is None:
+        return
+    for b in boxes:
+        cv2.rectangle(img, (b["x1"], b["y1"]), (b["x2"], b["y2"]), (0, 0, 255), 2)
+        cv2.putText(
+            img,
+            f"{b['label']} {b['confidence']:.2f}",
+            (b["x1"], max(b["y1"] - 6, 12)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (0, 0, 255),
+            2,
         )
+    cv2.imwrite(str(dest), img)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect damage in job photos.")
+    parser.add_argument("job", nargs="?", default="job-0001")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="Photos per model call")
+    parser.add_argument("--workers", type=int, help="Decode threads (default: up to 8)")
+    parser.add_argument("--no-annotate", action="store_true", help="Skip annotated copies")
+    parser.add_argument("--conf", type=float, default=CONF, help="Confidence threshold")
+    parser.add_argument("--local", action="store_true", help="Load the model in this process")
+    parser.add_argument("--no-cache", action="store_true", help="Re-detect every photo")
+    args = parser.parse_args()
+
+    ctx = JobContext.of(args.job)
+    metrics = get_job_metrics(ctx.job_id)
+    output_folder = ctx.detections_dir
+    names = job_photos(ctx)
+    photos = list(names)
+    print(f"📷 {len(photos)} photos in {', '.join(str(d) for d in ctx.input_dirs if d.is_dir())}")
+
+    detections = detect_cached(photos, args, metrics)
+    found = 0
+    renders = []
+    with open(ctx.detections_csv, "w", newline="") as f, ThreadPoolExecutor(
+        max_workers=1
+    ) as renderer:
+        writer = csv.DictWriter(f, fieldnames=FIELDS_OUT)
+        writer.writeheader()
+        for path, boxes in detections:
+            name = names[path]
+            room = photo_room(name)
+            writer.writerows({"image": name, "room": room, **b} for b in boxes)
+            found += len(boxes)
+            if not args.no_annotate:
+                # Save image with bounding boxes
+                dest = output_folder / name
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                renders.append(renderer.submit(annotate, path, boxes, dest))
+            f.flush()
+    for r in renders:
+        if r.exception():
+            print(f"⚠️ Could not save annotated image: {r.exception()}")
 
-    # Save image with bounding boxes
-    results[0].save(filename=os.path.join(output_folder, img_file))
+    metrics.write(ctx.metrics_json)
+    print(f"✅ Detection complete: {found} issues found")
 
-# Save results as CSV
-df = pd.DataFrame(results_data)
-df.to_csv(f"out/{job_id}_detections.csv", index=False)
 
-print(f"✅ Detection complete: {len(results_data)} issues found")
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 import csv
 import sys
+from pathlib import Path
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-input_file = f"out/estimate_xact.csv"
-output_file = f"out/estimate_xact_with_notes.csv"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
 
 
 def get_unit(description):
@@ -30,19 +33,45 @@ def get_unit(description):
         return "EA"  # default if unsure
 
 
-with open(input_file, newline="") as f:
-    rows = list(csv.DictReader(f))
+def justify(rows):
+    out = []
+    for row in rows:
+        row = dict(row)
+        unit = get_unit(row["Description"])
+        row["Quantity/Length"] = f'{row["Quantity/Length"]} {unit}'
+        row["Justification"] = (
+            f"Added based on room dimensions and scope. Unit: {unit}."
+        )
+        out.append(row)
+    return out
+
+
+def run(job, rows=None, write=True):
+    ctx = JobContext.of(job)
+    input_file = ctx.estimate_csv
+    output_file = ctx.estimate_notes_csv
+
+    if rows is None:
+        with open(input_file, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    rows = justify(rows)
+
+    # Save output
+    if write and rows:
+        with open(output_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"✅ Justified estimate saved to: {output_file}")
+    print(f"📦 Rows: {len(rows)}")
+    return rows
+
 
-for row in rows:
-    unit = get_unit(row["Description"])
-    row["Quantity/Length"] = f'{row["Quantity/Length"]} {unit}'
-    row["Justification"] = f"Added based on room dimensions and scope. Unit: {unit}."
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    run(job_id)
 
-# Save output
-with open(output_file, "w", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-    writer.writeheader()
-    writer.writerows(rows)
 
-print(f"✅ Justified estimate saved to: {output_file}")
-print(f"📦 Rows: {len(rows)}")
+if __name__ == "__main__":
+    main()
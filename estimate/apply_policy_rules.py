@@ -2,14 +2,13 @@ import csv
 import json
 import os
 import sys
+from pathlib import Path
 
-print("🔊 apply_policy_rules.py: starting…")
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-MERGED_IN = "out/estimate_xact_merged.csv"
-POLICY_JSON = "data/job-0001/policy_summary.json"
-JOB_JSON = "data/job-0001/job_metadata.json"
-OUT_CSV = "out/estimate_xact_final.csv"
-QA_CSV = "out/estimate_policy_QA.csv"
+from mytools.job_context import JobContext
 
 
 def load_json(path):
@@ -24,17 +23,11 @@ def load_json(path):
             return {}
 
 
-policy = load_json(POLICY_JSON)  # e.g., {"ALE": true, "MoldLimit": 10000}
-job = load_json(JOB_JSON)  # e.g., {"cause_of_loss":"Flood","water_height_in":3}
-
-cause = (job.get("cause_of_loss") or "").strip().lower()
-
-
-def has_ale():
+def has_ale(policy):
     return bool(policy.get("ALE", True))
 
 
-def mold_cap():
+def mold_cap(policy):
     cap = policy.get("MoldLimit")
     try:
         return float(cap) if cap is not None else None
@@ -42,24 +35,25 @@ def mold_cap():
         return None
 
 
-def is_flood():
+def is_flood(job):
+    cause = (job.get("cause_of_loss") or "").strip().lower()
     return "flood" in cause
 
 
-def water_height_in():
+def water_height_in(job):
     try:
         return float(job.get("water_height_in", 0))
     except:
         return 0.0
 
 
-def adjust_for_peril(row):
+def adjust_for_peril(row, job):
     desc = (row.get("Description") or "").lower()
     notes = row.get("Notes", "")
 
-    if is_flood():
+    if is_flood(job):
         if "drywall" in desc and ("remove" in desc or "replace" in desc):
-            h = water_height_in()
+            h = water_height_in(job)
             if h > 0:
                 target_in = max(12.0, min(24.0, h + 12.0))
                 notes += f' | Flood: drywall addressed to ~{int(target_in)}" above waterline.'
@@ -72,15 +66,15 @@ def adjust_for_peril(row):
     return row
 
 
-def covered(row):
+def covered(row, policy):
     code = (row.get("Line Item Code") or "").upper().strip()
-    if code == "ALE" and not has_ale():
+    if code == "ALE" and not has_ale(policy):
         return False, "ALE removed (no ALE coverage)."
     return True, ""
 
 
-def annotate_mold(row):
-    cap = mold_cap()
+def annotate_mold(row, policy):
+    cap = mold_cap(policy)
     if cap is None:
         return row
     desc = (row.get("Description") or "").lower()
@@ -91,45 +85,76 @@ def annotate_mold(row):
     return row
 
 
-if not os.path.exists(MERGED_IN):
-    print(f"❌ Missing merged estimate: {MERGED_IN}")
-    sys.exit(1)
+def apply_rules(rows, policy, job):
+    kept, removed = [], []
+    for r in rows:
+        r = dict(r)
+        r = adjust_for_peril(r, job)
+        r = annotate_mold(r, policy)
+        ok, why = covered(r, policy)
+        if ok:
+            kept.append(r)
+        else:
+            r["_RemovedReason"] = why
+            removed.append(r)
+    return kept, removed
+
+
+def run(job, rows=None, write=True):
+    """Returns the kept rows, or None if there was nothing to apply rules to."""
+    print("🔊 apply_policy_rules.py: starting…")
+    ctx = JobContext.of(job)
+    merged_in = ctx.estimate_merged_csv
+    out_csv = ctx.estimate_final_csv
+    qa_csv = ctx.estimate_qa_csv
+
+    policy = load_json(ctx.policy_summary_json)  # e.g., {"ALE": true, "MoldLimit": 10000}
+    job = load_json(ctx.job_metadata_json)  # e.g., {"cause_of_loss":"Flood","water_height_in":3}
+
+    if rows is None:
+        if not os.path.exists(merged_in):
+            print(f"❌ Missing merged estimate: {merged_in}")
+            return None
+        with open(merged_in, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    if not rows:
+        print("❌ Merged estimate is empty.")
+        return None
 
-with open(MERGED_IN, newline="") as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
+    kept, removed = apply_rules(rows, policy, job)
+
+    if kept:
+        if write:
+            with open(out_csv, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=kept[0].keys())
+                writer.writeheader()
+                writer.writerows(kept)
+            print(f"✅ Final policy-aware estimate: {out_csv} ({len(kept)} lines)")
+        else:
+            print(f"✅ Final policy-aware estimate in memory ({len(kept)} lines)")
+    else:
+        print("⚠️ No lines kept—check rules/policy.")
+
+    if removed:
+        if write:
+            with open(qa_csv, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=removed[0].keys())
+                writer.writeheader()
+                writer.writerows(removed)
+            print(f"🧪 QA (removed lines): {qa_csv} ({len(removed)} lines)")
+        else:
+            print(f"🧪 QA (removed lines): {len(removed)} lines")
+    else:
+        print("✅ No lines removed by policy rules.")
+    return kept
 
-if not rows:
-    print("❌ Merged estimate is empty.")
-    sys.exit(1)
 
-kept, removed = [], []
-for r in rows:
-    r = adjust_for_peril(r)
-    r = annotate_mold(r)
-    ok, why = covered(r)
-    if ok:
-        kept.append(r)
-    else:
-        r["_RemovedReason"] = why
-        removed.append(r)
-
-os.makedirs("out", exist_ok=True)
-
-if kept:
-    with open(OUT_CSV, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=kept[0].keys())
-        writer.writeheader()
-        writer.writerows(kept)
-    print(f"✅ Final policy-aware estimate: {OUT_CSV} ({len(kept)} lines)")
-else:
-    print("⚠️ No lines kept—check rules/policy.")
-
-if removed:
-    with open(QA_CSV, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=removed[0].keys())
-        writer.writeheader()
-        writer.writerows(removed)
-    print(f"🧪 QA (removed lines): {QA_CSV} ({len(removed)} lines)")
-else:
-    print("✅ No lines removed by policy rules.")
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    if run(job_id) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,16 @@
 import csv
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+from rules import rulebook
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+output_path = ctx.out("estimate_engine.csv")
 
 # === Dummy Room Data (stand-in for iGUIDE parsing) ===
 rooms = [
@@ -21,70 +33,22 @@ rooms = [
 ]
 
 
-# === Quantity Calculation Functions ===
-def paint_walls_sf(perimeter_lf, height_ft, openings_sf):
-    return max((perimeter_lf * height_ft) - openings_sf, 0.0)
-
-
-def baseboard_lf(perimeter_lf, door_widths_lf):
-    return max(perimeter_lf - door_widths_lf, 0.0)
-
-
-# === Build Estimate Rows ===
-rows = []
-
-# Paint walls in every room
-for r in rooms:
-    sf = round(paint_walls_sf(r["perimeter_lf"], r["height_ft"], r["openings_sf"]), 1)
-    rows.append(
-        {
-            "Group": r["name"],
-            "Item Code": "PAINT-WALLS",
-            "Qty": sf,
-            "Unit": "sf",
-            "Notes": "Walls paint per room",
-        }
-    )
-
-# Baseboard damage in Living Room only
-lr = rooms[1]  # index 1 = Living Room
-lf = round(baseboard_lf(lr["perimeter_lf"], lr["door_widths_lf"]), 1)
-rows.append(
-    {
-        "Group": "Living Room",
-        "Item Code": "BASEBOARD-RR",
-        "Qty": lf,
-        "Unit": "lf",
-        "Notes": "Detected baseboard damage",
-    }
-)
+# === Detections (stand-in for detect/process_images.py output) ===
+detections = [
+    # Baseboard damage in Living Room only
+    {"name": "Living Room", "label": "baseboard_rot"},
+    # Ceiling water stain in Kitchen (no AI mask yet, so min_if_missing applies)
+    {"name": "Kitchen", "label": "water_stain_ceiling"},
+]
 
-# Ceiling water stain in Kitchen (no AI mask yet, just use fallback minimum)
-rows.append(
-    {
-        "Group": "Kitchen",
-        "Item Code": "DW-PATCH",
-        "Qty": 4,
-        "Unit": "sf",
-        "Notes": "Ceiling water stain – estimated minimum",
-    }
-)
-rows.append(
-    {
-        "Group": "Kitchen",
-        "Item Code": "PRIME-PAINT",
-        "Qty": 4,
-        "Unit": "sf",
-        "Notes": "Prime and paint patched area",
-    }
-)
+# === Build Estimate Rows (formulas and mappings from rules/rules.yaml) ===
+rows = rulebook.load().estimate(rooms, detections)
 
 # === Write CSV Output ===
-with open("out/estimate_xact.csv", "w", newline="") as f:
-    writer = csv.DictWriter(
-        f, fieldnames=["Group", "Item Code", "Qty", "Unit", "Notes"]
-    )
+# Not estimate_xact.csv: that is the pipeline's estimate, in another layout
+with open(output_path, "w", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=rulebook.FIELDS_OUT)
     writer.writeheader()
     writer.writerows(rows)
 
-print("✅ Estimate created: out/estimate_xact.csv")
+print(f"✅ Estimate created: {output_path}")
@@ -2,9 +2,15 @@ import csv
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+
 """
-Read:  out/estimate_xact_final.csv
-Write: out/estimate_xact_import.csv
+Read:  out/<job_id>/estimate_xact_final.csv (or rows passed in by run_pipeline.py)
+Write: out/<job_id>/estimate_xact_import.csv
 
 Output columns must be exactly:
   Line Item Code,Room,Quantity/Length
@@ -53,46 +59,56 @@ def normalize_qty(q: str, unit: str) -> str:
     return f"{s} {unit}"
 
 
-def main():
-    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-    app_root = Path(__file__).resolve().parents[1]
-    out_dir = app_root / "out"
-    src = out_dir / "estimate_xact_final.csv"
-    dst = out_dir / "estimate_xact_import.csv"
-
-    if not src.exists():
-        print(f"❌ Missing input: {src}")
-        # still write an empty header so caller doesn't explode
+def clean_rows(rows):
+    cleaned = []
+    for row in rows:
+        code = (row.get("Line Item Code") or "").strip()
+        room = (row.get("Room") or row.get("Room Name") or "").strip()
+        desc = (row.get("Description") or "").strip()
+        qty = str(row.get("Quantity/Length") or "").strip()
+
+        if not code or not room or not qty:
+            # skip incomplete rows
+            continue
+
+        unit = detect_unit(code, desc)
+        qty_out = normalize_qty(qty, unit)
+
+        cleaned.append(
+            {"Line Item Code": code, "Room": room, "Quantity/Length": qty_out}
+        )
+    return cleaned
+
+
+def run(job, rows=None, write=True):
+    ctx = JobContext.of(job)
+    src = ctx.estimate_final_csv
+    dst = ctx.estimate_import_csv
+
+    if rows is None:
+        if not src.exists():
+            print(f"❌ Missing input: {src}")
+            # still write an empty header so caller doesn't explode
+            with dst.open("w", newline="") as f:
+                csv.DictWriter(f, fieldnames=FIELDNAMES_OUT).writeheader()
+            return []
+        with src.open(newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    cleaned = clean_rows(rows)
+
+    if write:
         with dst.open("w", newline="") as f:
-            csv.DictWriter(f, fieldnames=FIELDNAMES_OUT).writeheader()
-        return
+            w = csv.DictWriter(f, fieldnames=FIELDNAMES_OUT)
+            w.writeheader()
+            w.writerows(cleaned)
+        print(f"✅ Exported for Xactimate: {dst}  (rows: {len(cleaned)})")
+    return cleaned
 
-    cleaned = []
-    with src.open(newline="") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            code = (row.get("Line Item Code") or "").strip()
-            room = (row.get("Room") or row.get("Room Name") or "").strip()
-            desc = (row.get("Description") or "").strip()
-            qty = (row.get("Quantity/Length") or "").strip()
-
-            if not code or not room or not qty:
-                # skip incomplete rows
-                continue
-
-            unit = detect_unit(code, desc)
-            qty_out = normalize_qty(qty, unit)
-
-            cleaned.append(
-                {"Line Item Code": code, "Room": room, "Quantity/Length": qty_out}
-            )
-
-    with dst.open("w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=FIELDNAMES_OUT)
-        w.writeheader()
-        w.writerows(cleaned)
-
-    print(f"✅ Exported for Xactimate: {dst}  (rows: {len(cleaned)})")
+
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    run(job_id)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,16 @@
 import csv
 import json
-import os
+import sys
+from pathlib import Path
 
-job_id = "job-0001"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+job_id = ctx.job_id
 job_dir = f"data/{job_id}"
 
 # Load input data
@@ -15,8 +23,7 @@ with open(f"{job_dir}/claim_assumptions.json") as f:
 with open(f"{job_dir}/policy_summary.json") as f:
     policy = json.load(f)
 
-os.makedirs("out", exist_ok=True)
-csv_file = "out/estimate_xact.csv"
+csv_file = ctx.estimate_csv
 
 with open(csv_file, mode="w", newline="") as file:
     writer = csv.writer(file)
@@ -1,98 +1,180 @@
 import csv
+import re
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+from rules import rulebook
+
 """
 Generates estimate rows using either:
-  out/<job_id>_room_data_merged.csv   (preferred)
+  out/<job_id>/<job_id>_room_data_merged.csv   (preferred)
   or falls back to
-  out/<job_id>_room_data.csv
+  rooms passed in memory by run_pipeline.py, or
+  out/<job_id>/<job_id>_room_data.csv
+
+Line items come from rules/rules.yaml: its room_scopes for every room, plus
+its mappings for detections in out/<job_id>/<job_id>_detections.csv that
+name a room. detect/process_images.py fills the room column from per-room
+photo folders (photos/Kitchen/...); detections of loose photos need their
+room filled in by hand before mappings apply to them.
 
-OUTPUT: out/estimate_xact.csv
+OUTPUT: out/<job_id>/estimate_xact.csv
 """
 
 FIELDS_OUT = ["Room", "Line Item Code", "Description", "Quantity/Length"]
 
+# CSV headers that don't slugify to the names rules/rules.yaml uses
+FIELD_ALIASES = {
+    "Width (ft)": "width_ft",
+    "Length (ft)": "length_ft",
+    "Area (ft²)": "area_sf",
+}
+NAME_FIELDS = ("Room", "Room Name")
+# Tells rooms with the same name apart (rulebook id_key)
+ID_FIELDS = ("Room ID", "room_id")
+
+
+def _qty(value):
+    try:
+        return round(float(value), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def _field_name(column):
+    """Rule book name for a room column: Ceiling Height (mm) -> ceiling_height_mm."""
+    if column in FIELD_ALIASES:
+        return FIELD_ALIASES[column]
+    name = re.sub(r"[^0-9a-z]+", "_", column.lower()).strip("_")
+    return name if name.isidentifier() else None
+
+
+def _normalize_rooms(rows):
+    """
+    Rooms as {"Room": name, <measurement>: number, ...}. Every numeric column
+    is passed on, so the rule book's formulas derive whatever quantities the
+    room's source (plan geometry, manual or OCR dimensions) didn't provide.
+    """
+    rooms = []
+    for row in rows:
+        # Normalize names used downstream
+        name = next((str(row[c]).strip() for c in NAME_FIELDS if row.get(c)), "")
+        if not name:
+            continue
+        room = {"Room": name}
+        room_id = next((str(row[c]).strip() for c in ID_FIELDS if row.get(c)), "")
+        if room_id:
+            room["room_id"] = room_id
+        aliased = {}
+        for column, value in row.items():
+            if column in NAME_FIELDS or column in ID_FIELDS:
+                continue
+            field = _field_name(column)
+            qty = _qty(value)
+            if field is None or qty is None:
+                continue
+            # A column already named like the rule book wins over an alias
+            (aliased if column in FIELD_ALIASES else room)[field] = qty
+        for field, qty in aliased.items():
+            room.setdefault(field, qty)
+        rooms.append(room)
+    return rooms
+
 
-def load_rooms(app_root, job_id):
-    out = app_root / "out"
-    merged = out / f"{job_id}_room_data_merged.csv"
-    base = out / f"{job_id}_room_data.csv"
+def load_rooms(ctx, rooms=None):
+    merged = ctx.room_data_merged_csv
+    base = ctx.room_data_csv
 
+    # The merged CSV comes from manual dims / OCR, not from the pipeline,
+    # so it still wins over whatever the room export stage handed us.
     src = None
     if merged.exists():
         src = merged
+    elif rooms is not None:
+        rooms = _normalize_rooms(rooms)
+        print(f"✅ Loaded {len(rooms)} rooms from memory")
+        return rooms
     elif base.exists():
         src = base
     else:
         print(
-            f"❌ No room data CSV found for {job_id}. Looked for:\n - {merged}\n - {base}"
+            f"❌ No room data CSV found for {ctx.job_id}. Looked for:\n - {merged}\n - {base}"
         )
         return []
 
-    rooms = []
     with src.open() as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Normalize names used downstream
-            name = (row.get("Room") or row.get("Room Name") or "").strip()
-            if not name:
-                continue
-            rooms.append({"Room": name})
+        rooms = _normalize_rooms(csv.DictReader(f))
     print(f"✅ Loaded {len(rooms)} rooms from {src.name}")
     return rooms
 
 
-def main():
-    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-    app_root = Path(__file__).resolve().parents[1]
-    out_dir = app_root / "out"
-    out_dir.mkdir(exist_ok=True)
-    out_csv = out_dir / "estimate_xact.csv"
-
-    rooms = load_rooms(app_root, job_id)
-    if not rooms:
-        # Still write a header so later steps don't crash
+def load_detections(ctx, rooms=()):
+    """Detections assigned to a room; the rule book maps them per room."""
+    path = ctx.detections_csv
+    if not path.exists():
+        return []
+    with path.open() as f:
+        rows = list(csv.DictReader(f))
+    # Photo folders are named by hand: match room names ignoring case
+    names = {}
+    for r in rooms:
+        names.setdefault(r["Room"].upper(), r["Room"])
+    detections = []
+    for row in rows:
+        room = (row.get("Room") or row.get("room") or "").strip()
+        if room and row.get("label"):
+            # Measurements (mask_sf, ...) are numbers to the rule book
+            det = {k: _qty(v) if k.endswith(("_sf", "_lf", "_ft")) else v for k, v in row.items()}
+            detections.append({**det, "Room": names.get(room.upper(), room)})
+    if rows:
+        print(f"✅ Loaded {len(detections)} of {len(rows)} detections with a room")
+    return detections
+
+
+def build_estimates(rooms, detections=()):
+    rows = rulebook.load().estimate(rooms, detections, room_key="Room")
+    return [
+        {
+            "Room": r["Group"],
+            "Line Item Code": r["Item Code"],
+            "Description": r["Notes"],
+            "Quantity/Length": r["Qty"],
+        }
+        for r in rows
+    ]
+
+
+def run(job, rooms=None, write=True):
+    ctx = JobContext.of(job)
+    out_csv = ctx.estimate_csv
+
+    rooms = load_rooms(ctx, rooms)
+    estimates = build_estimates(rooms, load_detections(ctx, rooms))
+
+    if write:
+        # Still write a header with no rows so later steps don't crash
         with out_csv.open("w", newline="") as f:
-            csv.DictWriter(f, fieldnames=FIELDS_OUT).writeheader()
-        print("⚠️ No estimate rows generated.")
-        return
+            w = csv.DictWriter(f, fieldnames=FIELDS_OUT)
+            w.writeheader()
+            w.writerows(estimates)
 
-    estimates = []
-    for r in rooms:
-        room = r["Room"]
-        # Add a few sample items — adjust to your logic
-        estimates.append(
-            {
-                "Room": room,
-                "Line Item Code": "DRYBD",
-                "Description": "Drywall base prep (LF)",
-                "Quantity/Length": 10,
-            }
-        )
-        estimates.append(
-            {
-                "Room": room,
-                "Line Item Code": "FLRPLS",
-                "Description": "Flooring - replace (SF)",
-                "Quantity/Length": 50,
-            }
-        )
-        estimates.append(
-            {
-                "Room": room,
-                "Line Item Code": "PNTINT",
-                "Description": "Paint interior walls (SF)",
-                "Quantity/Length": 50,
-            }
-        )
+    if not estimates:
+        print("⚠️ No estimate rows generated.")
+    elif write:
+        print(f"✅ Generated estimate using room data → {out_csv}")
+    else:
+        print(f"✅ Generated {len(estimates)} estimate rows in memory")
+    return estimates
 
-    with out_csv.open("w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=FIELDS_OUT)
-        w.writeheader()
-        w.writerows(estimates)
 
-    print(f"✅ Generated estimate using room data → {out_csv}")
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    run(job_id)
 
 
 if __name__ == "__main__":
@@ -1,56 +1,76 @@
 import csv
 import os
+import sys
+from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-def _room_data_path(job):
-    slug = os.path.basename(job.rstrip("/")) if job else "job-0001"
+from mytools.job_context import JobContext
 
-    # Prefer job-specific CSV; fall back to legacy names
-    for cand in (
-        f"out/{slug}_room_data.csv",
-        "_room_data_path(args.job)",
-        "out/--job_room_data.csv",
-    ):
-        if os.path.exists(cand):
-            return cand
-    return f"out/{slug}_room_data.csv"
 
+def _read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
 
-room_data_path = "_room_data_path(args.job)"
-estimate_path = "out/estimate_xact.csv"
-merged_path = "out/estimate_xact_merged.csv"
 
-if not os.path.exists(room_data_path):
-    print(f"❌ Missing room data file: {room_data_path}")
-    exit()
-
-if not os.path.exists(estimate_path):
-    print(f"❌ Missing estimate file: {estimate_path}")
-    exit()
-
-# Load room data into a dictionary
-room_data = {}
-with open(room_data_path, newline="") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
+def merge(rows, rooms):
+    # Load room data into a dictionary
+    room_data = {}
+    for row in rooms:
         room_data[row["Room Name"].strip().lower()] = row
 
-# Merge estimate with room data
-merged_rows = []
-with open(estimate_path, newline="") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
+    # Unmatched rows get blank room columns so every row has the same fields
+    blank = dict.fromkeys((k for r in rooms for k in r), "")
+
+    # Merge estimate with room data
+    merged_rows = []
+    for row in rows:
         room_name = row["Room"].strip().lower()
         room_info = room_data.get(room_name, {})
-        merged_row = {**row, **room_info}
-        merged_rows.append(merged_row)
-
-# Write merged file
-if merged_rows:
-    with open(merged_path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=merged_rows[0].keys())
-        writer.writeheader()
-        writer.writerows(merged_rows)
-    print(f"✅ Merged estimate saved to: {merged_path}")
-else:
-    print("⚠️ No rows merged — check room names in both files.")
+        merged_rows.append({**row, **blank, **room_info})
+    return merged_rows
+
+
+def run(job, rows=None, rooms=None, write=True):
+    ctx = JobContext.of(job)
+    estimate_path = ctx.estimate_csv
+    merged_path = ctx.estimate_merged_csv
+
+    if rooms is None:
+        room_data_path = ctx.room_data_csv
+        if not os.path.exists(room_data_path):
+            print(f"❌ Missing room data file: {room_data_path}")
+            return []
+        rooms = _read_csv(room_data_path)
+
+    if rows is None:
+        if not os.path.exists(estimate_path):
+            print(f"❌ Missing estimate file: {estimate_path}")
+            return []
+        rows = _read_csv(estimate_path)
+
+    merged_rows = merge(rows, rooms)
+
+    # Write merged file
+    if not merged_rows:
+        print("⚠️ No rows merged — check room names in both files.")
+    elif write:
+        with open(merged_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=merged_rows[0].keys())
+            writer.writeheader()
+            writer.writerows(merged_rows)
+        print(f"✅ Merged estimate saved to: {merged_path}")
+    else:
+        print(f"✅ Merged {len(merged_rows)} estimate rows in memory")
+    return merged_rows
+
+
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    run(job_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
 import csv
-import os
+import sys
+from pathlib import Path
 
-input_csv = "out/estimate_xact_final.csv"
-output_html = "out/estimate_preview.html"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+input_csv = ctx.estimate_final_csv
+output_html = ctx.estimate_preview_html
 
 
 def mm_to_ft_in(mm_str):
@@ -66,7 +74,6 @@ html = f"""
 """
 
 # Write the HTML
-os.makedirs("out", exist_ok=True)
 with open(output_html, "w") as f:
     f.write(html)
 
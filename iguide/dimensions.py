@@ -0,0 +1,131 @@
+"""
+Feet-and-inches dimension parsing shared by the floorplan and manual-entry paths.
+
+Everything is normalized to inches. Accepted notations (case-insensitive):
+
+  9' 6"   9'6   9'6''   9 ft 6 in   9-6   9'   6"   9.5 ft   2.9m   290 cm
+
+9-6 only counts with dimension context: an inch mark (9-6"), one side of a
+W x L pair (12-4 x 10-2), or as the whole text, so "2-3 BEDROOM" is not 27".
+
+OCR look-alikes are folded first: ° ’ ‘ ′ ´ ` become ' and ″ “ ” '' become ".
+
+parse_inches(text)      one cell, e.g. a manual form entry (bare numbers are feet)
+to_inches(values)       batch of cells (list, tuple or array of strings)
+find_inches(text)       every dimension in free text, e.g. an OCR'd room label
+format_ft_in(inches)    back to the form's 9'6" notation
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+MM_PER_INCH = 25.4
+
+_QUOTES = str.maketrans({"°": "'", "’": "'", "‘": "'", "′": "'", "´": "'",
+                         "″": '"', "“": '"', "”": '"'})
+
+_NUM = r"\d+(?:\.\d+)?"
+_FEET = rf"(?P<ft>{_NUM})\s*(?:'|ft\b\.?|feet\b|foot\b)"
+_INCH = rf"(?P<in>{_NUM})(?:\s+(?P<num>\d+)/(?P<den>\d+))?"
+_INCH_MARK = r"(?:\"|in\b\.?|inch(?:es)?\b)"
+_DASH = r"\d+\s*-\s*\d{1,2}(?![\d.])"
+# Where a bare 9-6 is a dimension: before an inch mark or the "x" of a pair,
+# after that "x", or as the whole text
+_DASH_CONTEXT = (
+    rf"(?:(?={_DASH}\s*(?:{_INCH_MARK}|[x×]\s*\d))"
+    r"|(?<=[x×])(?<![a-z][x×])|(?<=[x×]\s)(?<![a-z][x×]\s)"
+    rf"|\A(?={_DASH}\s*\Z))"
+)
+
+_PATTERNS = {
+    # 2.9m, 290 cm, 2900mm
+    "metric": r"(?P<m>\d+(?:[.,]\d+)?)\s*(?P<unit>mm|cm|m)(?![a-z])",
+    # 9' 6", 9'6, 9 ft 6 in, 9'
+    "ft_in": rf"{_FEET}(?:\s*-?\s*{_INCH}\s*{_INCH_MARK}?(?![\w.]))?",
+    # 9-6", 12-4 x 10-2
+    "dash": rf"{_DASH_CONTEXT}(?P<dft>\d+)\s*-\s*(?P<din>\d{{1,2}})(?![\d.])(?:\s*{_INCH_MARK})?",
+    # 6"
+    "inches": rf"(?P<only>{_NUM})\s*{_INCH_MARK}",
+}
+# Every notation starts with a digit; the lookahead lets the scan skip other positions fast
+DIMENSION = re.compile(
+    r"(?=\d)(?:" + "|".join(f"(?P<{name}>{p})" for name, p in _PATTERNS.items()) + ")",
+    re.IGNORECASE,
+)
+BARE = re.compile(rf"\s*({_NUM})\s*")
+
+
+def normalize(text) -> str:
+    text = str(text)
+    if not text.isascii():
+        text = text.translate(_QUOTES)
+    # The backtick is ASCII, so it's folded outside the translate guard
+    return text.replace("`", "'").replace("''", '"').strip()
+
+
+def _value(m, ocr=False) -> Optional[float]:
+    # The notation's own group is the last one to close
+    kind = m.lastgroup
+    if kind == "metric":
+        value = float(m.group("m").replace(",", "."))
+        mm = value * {"mm": 1, "cm": 10, "m": 1000}[m.group("unit").lower()]
+        return mm / MM_PER_INCH
+    if kind == "ft_in":
+        inches = float(m.group("in") or 0)
+        if m.group("num"):
+            inches += int(m.group("num")) / max(int(m.group("den")), 1)
+        return float(m.group("ft")) * 12 + inches if inches < 12 else None
+    if kind == "dash":
+        inches = int(m.group("din"))
+        return float(int(m.group("dft")) * 12 + inches) if inches < 12 else None
+    only = m.group("only")
+    if ocr and "." not in only and len(only) >= 3:
+        # OCR tends to drop the foot mark: 610" is 6'10", 231" is 23'1"
+        if int(only[-2:]) < 12:
+            return float(int(only[:-2]) * 12 + int(only[-2:]))
+        return float(int(only[:-1]) * 12 + int(only[-1]))
+    return float(only)
+
+
+def parse_inches(text, bare_unit: str = "ft") -> Optional[float]:
+    """Inches for a single dimension cell, or None if it isn't one."""
+    if text is None:
+        return None
+    text = normalize(text)
+    if not text:
+        return None
+    m = BARE.fullmatch(text)
+    if m:
+        value = float(m.group(1))
+        return value * 12 if bare_unit == "ft" else value
+    m = DIMENSION.fullmatch(text)
+    return _value(m) if m else None
+
+
+def to_inches(values: Iterable, bare_unit: str = "ft") -> List[Optional[float]]:
+    """parse_inches over a batch of cells; repeated strings are parsed once."""
+    seen = {}
+    out = []
+    for v in values:
+        key = None if v is None else str(v)
+        if key not in seen:
+            seen[key] = parse_inches(key, bare_unit)
+        out.append(seen[key])
+    return out
+
+
+def find_inches(text, ocr: bool = False) -> List[float]:
+    """Every dimension in free text, in order; ocr=True also repairs dropped foot marks."""
+    found = []
+    for m in DIMENSION.finditer(normalize(text)):
+        value = _value(m, ocr)
+        if value is not None:
+            found.append(value)
+    return found
+
+
+def format_ft_in(inches: Optional[float]) -> str:
+    if inches is None:
+        return ""
+    total = int(round(inches))
+    return f"{total // 12}'{total % 12}\""
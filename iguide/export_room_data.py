@@ -2,26 +2,66 @@ import csv
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide.geometry import GEOMETRY_FIELDS, room_geometry
+from iguide.parse_iguide import find_xml
+from iguide.plan_cache import load_plan
+from mytools.job_context import JobContext
+
 """
-Exports basic room metadata for the given job_id.
+Exports room metadata and geometry for the given job_id.
 
-OUTPUT: out/<job_id>_room_data.csv
-TEMPORARY: If XML parsing is flaky, we at least emit a stub CSV
-so the rest of the pipeline can keep moving.
+OUTPUT: out/<job_id>/<job_id>_room_data.csv
+Rooms come from the job's iGUIDE XML, with perimeter/area/opening
+measurements from iguide/geometry.py (estimate quantities are derived from
+them by the rules/rules.yaml formulas). If there is no XML we still emit
+a stub CSV so the rest of the pipeline can keep moving.
+
+In-process callers (run_pipeline.py) use run(job_id, write=False)
+and get the room rows back without touching disk.
 """
 
+FIELDS_OUT = ["Room Name", "Room ID", "Ceiling Height (mm)", "Wall IDs"] + GEOMETRY_FIELDS
+
+def build_rows(job):
+    ctx = JobContext.of(job)
+    xml_file = find_xml(ctx)
+    if xml_file is None:
+        print(f"⚠️ No iGUIDE XML for {ctx.job_id}; using stub rooms")
+        return stub_rows()
+
+    plan = load_plan(xml_file)
+    rows = []
+    for g in room_geometry(plan):
+        ceiling = g["ceiling_height_mm"]
+        row = {
+            "Room Name": g["name"],
+            "Room ID": g["room_id"],
+            "Ceiling Height (mm)": "" if ceiling is None else ceiling,
+            "Wall IDs": " ".join(g["wall_ids"]),
+        }
+        row.update((k, "" if g[k] is None else g[k]) for k in GEOMETRY_FIELDS)
+        rows.append(row)
+    return rows
 
-def main():
-    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-    app_root = Path(__file__).resolve().parents[1]
-    out_dir = app_root / "out"
-    out_dir.mkdir(exist_ok=True)
 
-    out_csv = out_dir / f"{job_id}_room_data.csv"
+def load_rows(job):
+    """Room rows for scripts outside the pipeline: the cached plan, else the exported CSV."""
+    ctx = JobContext.of(job)
+    if find_xml(ctx) is not None:
+        return build_rows(ctx)
+    if ctx.room_data_csv.exists():
+        with ctx.room_data_csv.open(newline="") as f:
+            return list(csv.DictReader(f))
+    return []
 
-    # TODO: replace this stub with your real XML parsing logic.
-    # For now, we emit a minimal, valid CSV so downstream scripts work.
-    rows = [
+
+def stub_rows():
+    # Minimal, valid rows so downstream scripts work without a floorplan.
+    return [
         {
             "Room Name": "LIVING ROOM",
             "Room ID": "1",
@@ -42,14 +82,26 @@ def main():
         },
     ]
 
-    with out_csv.open("w", newline="") as f:
-        w = csv.DictWriter(
-            f, fieldnames=["Room Name", "Room ID", "Ceiling Height (mm)", "Wall IDs"]
-        )
-        w.writeheader()
-        w.writerows(rows)
 
-    print(f"✅ Room data exported to: {out_csv}")
+def run(job, write=True):
+    ctx = JobContext.of(job)
+    rows = build_rows(ctx)
+
+    if write:
+        out_csv = ctx.room_data_csv
+        with out_csv.open("w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDS_OUT)
+            w.writeheader()
+            w.writerows(rows)
+        print(f"✅ Room data exported to: {out_csv}")
+    else:
+        print(f"✅ Room data built in memory ({len(rows)} rooms)")
+    return rows
+
+
+def main():
+    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+    run(job_id)
 
 
 if __name__ == "__main__":
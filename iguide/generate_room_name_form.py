@@ -11,7 +11,9 @@ Behavior:
 - Writes <job>/room_name_form.csv with columns:
     Room, Length (ft'in"), Width (ft'in"), Ceiling (ft'in"), Notes
 - If seed files exist, it will try to pre-populate rooms from:
-    <job>/rooms.csv   (expects header with 'room' or first column as room names)
+    <job>/rooms.csv   (expects header with 'room' or first column as room names;
+                       length/width/ceiling columns in any notation iguide/dimensions.py
+                       reads are pre-filled as ft'in")
     <job>/room_names.txt (one room per line)
 - Otherwise it will use default placeholders.
 - Prints the CSV path to STDOUT on success and exits 0.
@@ -28,6 +30,12 @@ import csv
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide.dimensions import format_ft_in, to_inches
+
 DEFAULT_ROOMS = [
     "Living Room",
     "Kitchen",
@@ -42,6 +50,8 @@ DEFAULT_ROOMS = [
 ]
 
 HEADER = ["Room", "Length (ft'in\")", "Width (ft'in\")", "Ceiling (ft'in\")", "Notes"]
+# Seed-file column name prefixes for each dimension cell of the form
+DIM_COLUMNS = ("length", "width", "ceiling")
 
 
 def read_rooms_from_csv(csv_path: Path) -> list[str]:
@@ -69,6 +79,37 @@ def read_rooms_from_csv(csv_path: Path) -> list[str]:
     return rooms
 
 
+def read_dims_from_csv(csv_path: Path) -> dict[str, list[str]]:
+    """Room name -> [length, width, ceiling] as ft'in" strings, from seed columns."""
+    try:
+        with csv_path.open("r", encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+    except Exception:
+        return {}
+    if not rows:
+        return {}
+    header = [h.strip().lower() for h in rows[0]]
+    name_idx = header.index("room") if "room" in header else 0
+    dim_idx = [
+        next((i for i, h in enumerate(header) if h.startswith(col)), None)
+        for col in DIM_COLUMNS
+    ]
+    if all(i is None for i in dim_idx):
+        return {}
+
+    names = [r[name_idx].strip() for r in rows[1:] if len(r) > name_idx]
+    # One batch per column: the parser caches repeated values
+    columns = [
+        to_inches(r[i] if i is not None and len(r) > i else None for r in rows[1:])
+        for i in dim_idx
+    ]
+    return {
+        name: [format_ft_in(col[k]) for col in columns]
+        for k, name in enumerate(names)
+        if name
+    }
+
+
 def read_rooms_from_txt(txt_path: Path) -> list[str]:
     rooms: list[str] = []
     try:
@@ -103,14 +144,16 @@ def discover_rooms(job_dir: Path, cli_rooms: list[str] | None) -> list[str]:
     return DEFAULT_ROOMS[:]
 
 
-def write_form_csv(out_path: Path, rooms: list[str]) -> None:
+def write_form_csv(
+    out_path: Path, rooms: list[str], dims: dict[str, list[str]] | None = None
+) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     with out_path.open("w", encoding="utf-8", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(HEADER)
         for name in rooms:
-            # Leave dimension cells blank for manual entry (feet & inches like 9'6")
-            writer.writerow([name, "", "", "", ""])
+            # Unknown dimension cells stay blank for manual entry (feet & inches like 9'6")
+            writer.writerow([name, *(dims or {}).get(name, ["", "", ""]), ""])
 
 
 def main() -> int:
@@ -148,7 +191,7 @@ def main() -> int:
     # Output path lives inside the job folder
     out_csv = job_dir / "room_name_form.csv"
     try:
-        write_form_csv(out_csv, rooms)
+        write_form_csv(out_csv, rooms, read_dims_from_csv(job_dir / "rooms.csv"))
     except Exception as e:
         sys.stderr.write(f"[ERROR] Failed to write CSV: {e}\n")
         return 1
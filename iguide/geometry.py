@@ -0,0 +1,174 @@
+"""
+Room geometry from a parsed iGUIDE plan, computed for all rooms at once.
+
+room_geometry(plan) resolves each SKETCHROOM's wallIDs to wall segments,
+flattens every segment and opening of the plan into NumPy arrays, and
+returns one dict per room with its raw measurements:
+
+  area_sf, perimeter_lf, height_ft, openings_sf, door_widths_lf
+
+Estimate quantities derived from them (wall_sf, paint_walls_sf,
+baseboard_lf, ...) are rules/rules.yaml formulas, evaluated by
+rules/rulebook.py, so editing a formula there changes every estimate.
+height_ft is None where the plan has no ceiling height; the rule book's
+ceiling_height_ft default applies then.
+
+iGUIDE sketch coordinates are in 0.2 mm units (a 36" door is 4572 units
+wide), which is where the old "wrong wall lengths" came from.
+"""
+
+import numpy as np
+
+UNITS_PER_MM = 5.0
+MM_PER_FT = 304.8
+# Openings whose sill is this close to the floor interrupt the baseboard
+FLOOR_TOLERANCE_MM = 50.0
+
+GEOMETRY_FIELDS = [
+    "area_sf",
+    "perimeter_lf",
+    "height_ft",
+    "openings_sf",
+    "door_widths_lf",
+]
+
+
+def _loop(walls):
+    """Order a room's walls head-to-tail as (from vertex, to vertex) pairs."""
+    ends = [w.vertex_ids for w in walls if len(w.vertex_ids) == 2]
+    remaining = list(range(len(ends)))
+    ordered = []
+    while remaining:
+        a, b = ends[remaining.pop(0)]
+        ordered.append((a, b))
+        start = a
+        while b != start:
+            nxt = next((j for j in remaining if b in ends[j]), None)
+            if nxt is None:
+                break
+            remaining.remove(nxt)
+            c, d = ends[nxt]
+            a, b = (c, d) if c == b else (d, c)
+            ordered.append((a, b))
+    return ordered
+
+
+def _coordinate_table(plan):
+    """All documents' coordinates as one (n, 3) array plus each document's row offset."""
+    offsets, blocks, n = {}, [], 0
+    for doc, values in sorted(plan.coordinates.items()):
+        block = np.frombuffer(values, dtype=np.float64).reshape(-1, 3)
+        offsets[doc] = n
+        blocks.append(block)
+        n += len(block)
+    table = np.concatenate(blocks) if blocks else np.zeros((0, 3))
+    return table, offsets
+
+
+def plan_arrays(plan):
+    """
+    Flatten the plan into index arrays (one pass over rooms and walls):
+      seg_room, seg_a, seg_b   room index and coordinate rows of each wall segment
+      op_room, op_corners      room index and 4 coordinate rows of each opening
+      floor_z                  floor elevation per room (sketch units)
+    """
+    table, offsets = _coordinate_table(plan)
+    seg_room, seg_a, seg_b = [], [], []
+    op_room, op_corners = [], []
+    floor_z = np.zeros(len(plan.rooms))
+
+    def row(level, index):
+        return offsets.get(plan.levels[level].document, 0) + index
+
+    for i, room in enumerate(plan.rooms):
+        level = plan.levels.get(room.level)
+        floor_z[i] = (level.floor_elevation_mm or 0.0) if level else 0.0
+        walls = plan.room_walls(room)
+        for a, b in _loop(walls):
+            va, vb = plan.vertices.get(a), plan.vertices.get(b)
+            if va is None or vb is None:
+                continue
+            seg_room.append(i)
+            seg_a.append(row(va.level, va.coord_index))
+            seg_b.append(row(vb.level, vb.coord_index))
+        for wall in walls:
+            for op in wall.openings:
+                if len(op.coord_index) < 4:
+                    continue
+                op_room.append(i)
+                op_corners.append([row(wall.level, k) for k in op.coord_index[:4]])
+
+    return {
+        "coords": table,
+        "seg_room": np.asarray(seg_room, dtype=np.intp),
+        "seg_a": np.asarray(seg_a, dtype=np.intp),
+        "seg_b": np.asarray(seg_b, dtype=np.intp),
+        "op_room": np.asarray(op_room, dtype=np.intp),
+        "op_corners": np.asarray(op_corners, dtype=np.intp).reshape(-1, 4),
+        "floor_z": floor_z,
+    }
+
+
+def compute(arrays, n_rooms, heights_mm):
+    """Vectorized measurements for every room; returns a dict of arrays (NaN = unknown)."""
+    coords = arrays["coords"] / UNITS_PER_MM
+    ft = 1.0 / MM_PER_FT
+
+    # Perimeter and shoelace area from the oriented wall segments
+    p1 = coords[arrays["seg_a"], :2]
+    p2 = coords[arrays["seg_b"], :2]
+    seg_len = np.hypot(*(p2 - p1).T)
+    cross = p1[:, 0] * p2[:, 1] - p2[:, 0] * p1[:, 1]
+    perimeter_lf = np.bincount(arrays["seg_room"], seg_len, n_rooms) * ft
+    area_sf = np.abs(np.bincount(arrays["seg_room"], cross, n_rooms)) / 2 * ft**2
+
+    # Openings: width along the wall, height from their corner z range
+    corners = coords[arrays["op_corners"]]  # (n_openings, 4, 3)
+    op_width = np.hypot(*(corners[:, 1, :2] - corners[:, 0, :2]).T) * ft
+    z = corners[:, :, 2]
+    op_height = (z.max(axis=1) - z.min(axis=1)) * ft
+    sill_mm = z.min(axis=1) - arrays["floor_z"][arrays["op_room"]] / UNITS_PER_MM
+    at_floor = sill_mm <= FLOOR_TOLERANCE_MM
+    openings_sf = np.bincount(arrays["op_room"], op_width * op_height, n_rooms)
+    door_widths_lf = np.bincount(
+        arrays["op_room"], np.where(at_floor, op_width, 0.0), n_rooms
+    )
+
+    height_ft = np.asarray(heights_mm, dtype=np.float64) / UNITS_PER_MM * ft
+
+    return {
+        "area_sf": area_sf,
+        "perimeter_lf": perimeter_lf,
+        "height_ft": height_ft,
+        "openings_sf": openings_sf,
+        "door_widths_lf": door_widths_lf,
+    }
+
+
+def room_geometry(plan):
+    """One dict per plan.rooms entry: id, name, ceiling height (mm) and GEOMETRY_FIELDS."""
+    n = len(plan.rooms)
+    if not n:
+        return []
+    heights = [
+        np.nan if r.ceiling_height_mm is None else r.ceiling_height_mm
+        for r in plan.rooms
+    ]
+    q = compute(plan_arrays(plan), n, heights)
+    q = {
+        k: [None if np.isnan(x) else x for x in np.round(v, 2).tolist()]
+        for k, v in q.items()
+    }
+    rooms = []
+    for i, room in enumerate(plan.rooms):
+        ceiling_mm = heights[i] / UNITS_PER_MM
+        rooms.append(
+            {
+                "room_id": room.id,
+                "name": room.name,
+                "ceiling_height_mm": None if np.isnan(ceiling_mm) else round(ceiling_mm),
+                "wall_ids": room.wall_ids,
+                **{k: q[k][i] for k in GEOMETRY_FIELDS},
+            }
+        )
+    return rooms
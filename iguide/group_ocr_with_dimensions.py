@@ -1,84 +1,157 @@
+"""
+Group floorplan OCR words into rooms with their dimensions.
+
+Words are clustered by bounding-box proximity in both axes (iguide/spatial.py),
+so labels side by side on the same row stay separate. A cluster holding a room
+name takes the dimension strings in it; a label cluster without any takes the
+nearest dimension-only cluster within --pair-radius.
+
+OUTPUT: out/<job_id>/<job_id>_ocr_grouped_with_dimensions.csv
+        (Room Name, Width (ft), Length (ft), Y)
+
+Usage:
+  python3 iguide/group_ocr_with_dimensions.py job-0001 [--rx 25] [--ry 20] [--pair-radius 150]
+"""
+
+import argparse
 import csv
 import re
 import sys
-from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide import ocr_cache
+from iguide.dimensions import find_inches
+from iguide.spatial import GridIndex, cluster_boxes, nearest
+from mytools.job_context import JobContext
+
+FIELDS_OUT = ["Room Name", "Width (ft)", "Length (ft)", "Y"]
+
+# Max horizontal / vertical gap (px) between words of one label block
+GAP_X = 25
+GAP_Y = 20
+# How far (px, center to center) a label looks for a separate dimension block
+PAIR_RADIUS = 150
+
+ROOM_NAME = re.compile(
+    r"(BEDROOM|LIVING|PRIMARY|KITCHEN|BATH|ENSUITE|GARAGE|STORAGE|CLOSET|3PC|4PC|PANTRY)"
+)
+
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-input_file = f"out/{job_id}_ocr_rooms.csv"
-output_file = f"out/{job_id}_ocr_grouped_with_dimensions.csv"
+def load_words(ctx, input_file):
+    """OCR words with boxes: the cached OCR of this job's floorplan if
+    label_floorplan.py has run on it, otherwise its CSV."""
+    cached = ocr_cache.latest(ctx.floorplan_image)
+    if cached:
+        print(f"♻️ Using cached OCR words for {ctx.floorplan_image.name}")
+        return [{**w, "text": w["text"].strip()} for w in ocr_cache.scaled_words(cached)]
+    words = []
+    with open(input_file, newline="") as f:
+        for row in csv.DictReader(f):
+            words.append(
+                {
+                    "text": row["Room Name"].strip(),
+                    "x": int(row["X"]),
+                    "y": int(row["Y"]),
+                    "w": int(row.get("Width") or 0),
+                    "h": int(row.get("Height") or 0),
+                }
+            )
+    return words
 
 
-def extract_feet_inches(text):
-    match = re.search(r"(\d+)[^\d]+(\d+)?", text)
-    if not match:
-        return None
-    feet = int(match.group(1))
-    inches = int(match.group(2)) if match.group(2) else 0
-    return feet + inches / 12.0
+def reading_order(words):
+    """Words top-to-bottom by line, left-to-right within a line."""
+    lines = []
+    for w in sorted(words, key=lambda w: w["y"] + w["h"] / 2):
+        mid = w["y"] + w["h"] / 2
+        if lines and abs(mid - lines[-1][0]) <= max(w["h"], 1) / 2:
+            lines[-1][1].append(w)
+        else:
+            lines.append((mid, [w]))
+    return [w for _, line in lines for w in sorted(line, key=lambda w: w["x"])]
 
 
-# Load OCR lines
-lines = []
-with open(input_file, newline="") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        txt = row["Room Name"].strip().replace("°", "'").replace('"', '"')
-        lines.append(
+def bounds(words):
+    x0 = min(w["x"] for w in words)
+    y0 = min(w["y"] for w in words)
+    x1 = max(w["x"] + w["w"] for w in words)
+    y1 = max(w["y"] + w["h"] for w in words)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def group_rooms(words, rx=GAP_X, ry=GAP_Y, pair_radius=PAIR_RADIUS):
+    boxes = [(w["x"], w["y"], w["w"], w["h"]) for w in words]
+    blocks = []
+    for members in cluster_boxes(boxes, rx, ry):
+        ordered = reading_order([words[i] for i in members])
+        combined = " ".join(w["text"] for w in ordered)
+        blocks.append(
             {
-                "text": txt,
-                "x": int(row["X"]),
-                "y": int(row["Y"]),
+                "box": bounds(ordered),
+                "name": ROOM_NAME.search(combined.upper()),
+                "dims": find_inches(combined, ocr=True),
             }
         )
+    blocks.sort(key=lambda b: (b["box"][1], b["box"][0]))
+
+    # Dimension-only blocks, for labels whose dimensions sit apart from them
+    dim_blocks = [b for b in blocks if b["dims"] and not b["name"]]
+    dim_boxes = [b["box"] for b in dim_blocks]
+    index = GridIndex(pair_radius)
+    for i, box in enumerate(dim_boxes):
+        index.insert(i, box)
+    taken = set()
 
-# Group lines that are near each other (y distance < 40)
-lines.sort(key=lambda r: r["y"])
-groups = []
-current = []
-for i, row in enumerate(lines):
-    if not current:
-        current.append(row)
-        continue
-    if abs(row["y"] - current[-1]["y"]) < 40:
-        current.append(row)
-    else:
-        groups.append(current)
-        current = [row]
-if current:
-    groups.append(current)
-
-# Parse each group
-parsed_rooms = []
-for g in groups:
-    texts = [r["text"] for r in g]
-    combined = " ".join(texts)
-    name_match = re.search(
-        r"(BEDROOM|LIVING|PRIMARY|KITCHEN|BATH|ENSUITE|GARAGE|STORAGE|CLOSET|3PC|4PC|PANTRY)",
-        combined.upper(),
-    )
-    dim_match = re.findall(r"(\d+[\'’][^\dx]+[\d\"]{1,3})", combined)
-
-    if name_match:
-        room_name = name_match.group(1)
-        width = length = None
-        if len(dim_match) >= 1:
-            width = extract_feet_inches(dim_match[0])
-        if len(dim_match) >= 2:
-            length = extract_feet_inches(dim_match[1])
-        parsed_rooms.append(
+    rooms = []
+    for b in blocks:
+        if not b["name"]:
+            continue
+        dims = b["dims"]
+        if not dims:
+            j = nearest(index, dim_boxes, b["box"], pair_radius, taken)
+            if j is not None:
+                taken.add(j)
+                dims = dim_blocks[j]["dims"]
+        width = dims[0] / 12 if len(dims) >= 1 else None
+        length = dims[1] / 12 if len(dims) >= 2 else None
+        rooms.append(
             {
-                "Room Name": room_name,
+                "Room Name": b["name"].group(1),
                 "Width (ft)": round(width, 2) if width else "",
                 "Length (ft)": round(length, 2) if length else "",
-                "Y": g[0]["y"],
+                "Y": b["box"][1],
             }
         )
+    return rooms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group OCR words into rooms.")
+    parser.add_argument("job", nargs="?", default="job-0001")
+    parser.add_argument("--rx", type=int, default=GAP_X, help="Max horizontal gap (px)")
+    parser.add_argument("--ry", type=int, default=GAP_Y, help="Max vertical gap (px)")
+    parser.add_argument("--pair-radius", type=int, default=PAIR_RADIUS)
+    args = parser.parse_args()
+
+    ctx = JobContext.of(args.job)
+    input_file = ctx.ocr_rooms_csv
+    output_file = ctx.ocr_grouped_csv
+
+    parsed_rooms = group_rooms(load_words(ctx, input_file), args.rx, args.ry, args.pair_radius)
+
+    # Save
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS_OUT)
+        writer.writeheader()
+        writer.writerows(parsed_rooms)
+
+    print(f"✅ Parsed {len(parsed_rooms)} rooms with dimensions.")
+    print(f"📄 Saved to: {output_file}")
 
-# Save
-with open(output_file, "w", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=parsed_rooms[0].keys())
-    writer.writeheader()
-    writer.writerows(parsed_rooms)
 
-print(f"✅ Parsed {len(parsed_rooms)} rooms with dimensions.")
-print(f"📄 Saved to: {output_file}")
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,60 @@
 import csv
 import os
 import sys
+from pathlib import Path
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-manual_file = f"out/{job_id}_manual_room_dims.csv"
-output_file = f"out/{job_id}_room_data_merged.csv"
+from iguide.dimensions import to_inches
+from mytools.job_context import JobContext
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+
+manual_file = ctx.manual_room_dims_csv
+output_file = ctx.room_data_merged_csv
 
 if not os.path.exists(manual_file):
     print(f"❌ Cannot find manual input file: {manual_file}")
     sys.exit(1)
 
-rows = []
+# Plain feet (9.5) or the room name form's feet-inches (9'6") columns
+WIDTH_COLS = ("Width (ft)", "Width (ft'in\")")
+LENGTH_COLS = ("Length (ft)", "Length (ft'in\")")
+
+
+def first(row, cols):
+    return next((row[c] for c in cols if (row.get(c) or "").strip()), None)
+
+
 with open(manual_file, newline="") as f:
-    for row in csv.DictReader(f):
-        try:
-            name = row["Room Name"].strip().upper()
-            width = float(row["Width (ft)"])
-            length = float(row["Length (ft)"])
-            area = round(width * length, 2)
-            rows.append(
-                {
-                    "Room": name,
-                    "Width (ft)": width,
-                    "Length (ft)": length,
-                    "Area (ft²)": area,
-                }
-            )
-        except Exception as e:
-            print(f"⚠️ Skipping row: {row} → {e}")
+    raw = list(csv.DictReader(f))
+
+widths = to_inches(first(row, WIDTH_COLS) for row in raw)
+lengths = to_inches(first(row, LENGTH_COLS) for row in raw)
+
+rows = []
+for row, width_in, length_in in zip(raw, widths, lengths):
+    try:
+        name = (row.get("Room Name") or row.get("Room") or "").strip().upper()
+        if not name:
+            raise ValueError("no room name")
+        if width_in is None or length_in is None:
+            raise ValueError("width/length is not a dimension")
+        width = round(width_in / 12, 2)
+        length = round(length_in / 12, 2)
+        area = round(width_in * length_in / 144, 2)
+        rows.append(
+            {
+                "Room": name,
+                "Width (ft)": width,
+                "Length (ft)": length,
+                "Area (ft²)": area,
+            }
+        )
+    except Exception as e:
+        print(f"⚠️ Skipping row: {row} → {e}")
 
 if not rows:
     print("❌ No valid rows imported. Please check your CSV.")
@@ -1,44 +1,244 @@
+"""
+OCR the floorplan image into word boxes.
+
+OUTPUT: out/<job_id>/<job_id>_ocr_rooms.csv  (Room Name, X, Y, Width, Height)
+
+Images larger than one tile are split into overlapping tiles that are
+OCR'd in parallel (each pytesseract call runs its own tesseract process).
+Boxes are shifted back to image coordinates; words cut by a tile edge are
+dropped because the overlap guarantees a neighbouring tile sees them
+whole, and words seen twice in an overlap are de-duplicated.
+
+The job's floorplan image is binarized and deskewed in memory
+(iguide/preprocess.py) before OCR; boxes are rotated (and, with --upscale,
+scaled) back to the original image's pixels.
+
+Results are cached by image hash and settings (iguide/ocr_cache.py), so
+re-running on the same floorplan skips preprocessing and tesseract.
+
+Usage:
+  python3 iguide/label_floorplan.py job-0001 [--tile 2000] [--overlap 200] [--workers N] [--upscale 2] [--no-cache]
+"""
+
+import argparse
 import csv
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-import cv2
-import numpy as np
 import pytesseract
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-image_path = f"out/bw_debug.jpg"  # Use the enhanced image
-output_csv = f"out/{job_id}_ocr_rooms.csv"
-
-# Load image
-img = cv2.imread(image_path)
-if img is None:
-    print(f"❌ Could not load image: {image_path}")
-    sys.exit(1)
-print(f"✅ Loaded image size: {img.shape}")
-
-# OCR
-print("🔍 Running OCR on floorplan image...")
-detection = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
-
-# Collect room-related texts
-rows = []
-for i in range(len(detection["text"])):
-    text = detection["text"][i].strip()
-    if text:
-        x, y, w, h = (
-            detection["left"][i],
-            detection["top"][i],
-            detection["width"][i],
-            detection["height"][i],
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide import ocr_cache
+from iguide.preprocess import (
+    MAX_SKEW_DEG,
+    THRESHOLD_BLOCK,
+    THRESHOLD_C,
+    load_image,
+    preprocess,
+)
+from mytools.job_context import JobContext
+from mytools.logger_helper import get_job_metrics
+
+FIELDS_OUT = ["Room Name", "X", "Y", "Width", "Height"]
+
+TILE_SIZE = 2000
+# Must exceed the largest word box so every word fits whole in some tile
+TILE_OVERLAP = 200
+# Words touching an inner tile edge by less than this many px are partial
+EDGE_MARGIN = 2
+# Overlap (intersection over the smaller box) at which two same-text boxes are one word
+DUPLICATE_OVERLAP = 0.5
+
+# One tesseract per worker; stop each from also spawning OpenMP threads
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def tile_grid(width, height, size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """(x0, y0, x1, y1) tiles covering the image, overlapping by `overlap` px."""
+    step = max(1, size - overlap)
+
+    def starts(extent):
+        if extent <= size:
+            return [0]
+        s = list(range(0, extent - size, step))
+        return s + [extent - size]
+
+    return [
+        (x0, y0, min(x0 + size, width), min(y0 + size, height))
+        for y0 in starts(height)
+        for x0 in starts(width)
+    ]
+
+
+def _ocr_tile(img, tile, image_size, config=""):
+    x0, y0, x1, y1 = tile
+    width, height = image_size
+    data = pytesseract.image_to_data(
+        img[y0:y1, x0:x1], config=config, output_type=pytesseract.Output.DICT
+    )
+    words = []
+    for i, raw in enumerate(data["text"]):
+        text = raw.strip()
+        if not text:
+            continue
+        x, y = data["left"][i], data["top"][i]
+        w, h = data["width"][i], data["height"][i]
+        # Partial word on an edge shared with another tile
+        if (
+            (x0 > 0 and x <= EDGE_MARGIN)
+            or (y0 > 0 and y <= EDGE_MARGIN)
+            or (x1 < width and x + w >= x1 - x0 - EDGE_MARGIN)
+            or (y1 < height and y + h >= y1 - y0 - EDGE_MARGIN)
+        ):
+            continue
+        words.append(
+            {
+                "text": text,
+                "x": x + x0,
+                "y": y + y0,
+                "w": w,
+                "h": h,
+                "conf": float(data["conf"][i]),
+            }
+        )
+    return words
+
+
+def _overlap(a, b):
+    ix = min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"])
+    iy = min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    smaller = min(a["w"] * a["h"], b["w"] * b["h"]) or 1
+    return ix * iy / smaller
+
+
+def dedupe_words(words, cell=TILE_OVERLAP):
+    """Drop repeats of the same text at the same place, keeping the most confident."""
+    kept = []
+    grid = {}
+    for word in sorted(words, key=lambda w: -w["conf"]):
+        cx = int((word["x"] + word["w"] / 2) // cell)
+        cy = int((word["y"] + word["h"] / 2) // cell)
+        text = word["text"].lower()
+        duplicate = any(
+            other["text"].lower() == text and _overlap(word, other) >= DUPLICATE_OVERLAP
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for other in grid.get((cx + dx, cy + dy), ())
         )
-        rows.append([text, x, y, w, h])
+        if not duplicate:
+            grid.setdefault((cx, cy), []).append(word)
+            kept.append(word)
+    # Back to reading order, as a single image_to_data pass would give
+    kept.sort(key=lambda w: (w["y"], w["x"]))
+    return kept
+
+
+def ocr_words(img, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, workers=None, config=""):
+    """Word boxes (text, x, y, w, h, conf) for a whole image array."""
+    height, width = img.shape[:2]
+    tiles = tile_grid(width, height, tile_size, overlap)
+    if len(tiles) == 1:
+        return _ocr_tile(img, tiles[0], (width, height), config)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tiles)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(lambda t: _ocr_tile(img, t, (width, height), config), tiles)
+        words = [w for part in parts for w in part]
+    return dedupe_words(words)
+
+
+def ocr_params(tile, overlap, upscale, deskew, config=""):
+    """Everything besides the image that changes what OCR returns (the cache key)."""
+    return {
+        "tile": tile,
+        "overlap": overlap,
+        "upscale": upscale,
+        "deskew": deskew,
+        "threshold": [THRESHOLD_BLOCK, THRESHOLD_C],
+        "max_skew": MAX_SKEW_DEG,
+        "config": config,
+        "tesseract": str(pytesseract.get_tesseract_version()),
+    }
+
+
+def run_ocr(image_path, args, metrics):
+    """Preprocess and OCR the image; returns an ocr_cache entry, or None if unreadable."""
+    src = load_image(image_path)
+    if src is None:
+        return None
+    print(f"✅ Loaded image size: {src.shape}")
+    with metrics.measure("preprocess", rows_in=src.shape[0] * src.shape[1]):
+        prep = preprocess(src, upscale=args.upscale, deskew=not args.no_deskew)
+    img = prep.image
+    if prep.angle:
+        print(f"📐 Deskewed by {prep.angle:.2f}°")
+
+    n_tiles = len(tile_grid(img.shape[1], img.shape[0], args.tile, args.overlap))
+    print(f"🔍 Running OCR on floorplan image ({n_tiles} tile(s))...")
+    with metrics.measure("pytesseract.image_to_data", rows_in=n_tiles) as rec:
+        words = ocr_words(img, args.tile, args.overlap, args.workers)
+        rec["rows_out"] = len(words)
+    return {
+        "scale": prep.scale,
+        "angle": prep.angle,
+        "matrix": prep.matrix.tolist(),
+        "words": words,
+    }
+
+
+def write_rows(words, output_csv):
+    with open(output_csv, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS_OUT)
+        for w in words:
+            writer.writerow([w["text"], w["x"], w["y"], w["w"], w["h"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR the floorplan image.")
+    parser.add_argument("job", nargs="?", default="job-0001")
+    parser.add_argument("--tile", type=int, default=TILE_SIZE, help="Tile size in px")
+    parser.add_argument("--overlap", type=int, default=TILE_OVERLAP)
+    parser.add_argument("--workers", type=int, help="Parallel tesseract runs (default: CPUs)")
+    parser.add_argument("--upscale", type=float, default=1.0, help="Enlarge before OCR")
+    parser.add_argument("--no-deskew", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-run OCR")
+    args = parser.parse_args()
+
+    ctx = JobContext.of(args.job)
+    metrics = get_job_metrics(ctx.job_id)
+    image_path = ctx.floorplan_image
+    output_csv = ctx.ocr_rooms_csv
+
+    if not image_path.exists():
+        print(f"❌ Could not load image: {image_path}")
+        sys.exit(1)
+
+    params = ocr_params(args.tile, args.overlap, args.upscale, not args.no_deskew)
+    key = ocr_cache.ocr_key(ocr_cache.image_digest(image_path), params)
+    entry = None if args.no_cache else ocr_cache.get(key)
+    if entry:
+        print(f"♻️ Reusing cached OCR for {image_path.name} ({len(entry['words'])} words)")
+    else:
+        entry = run_ocr(image_path, args, metrics)
+        if entry is None:
+            print(f"❌ Could not load image: {image_path}")
+            sys.exit(1)
+        entry["params"] = params
+        ocr_cache.put(key, entry)
+    ocr_cache.remember(image_path, key)
+
+    # Save raw OCR results
+    write_rows(ocr_cache.scaled_words(entry), output_csv)
+    metrics.write(ctx.metrics_json)
+    print(f"✅ OCR results saved to: {output_csv}")
 
-# Save raw OCR results
-with open(output_csv, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["Room Name", "X", "Y", "Width", "Height"])
-    for row in rows:
-        writer.writerow(row)
 
-print(f"✅ OCR results saved to: {output_csv}")
+if __name__ == "__main__":
+    main()
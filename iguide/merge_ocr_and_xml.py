@@ -1,14 +1,23 @@
 import csv
 import sys
+from pathlib import Path
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-xml_file = f"out/{job_id}_room_data.csv"
-ocr_file = f"out/{job_id}_ocr_grouped_with_dimensions.csv"
-out_file = f"out/{job_id}_room_data_merged.csv"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-# Load XML rooms
-with open(xml_file, newline="") as f:
-    xml_rooms = list(csv.DictReader(f))
+from iguide.export_room_data import load_rows
+from mytools.job_context import JobContext
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+ocr_file = ctx.ocr_grouped_csv
+out_file = ctx.room_data_merged_csv
+
+# Load XML rooms (cached parsed plan, or the exported room CSV)
+xml_rooms = load_rows(ctx)
+if not xml_rooms:
+    print(f"❌ No iGUIDE XML or room data CSV for {ctx.job_id}")
+    sys.exit(1)
 
 # Load OCR room dimensions
 ocr_map = {}
@@ -1,11 +1,18 @@
 import csv
 import os
 import sys
+from pathlib import Path
 
-job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
-xml_file = f"out/{job_id}_room_data.csv"
-ocr_file = f"out/{job_id}_ocr_rooms.csv"
-output_file = f"out/{job_id}_room_data_validated.csv"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide.export_room_data import load_rows
+from mytools.job_context import JobContext
+
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+ocr_file = ctx.ocr_rooms_csv
+output_file = ctx.room_data_validated_csv
 
 # Load OCR room names
 ocr_rooms = []
@@ -19,10 +26,11 @@ with open(ocr_file, newline="") as f:
 ocr_set = set(ocr_rooms)
 print(f"📦 Rooms detected in OCR: {len(ocr_set)}")
 
-# Load XML room data
-with open(xml_file, newline="") as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
+# Load XML room data (cached parsed plan, or the exported room CSV)
+rows = load_rows(ctx)
+if not rows:
+    print(f"❌ No iGUIDE XML or room data CSV for {ctx.job_id}")
+    sys.exit(1)
 
 # Try to validate XML room names
 for row in rows:
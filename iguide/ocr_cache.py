@@ -0,0 +1,195 @@
+"""
+Floorplan OCR results, cached across jobs and runs.
+
+An entry is keyed by the SHA-256 of the image plus every setting that can
+change what tesseract reads (preprocessing, tiling, tesseract config and
+version), and stores the word boxes with their confidences:
+
+  cache/ocr/<key>.json  {"params", "scale", "angle", "matrix", "words": [{text, x, y, w, h, conf}]}
+
+Boxes are in preprocessed-image pixels; "matrix" is the 2x3 affine transform
+preprocessing applied (upscale and deskew rotation), and scaled_words()
+inverts it to map boxes back onto the original image. index.json remembers each image's hash by path/size/
+mtime (so a known image isn't rehashed) and the key it was last OCR'd with,
+which is how group_ocr_with_dimensions.py finds a job's words via latest().
+
+The directory is capped at CLAIM_AI_OCR_CACHE_MB (default 256) megabytes;
+least recently used entries are evicted first.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+CACHE_ROOT = ROOT / "cache" / "ocr"
+MAX_BYTES = int(os.environ.get("CLAIM_AI_OCR_CACHE_MB", "256")) * 1024 * 1024
+# Bump when the entry layout changes so old entries are ignored
+FORMAT = 2
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _entry_file(key: str, root: Path) -> Path:
+    return root / f"{key}.json"
+
+
+def _load_index(root: Path) -> dict:
+    try:
+        return json.loads((root / "index.json").read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _atomic_write(text: str, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _save_index(index: dict, root: Path) -> None:
+    _atomic_write(json.dumps(index, indent=2), root / "index.json")
+
+
+def _seen(index: dict, image_path: Path):
+    """Index entry for image_path if the file is unchanged since it was hashed."""
+    st = image_path.stat()
+    seen = index.get(str(image_path))
+    if seen and seen["size"] == st.st_size and seen["mtime_ns"] == st.st_mtime_ns:
+        return seen
+    return None
+
+
+def image_digest(image_path, root: Path = CACHE_ROOT) -> str:
+    """SHA-256 of the image, reusing the index entry while size/mtime match."""
+    image_path = Path(image_path).resolve()
+    index = _load_index(root)
+    seen = _seen(index, image_path)
+    if seen:
+        return seen["sha256"]
+    st = image_path.stat()
+    digest = file_sha256(image_path)
+    index[str(image_path)] = {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": digest,
+    }
+    _save_index(index, root)
+    return digest
+
+
+def ocr_key(digest: str, params: dict) -> str:
+    blob = json.dumps({"format": FORMAT, "image": digest, **params}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def get(key: str, root: Path = CACHE_ROOT):
+    """Cached entry for key, or None. A hit counts as a use for LRU eviction."""
+    path = _entry_file(key, root)
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable OCR cache {path.name}: {e}")
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+
+def put(key: str, entry: dict, root: Path = CACHE_ROOT, max_bytes: int = MAX_BYTES) -> None:
+    _atomic_write(json.dumps(entry), _entry_file(key, root))
+    evict(root, max_bytes, keep=key)
+
+
+def evict(root: Path = CACHE_ROOT, max_bytes: int = MAX_BYTES, keep: str = None) -> int:
+    """Delete least recently used entries until the cache fits max_bytes."""
+    entries = []
+    for p in root.glob("*.json"):
+        if p.name == "index.json" or p.stem == keep:
+            continue
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    if keep and _entry_file(keep, root).exists():
+        total += _entry_file(keep, root).stat().st_size
+    removed = 0
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def remember(image_path, key: str, root: Path = CACHE_ROOT) -> None:
+    """Record key as the latest OCR of image_path (see latest())."""
+    image_path = Path(image_path).resolve()
+    image_digest(image_path, root)
+    index = _load_index(root)
+    index[str(image_path)]["latest"] = key
+    _save_index(index, root)
+
+
+def latest(image_path, root: Path = CACHE_ROOT):
+    """Entry of the last OCR run on this image, if the image hasn't changed since."""
+    image_path = Path(image_path).resolve()
+    if not image_path.exists():
+        return None
+    seen = _seen(_load_index(root), image_path)
+    if not seen or "latest" not in seen:
+        return None
+    return get(seen["latest"], root)
+
+
+def invert_affine(m) -> list:
+    """Inverse of a 2x3 affine matrix (as cv2.invertAffineTransform)."""
+    (a, b, tx), (c, d, ty) = m
+    det = a * d - b * c
+    ia, ib, ic, id_ = d / det, -b / det, -c / det, a / det
+    return [[ia, ib, -(ia * tx + ib * ty)], [ic, id_, -(ic * tx + id_ * ty)]]
+
+
+def scaled_words(entry: dict) -> list:
+    """The entry's words with boxes in original-image pixels.
+
+    A deskewed box comes back tilted, so the result is the upright box
+    around its four mapped corners.
+    """
+    scale = entry.get("scale") or 1.0
+    (a, b, tx), (c, d, ty) = invert_affine(
+        entry.get("matrix") or [[scale, 0.0, 0.0], [0.0, scale, 0.0]]
+    )
+    words = []
+    for w in entry["words"]:
+        corners = [
+            (x, y)
+            for x in (w["x"], w["x"] + w["w"])
+            for y in (w["y"], w["y"] + w["h"])
+        ]
+        xs = [a * x + b * y + tx for x, y in corners]
+        ys = [c * x + d * y + ty for x, y in corners]
+        x0, y0 = round(min(xs)), round(min(ys))
+        words.append(
+            {**w, "x": x0, "y": y0, "w": round(max(xs)) - x0, "h": round(max(ys)) - y0}
+        )
+    return words
@@ -1,41 +1,296 @@
-import os
+"""
+Streaming iGUIDE XML parser.
+
+iter_records() walks the export with iterparse and yields Level, Vertex,
+Room, Wall (with its Openings) and Coordinates records as their elements
+close, dropping each element once it has been read, so memory stays flat
+on large multi-level plans. parse_plan() collects the records into a Plan.
+
+Element ids look like "SKT42" while cross references (wallIDs, roomIDs,
+vertexIDs) use the bare number, so records are keyed by that number
+(Room.ref, Wall.ref, Vertex.ref).
+
+Usage:
+  python3 iguide/parse_iguide.py job-0001
+"""
+
+import re
+import sys
 import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+
+# Opening type codes used by iGUIDE exports
+OPENING_DOOR = "2"
+
+
+def _ref(element_id: str) -> str:
+    return element_id[3:] if element_id.startswith("SKT") else element_id
+
+
+def _ids(value) -> tuple:
+    return tuple((value or "").split())
+
+
+_SPACE = re.compile(r"\s")
+
+
+def _floats(text: str, chunk: int = 1 << 20) -> array:
+    """Parse a long whitespace-separated number list a slice at a time."""
+    values = array("d")
+    start, n = 0, len(text)
+    while start < n:
+        end = n
+        if start + chunk < n:
+            m = _SPACE.search(text, start + chunk)
+            end = m.start() if m else n
+        values.extend(map(float, text[start:end].split()))
+        start = end
+    return values
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Level(NamedTuple):
+    id: str
+    document: int
+    floor_elevation_mm: Optional[float]
+
+    @property
+    def ref(self):
+        return _ref(self.id)
+
+
+class Vertex(NamedTuple):
+    id: str
+    level: str
+    coord_index: int
+    wall_ids: tuple
+
+    @property
+    def ref(self):
+        return _ref(self.id)
+
+
+class Opening(NamedTuple):
+    id: str
+    coord_index: tuple
+    type: str
+
+    @property
+    def is_door(self):
+        return self.type == OPENING_DOOR
+
+
+class Wall(NamedTuple):
+    id: str
+    level: str
+    room_ids: tuple
+    vertex_ids: tuple
+    thickness_mm: Optional[float]
+    openings: tuple
+
+    @property
+    def ref(self):
+        return _ref(self.id)
+
+
+class Room(NamedTuple):
+    id: str
+    level: str
+    name: str
+    ceiling_height_mm: Optional[float]
+    wall_ids: tuple
+
+    @property
+    def ref(self):
+        return _ref(self.id)
+
+
+class Coordinates(NamedTuple):
+    """Flat x, y, z list (sketch units) that vertex and opening coord indexes point into."""
+
+    document: int
+    values: array
+
+
+@dataclass
+class Plan:
+    source: str = ""
+    levels: dict = field(default_factory=dict)
+    vertices: dict = field(default_factory=dict)
+    rooms: list = field(default_factory=list)
+    walls: dict = field(default_factory=dict)
+    coordinates: dict = field(default_factory=dict)
+
+    def add(self, record) -> None:
+        if isinstance(record, Room):
+            self.rooms.append(record)
+        elif isinstance(record, Wall):
+            self.walls[record.ref] = record
+        elif isinstance(record, Vertex):
+            self.vertices[record.ref] = record
+        elif isinstance(record, Level):
+            self.levels[record.ref] = record
+        elif isinstance(record, Coordinates):
+            self.coordinates[record.document] = record.values
+
+    def coords_for(self, level: str) -> array:
+        """Coordinate list of the document a level (by ref) belongs to."""
+        return self.coordinates.get(self.levels[level].document, array("d"))
+
+    def point(self, level: str, index: int) -> tuple:
+        values = self.coords_for(level)
+        return tuple(values[3 * index : 3 * index + 3])
+
+    def room_walls(self, room: Room) -> list:
+        return [self.walls[w] for w in room.wall_ids if w in self.walls]
+
+    # Pickled as plain tuples per record kind: several times faster to load
+    # than one object per record (see iguide/plan_cache.py)
+    def __getstate__(self):
+        return {
+            "source": self.source,
+            "levels": [tuple(r) for r in self.levels.values()],
+            "vertices": [tuple(r) for r in self.vertices.values()],
+            "rooms": [tuple(r) for r in self.rooms],
+            "walls": [(*w[:5], [tuple(o) for o in w.openings]) for w in self.walls.values()],
+            "keys": (list(self.levels), list(self.vertices), list(self.walls)),
+            "coordinates": self.coordinates,
+        }
+
+    def __setstate__(self, state):
+        level_keys, vertex_keys, wall_keys = state["keys"]
+        self.source = state["source"]
+        self.levels = dict(zip(level_keys, map(Level._make, state["levels"])))
+        self.vertices = dict(zip(vertex_keys, map(Vertex._make, state["vertices"])))
+        self.rooms = list(map(Room._make, state["rooms"]))
+        self.walls = dict(
+            zip(
+                wall_keys,
+                (
+                    Wall(*w[:5], tuple(map(Opening._make, w[5])))
+                    for w in state["walls"]
+                ),
+            )
+        )
+        self.coordinates = state["coordinates"]
+
+
+def iter_records(xml_path):
+    """Yield plan records in document order without building the whole tree."""
+    stack = []
+    rooms_open = 0  # a room's label is a descendant, so keep its subtree until it closes
+    document = -1
+    level = ""
+    openings = []
+    for event, elem in ET.iterparse(str(xml_path), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            stack.append(elem)
+            if tag == "SKETCHROOM":
+                rooms_open += 1
+            elif tag == "SKETCHDOCUMENT":
+                document += 1
+            elif tag == "SKETCHLEVEL":
+                level = _ref(elem.get("id", ""))
+                yield Level(
+                    elem.get("id", ""), document, _float(elem.get("floorElevation"))
+                )
+            continue
+
+        stack.pop()
+        if tag == "SKETCHLEVELVERTEX":
+            yield Vertex(
+                elem.get("id", ""),
+                level,
+                int(elem.get("vertex", -1)),
+                _ids(elem.get("wallIDs")),
+            )
+        elif tag == "SKETCHWALLOPENING":
+            openings.append(
+                Opening(
+                    elem.get("id", ""),
+                    tuple(int(i) for i in _ids(elem.get("coordIndex"))),
+                    elem.get("type", ""),
+                )
+            )
+        elif tag == "SKETCHWALL":
+            yield Wall(
+                elem.get("id", ""),
+                level,
+                _ids(elem.get("roomIDs")),
+                _ids(elem.get("vertexIDs")),
+                _float(elem.get("thickness")),
+                tuple(openings),
+            )
+            openings = []
+        elif tag == "SKETCHROOM":
+            rooms_open -= 1
+            label = elem.find(".//SKETCHCDATACHILD")
+            name = label.text.strip() if label is not None and label.text else ""
+            yield Room(
+                elem.get("id", "Unknown"),
+                level,
+                name or "Unnamed",
+                _float(elem.get("ceilingHeight")),
+                _ids(elem.get("wallIDs")),
+            )
+        elif tag == "COORDINATE3":
+            yield Coordinates(document, _floats(elem.text or ""))
+
+        # Drop every finished element (and its parent's reference to it) so
+        # the root never accumulates subtrees; inside a room, the room does it
+        if not rooms_open:
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
 
-# === Setup ===
-iguide_folder = "data/job-0001/iguide"
-xml_file = None
+def parse_plan(xml_path) -> Plan:
+    plan = Plan(source=str(xml_path))
+    for record in iter_records(xml_path):
+        plan.add(record)
+    return plan
 
-# Find the XML file
-for f in os.listdir(iguide_folder):
-    if f.lower().endswith(".xml"):
-        xml_file = os.path.join(iguide_folder, f)
-        break
 
-if not xml_file:
-    print("❌ No iGUIDE XML file found.")
-    exit()
+def find_xml(job):
+    """The job's iGUIDE XML, or None if there isn't one."""
+    xml_file = JobContext.of(job).iguide_xml
+    return xml_file if xml_file.exists() else None
 
-# Parse the XML
-tree = ET.parse(xml_file)
-root = tree.getroot()
 
-rooms = []
+def main():
+    ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+    xml_file = find_xml(ctx)
+    if not xml_file:
+        print("❌ No iGUIDE XML file found.")
+        sys.exit(1)
 
-# Look for SKETCHROOM tags
-for room in root.findall(".//SKETCHROOM"):
-    room_id = room.get("id", "Unknown")
-    ceiling = room.get("ceilingHeight", "Unknown")
-    wall_ids = room.get("wallIDs", "")
+    # Through the plan cache so the pickled classes belong to iguide.parse_iguide
+    from iguide.plan_cache import load_plan
 
-    label = room.find(".//SKETCHCDATACHILD")
-    name = label.text.strip() if label is not None and label.text else "Unnamed"
+    plan = load_plan(xml_file)
 
-    rooms.append({"id": room_id, "name": name, "ceiling": ceiling, "walls": wall_ids})
+    print(f"\n🧾 Parsed {len(plan.rooms)} rooms:\n")
+    for r in plan.rooms:
+        ceiling = "Unknown" if r.ceiling_height_mm is None else f"{r.ceiling_height_mm:g}"
+        walls = " ".join(r.wall_ids)
+        print(f"🏠 Room: {r.name} | ID: {r.id} | Ceiling: {ceiling} | Walls: {walls}")
 
-# Display the parsed results
-print(f"\n🧾 Parsed {len(rooms)} rooms:\n")
 
-for r in rooms:
-    print(
-        f"🏠 Room: {r['name']} | ID: {r['id']} | Ceiling: {r['ceiling']} | Walls: {r['walls']}"
-    )
+if __name__ == "__main__":
+    main()
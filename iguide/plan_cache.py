@@ -0,0 +1,180 @@
+"""
+Parsed iGUIDE plans, cached by the SHA-256 of the XML.
+
+load_plan(xml_path) returns the Plan pickled at cache/plans/<sha256>.pickle,
+parsing (and storing) it only the first time a given XML is seen. The
+XML's hash is remembered by path/size/mtime in cache/plans/index.json, so
+loading a known plan is a stat and an unpickle, not a reparse.
+
+The upload handlers call invalidate(folder) after saving new files, which
+drops the index entries and cached plans of XMLs under that folder.
+Updates to index.json are serialized on an flock (cache/plans/index.lock).
+
+The directory is capped at CLAIM_AI_PLAN_CACHE_MB (default 256) megabytes;
+least recently used plans are evicted first.
+"""
+
+import contextlib
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from iguide.parse_iguide import parse_plan
+
+CACHE_ROOT = ROOT / "cache" / "plans"
+MAX_BYTES = int(os.environ.get("CLAIM_AI_PLAN_CACHE_MB", "256")) * 1024 * 1024
+# Bump when the Plan model changes so old pickles are ignored
+FORMAT = 2
+
+
+def xml_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _plan_file(digest: str, root: Path) -> Path:
+    return root / f"{digest}.v{FORMAT}.pickle"
+
+
+@contextlib.contextmanager
+def _index_locked(root: Path):
+    """Exclusive flock around a read-modify-write of index.json (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / "index.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _load_index(root: Path) -> dict:
+    try:
+        return json.loads((root / "index.json").read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _save_index(index: dict, root: Path) -> None:
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / f"index.json.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(index, indent=2), encoding="utf-8")
+    os.replace(tmp, root / "index.json")
+
+
+def _atomic_dump(obj, path: Path) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def plan_key(xml_path, root: Path = CACHE_ROOT) -> str:
+    """SHA-256 of the XML, reusing the index entry while size/mtime match."""
+    xml_path = Path(xml_path).resolve()
+    st = xml_path.stat()
+    seen = _load_index(root).get(str(xml_path))
+    if seen and seen["size"] == st.st_size and seen["mtime_ns"] == st.st_mtime_ns:
+        return seen["sha256"]
+    digest = xml_sha256(xml_path)
+    # Re-read under the lock so concurrent jobs don't drop each other's entries
+    with _index_locked(root):
+        index = _load_index(root)
+        index[str(xml_path)] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+        }
+        _save_index(index, root)
+    return digest
+
+
+def load_plan(xml_path, root: Path = CACHE_ROOT, max_bytes: int = MAX_BYTES):
+    """The parsed Plan for xml_path, from the cache when this XML was seen before."""
+    digest = plan_key(xml_path, root)
+    cached = _plan_file(digest, root)
+    try:
+        with open(cached, "rb") as f:
+            # Unpickling allocates lots of small tuples; don't let the GC rescan them
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                plan = pickle.load(f)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+        try:
+            os.utime(cached)  # a hit counts as a use for LRU eviction
+        except OSError:
+            pass
+        return plan
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable plan cache {cached.name}: {e}")
+
+    plan = parse_plan(xml_path)
+    root.mkdir(parents=True, exist_ok=True)
+    _atomic_dump(plan, cached)
+    evict(root, max_bytes, keep=cached)
+    return plan
+
+
+def evict(root: Path = CACHE_ROOT, max_bytes: int = MAX_BYTES, keep: Path = None) -> int:
+    """Delete least recently used plans until the cache fits max_bytes."""
+    entries = []
+    total = 0
+    for p in root.glob("*.pickle"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        if p != keep:
+            entries.append((st.st_mtime_ns, st.st_size, p))
+    removed = 0
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def invalidate(folder, root: Path = CACHE_ROOT) -> int:
+    """Forget cached plans for XMLs under folder; returns how many were dropped."""
+    folder = Path(folder).resolve()
+    with _index_locked(root):
+        index = _load_index(root)
+        dropped = {
+            path: entry
+            for path, entry in index.items()
+            if Path(path) == folder or folder in Path(path).parents
+        }
+        if not dropped:
+            return 0
+        for path in dropped:
+            del index[path]
+        still_used = {entry["sha256"] for entry in index.values()}
+        for entry in dropped.values():
+            if entry["sha256"] not in still_used:
+                _plan_file(entry["sha256"], root).unlink(missing_ok=True)
+        _save_index(index, root)
+    return len(dropped)
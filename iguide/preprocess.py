@@ -0,0 +1,94 @@
+"""
+Floorplan image preprocessing for OCR, done in memory with OpenCV/NumPy.
+
+preprocess(img) turns a BGR or grayscale array into a black-text-on-white
+binary array ready for tesseract:
+
+  grayscale -> optional upscale -> adaptive threshold -> deskew
+
+Nothing is written to disk; label_floorplan.py passes the result straight
+to OCR. The returned matrix (upscale and deskew rotation together) lets
+callers map word boxes back onto the original image.
+"""
+
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+# Adaptive threshold neighbourhood (odd, px) and offset below the local mean
+THRESHOLD_BLOCK = 31
+THRESHOLD_C = 15
+# Only correct skew within this range; larger angles are layout, not scan tilt
+MAX_SKEW_DEG = 10.0
+MIN_SKEW_DEG = 0.1
+
+
+class Preprocessed(NamedTuple):
+    image: np.ndarray  # uint8, 0 = ink, 255 = paper
+    scale: float  # preprocessed px per original px
+    angle: float  # degrees the image was rotated to deskew it
+    matrix: np.ndarray  # 2x3 affine, original px -> preprocessed px
+
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def binarize(gray: np.ndarray, block=THRESHOLD_BLOCK, c=THRESHOLD_C) -> np.ndarray:
+    return cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block | 1, c
+    )
+
+
+def skew_angle(bw: np.ndarray) -> float:
+    """Tilt of the ink's bounding rectangle, in (-45, 45] degrees."""
+    ink = cv2.findNonZero(255 - bw)
+    if ink is None or len(ink) < 10:
+        return 0.0
+    angle = cv2.minAreaRect(ink)[2]
+    # minAreaRect's angle range differs between OpenCV releases
+    return ((angle + 45.0) % 90.0) - 45.0
+
+
+def rotation_matrix(shape, angle: float) -> np.ndarray:
+    h, w = shape[:2]
+    return cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+
+
+def rotate(bw: np.ndarray, angle: float) -> np.ndarray:
+    h, w = bw.shape[:2]
+    m = rotation_matrix(bw.shape, angle)
+    return cv2.warpAffine(
+        bw, m, (w, h), flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT,
+        borderValue=255,
+    )
+
+
+def preprocess(img: np.ndarray, upscale: float = 1.0, deskew: bool = True) -> Preprocessed:
+    """Binary, deskewed (and optionally upscaled) copy of img for OCR."""
+    gray = to_gray(img)
+    scale = float(upscale or 1.0)
+    if scale != 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    bw = binarize(gray)
+    matrix = np.array([[scale, 0.0, 0.0], [0.0, scale, 0.0]])
+    angle = skew_angle(bw) if deskew else 0.0
+    if MIN_SKEW_DEG <= abs(angle) <= MAX_SKEW_DEG:
+        rot = rotation_matrix(bw.shape, angle)
+        bw = rotate(bw, angle)
+        # Upscale first, then rotate about the upscaled image's centre
+        matrix = np.hstack([rot[:, :2] * scale, rot[:, 2:]])
+    else:
+        angle = 0.0
+    return Preprocessed(bw, scale, angle, matrix)
+
+
+def load_image(path) -> np.ndarray:
+    """Read an image file into a BGR array; None if it can't be decoded."""
+    data = np.fromfile(str(path), dtype=np.uint8)
+    return cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
@@ -0,0 +1,89 @@
+"""
+Grid-hash helpers for grouping OCR word boxes on a floorplan.
+
+Boxes are (x, y, w, h) in image pixels. GridIndex buckets boxes into
+fixed-size cells so a neighbourhood query only looks at the few cells
+around it; cluster_boxes() uses it to join boxes whose horizontal and
+vertical gaps are within (rx, ry), in near-linear time.
+"""
+
+from collections import defaultdict
+
+
+def gap(a, b):
+    """Horizontal and vertical empty space between two boxes (0 if they overlap)."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    gx = max(bx - (ax + aw), ax - (bx + bw), 0)
+    gy = max(by - (ay + ah), ay - (by + bh), 0)
+    return gx, gy
+
+
+def center(box):
+    x, y, w, h = box
+    return x + w / 2, y + h / 2
+
+
+class GridIndex:
+    def __init__(self, cell_w, cell_h=None):
+        self.cell_w = max(1, cell_w)
+        self.cell_h = max(1, cell_h or cell_w)
+        self.cells = defaultdict(list)
+
+    def _span(self, x0, y0, x1, y1):
+        for cx in range(int(x0 // self.cell_w), int(x1 // self.cell_w) + 1):
+            for cy in range(int(y0 // self.cell_h), int(y1 // self.cell_h) + 1):
+                yield cx, cy
+
+    def insert(self, key, box):
+        x, y, w, h = box
+        for cell in self._span(x, y, x + w, y + h):
+            self.cells[cell].append(key)
+
+    def near(self, box, rx=0, ry=0):
+        """Keys of boxes in the cells touched by box grown by (rx, ry); may include far ones."""
+        x, y, w, h = box
+        seen = set()
+        for cell in self._span(x - rx, y - ry, x + w + rx, y + h + ry):
+            for key in self.cells.get(cell, ()):
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+
+def cluster_boxes(boxes, rx, ry):
+    """Lists of box indexes, grouping boxes chained by gaps <= rx across and <= ry down."""
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = GridIndex(rx * 2 or 1, ry * 2 or 1)
+    for i, box in enumerate(boxes):
+        for j in index.near(box, rx, ry):
+            gx, gy = gap(box, boxes[j])
+            if gx <= rx and gy <= ry:
+                parent[find(i)] = find(j)
+        index.insert(i, box)
+
+    groups = defaultdict(list)
+    for i in range(len(boxes)):
+        groups[find(i)].append(i)
+    return list(groups.values())
+
+
+def nearest(index, boxes, box, radius, taken=()):
+    """Key of the box in index whose center is closest to box's, within radius."""
+    cx, cy = center(box)
+    best, best_d = None, radius * radius
+    for key in index.near(box, radius, radius):
+        if key in taken:
+            continue
+        kx, ky = center(boxes[key])
+        d = (kx - cx) ** 2 + (ky - cy) ** 2
+        if d <= best_d:
+            best, best_d = key, d
+    return best
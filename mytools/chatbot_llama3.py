@@ -1,13 +1,19 @@
-import subprocess
+import sys
 from pathlib import Path
 
-from flask import Flask, render_template, request
+from flask import Flask, jsonify, render_template, request
 
 app = Flask(__name__)
 
 # Paths
 APP_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = APP_ROOT / "data"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from tools.jobs_blueprint import jobsbp, submit
+
+app.register_blueprint(jobsbp)
 
 
 @app.route("/")
@@ -46,23 +52,14 @@ def new_claim():
             if p and p.filename:
                 (photos_dir / p.filename).write_bytes(p.read())
 
-        # --- Auto run pipeline ---
-        try:
-            result = subprocess.run(
-                ["python3", str(APP_ROOT / "run_pipeline.py"), job_id],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            output_html = f"<pre>{result.stdout}</pre>"
-            if result.stderr:
-                output_html += f"<pre style='color:red;'>{result.stderr}</pre>"
-        except Exception as e:
-            output_html = f"<p style='color:red;'>Error running pipeline: {e}</p>"
+        # --- Queue pipeline run (returns immediately) ---
+        entry = submit(job_id, job_dir=base)
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify(entry), 202
 
         return f"""
-        <h3 class='ok'>✅ Claim {job_id} uploaded & processed!</h3>
-        <div>{output_html}</div>
+        <h3 class='ok'>✅ Claim {job_id} uploaded — pipeline queued (#{entry['id']})</h3>
+        <p>Status: <a href="{entry['url']}">{entry['url']}</a></p>
         <p><a href="/">Back to Home</a></p>
         """
 
@@ -1,26 +1,34 @@
+import sys
+from pathlib import Path
+
+import cv2
 import pytesseract
-from PIL import Image, ImageEnhance
 
-img_path = "data/job-0001/iguide/3938584280.JPG"
-output_path = "out/bw_debug.jpg"
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
 
-# Load image
-img = Image.open(img_path)
+from iguide.preprocess import load_image, preprocess
+from mytools.job_context import JobContext
 
-# Convert to grayscale
-img = img.convert("L")
+ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+img_path = ctx.floorplan_image
+output_path = ctx.out("floorplan_preprocessed.png")
 
-# Increase contrast
-img = ImageEnhance.Contrast(img).enhance(2.5)
+# Load image
+img = load_image(img_path) if img_path.exists() else None
+if img is None:
+    print(f"❌ Could not load image: {img_path}")
+    sys.exit(1)
 
-# Convert to black-and-white using a threshold
-bw = img.point(lambda x: 0 if x < 180 else 255, "1")
+# Grayscale, adaptive threshold and deskew, all in memory
+prep = preprocess(img)
 
-# Save debug output
-bw.save(output_path)
-print(f"✅ Saved high-contrast image: {output_path}")
+# Save debug output (lossless, per job)
+cv2.imwrite(str(output_path), prep.image)
+print(f"✅ Saved high-contrast image: {output_path} (deskewed {prep.angle:.2f}°)")
 
 # Run OCR and show text
-text = pytesseract.image_to_string(bw)
+text = pytesseract.image_to_string(prep.image)
 print("🔎 OCR Output:")
 print(text)
@@ -0,0 +1,158 @@
+"""
+Per-job path resolution shared by every pipeline stage.
+
+All generated files for a job live under out/<job_id>/ so concurrent runs
+never write to the same file. Inputs are looked up in the job's own folders
+(data/<job_id>/, uploads/<job_id>/ or an explicit job folder).
+"""
+
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+OUT_ROOT = BASE / "out"
+DATA_ROOT = BASE / "data"
+UPLOADS_ROOT = BASE / "uploads"
+
+
+class JobContext:
+    def __init__(self, job_id: str, out_dir=None, job_dir=None):
+        self.job_id = job_id
+        self.out_dir = Path(out_dir).resolve() if out_dir else OUT_ROOT / job_id
+        # Where the job's inputs were uploaded, in lookup order
+        self.input_dirs = []
+        if job_dir:
+            self.input_dirs.append(Path(job_dir).resolve())
+        for d in (DATA_ROOT / job_id, UPLOADS_ROOT / job_id):
+            if d not in self.input_dirs:
+                self.input_dirs.append(d)
+
+    @classmethod
+    def of(cls, job):
+        """Accept an existing context or a bare job id / job folder path."""
+        if isinstance(job, cls):
+            return job
+        job = str(job or "job-0001").rstrip("/")
+        if "/" in job:
+            return cls(Path(job).name, job_dir=job)
+        return cls(job)
+
+    def __repr__(self):
+        return f"JobContext({self.job_id!r}, out_dir={str(self.out_dir)!r})"
+
+    # --- generic helpers ---
+    def out(self, name: str) -> Path:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        return self.out_dir / name
+
+    def find_input(self, *names: str) -> Path:
+        """First existing file among names in the input dirs, then out_dir."""
+        for d in self.input_dirs + [self.out_dir]:
+            for name in names:
+                p = d / name
+                if p.exists():
+                    return p
+        return self.input_dirs[0] / names[0]
+
+    # --- room data ---
+    @property
+    def room_data_csv(self) -> Path:
+        return self.out(f"{self.job_id}_room_data.csv")
+
+    @property
+    def room_data_merged_csv(self) -> Path:
+        return self.out(f"{self.job_id}_room_data_merged.csv")
+
+    @property
+    def room_data_validated_csv(self) -> Path:
+        return self.out(f"{self.job_id}_room_data_validated.csv")
+
+    @property
+    def manual_room_dims_csv(self) -> Path:
+        return self.out(f"{self.job_id}_manual_room_dims.csv")
+
+    @property
+    def ocr_rooms_csv(self) -> Path:
+        return self.out(f"{self.job_id}_ocr_rooms.csv")
+
+    @property
+    def ocr_grouped_csv(self) -> Path:
+        return self.out(f"{self.job_id}_ocr_grouped_with_dimensions.csv")
+
+    # --- estimate chain ---
+    @property
+    def estimate_csv(self) -> Path:
+        return self.out("estimate_xact.csv")
+
+    @property
+    def estimate_notes_csv(self) -> Path:
+        return self.out("estimate_xact_with_notes.csv")
+
+    @property
+    def estimate_merged_csv(self) -> Path:
+        return self.out("estimate_xact_merged.csv")
+
+    @property
+    def estimate_final_csv(self) -> Path:
+        return self.out("estimate_xact_final.csv")
+
+    @property
+    def estimate_qa_csv(self) -> Path:
+        return self.out("estimate_policy_QA.csv")
+
+    @property
+    def estimate_import_csv(self) -> Path:
+        return self.out("estimate_xact_import.csv")
+
+    @property
+    def estimate_preview_html(self) -> Path:
+        return self.out("estimate_preview.html")
+
+    # --- detections ---
+    @property
+    def detections_csv(self) -> Path:
+        return self.out(f"{self.job_id}_detections.csv")
+
+    @property
+    def detections_dir(self) -> Path:
+        d = self.out("detections")
+        d.mkdir(exist_ok=True)
+        return d
+
+    # --- run metrics ---
+    @property
+    def metrics_json(self) -> Path:
+        return self.out("metrics.json")
+
+    # --- job inputs ---
+    @property
+    def iguide_xml(self) -> Path:
+        """The iGUIDE export (iguide/, floorplan/ or the job folder itself)."""
+        for d in self.input_dirs:
+            for sub in (d / "iguide", d / "floorplan", d):
+                if sub.is_dir():
+                    found = sorted(p for p in sub.iterdir() if p.suffix.lower() == ".xml")
+                    if found:
+                        return found[0]
+        return self.input_dirs[0] / "iguide" / "floorplan.xml"
+
+    @property
+    def floorplan_image(self) -> Path:
+        """The floorplan image exported alongside the iGUIDE XML."""
+        for d in self.input_dirs:
+            for sub in (d / "iguide", d / "floorplan"):
+                if sub.is_dir():
+                    found = sorted(
+                        p for p in sub.iterdir()
+                        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+                    )
+                    if found:
+                        return found[0]
+        return self.input_dirs[0] / "iguide" / "floorplan.jpg"
+
+    @property
+    def policy_summary_json(self) -> Path:
+        return self.find_input("policy_summary.json")
+
+    @property
+    def job_metadata_json(self) -> Path:
+        return self.find_input("job_metadata.json", "meta.json")
@@ -0,0 +1,365 @@
+"""
+SQLite-backed queue of pipeline runs for the web interfaces.
+
+The Flask apps call enqueue() and return right away with the queue id;
+worker processes started with
+
+  python3 -m mytools.job_queue --workers 4
+
+claim queued runs one at a time and execute them in-process through
+run_batch.run_job. ensure_workers() starts that worker service on demand
+if it isn't already running, so the web apps keep working standalone. The
+service holds an flock on queue/workers.lock while it runs, and starting
+one is serialized on queue/workers.spawn.lock (mytools/service_lock.py).
+The service restarts workers that die and fails the run they were on.
+
+While a run executes, the runner's stage and log events are appended to
+the events table so the web apps can stream progress (see events_since).
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from mytools import service_lock
+
+QUEUE_DIR = BASE / "queue"
+DB_PATH = QUEUE_DIR / "jobs.sqlite3"
+PID_FILE = QUEUE_DIR / "workers.pid"
+LOCK_FILE = QUEUE_DIR / "workers.lock"
+SPAWN_LOCK = QUEUE_DIR / "workers.spawn.lock"
+LOG_ROOT = BASE / "logs"
+
+POLL_SECONDS = 0.5
+SUPERVISE_SECONDS = 2.0
+DEFAULT_WORKERS = int(os.environ.get("CLAIM_AI_WORKERS", "2"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    job_dir TEXT,
+    out_dir TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    worker TEXT,
+    log TEXT,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_queue ON events(queue_id, id);
+"""
+
+
+# Databases this process has already created the schema in
+_initialized = set()
+
+
+def init_db(db_path: Path = DB_PATH) -> None:
+    """Create the tables (and switch the file to WAL) if that hasn't happened yet."""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with contextlib.closing(sqlite3.connect(db_path, timeout=30, isolation_level=None)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    _initialized.add(db_path)
+
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    # The schema is created once per process, not on every (SSE poll) connect
+    if db_path not in _initialized:
+        init_db(db_path)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _as_dict(row):
+    if row is None:
+        return None
+    d = dict(row)
+    d["result"] = json.loads(d["result"]) if d.get("result") else None
+    return d
+
+
+def enqueue(job: str, job_dir=None, out_dir=None) -> int:
+    with contextlib.closing(connect()) as conn:
+        cur = conn.execute(
+            "INSERT INTO jobs (job, job_dir, out_dir, created) VALUES (?, ?, ?, ?)",
+            (
+                job,
+                str(job_dir) if job_dir else None,
+                str(out_dir) if out_dir else None,
+                time.time(),
+            ),
+        )
+        return cur.lastrowid
+
+
+def get(queue_id: int):
+    with contextlib.closing(connect()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (queue_id,)).fetchone()
+    return _as_dict(row)
+
+
+def recent(limit: int = 50):
+    with contextlib.closing(connect()) as conn:
+        rows = conn.execute(
+            "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [_as_dict(r) for r in rows]
+
+
+def position(queue_id: int) -> int:
+    """How many queued runs are ahead of this one."""
+    with contextlib.closing(connect()) as conn:
+        (n,) = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?",
+            (queue_id,),
+        ).fetchone()
+    return n
+
+
+def add_event(conn: sqlite3.Connection, queue_id: int, event: dict) -> None:
+    conn.execute(
+        "INSERT INTO events (queue_id, ts, type, data) VALUES (?, ?, ?, ?)",
+        (queue_id, time.time(), event.get("type", "log"), json.dumps(event)),
+    )
+
+
+def events_since(queue_id: int, after: int = 0, limit: int = 500):
+    """Events for one run with id > after, oldest first."""
+    with contextlib.closing(connect()) as conn:
+        rows = conn.execute(
+            "SELECT id, ts, data FROM events WHERE queue_id = ? AND id > ? "
+            "ORDER BY id LIMIT ?",
+            (queue_id, after, limit),
+        ).fetchall()
+    out = []
+    for row in rows:
+        event = json.loads(row["data"])
+        event["id"] = row["id"]
+        event["ts"] = row["ts"]
+        out.append(event)
+    return out
+
+
+def claim_next(conn: sqlite3.Connection, worker: str):
+    """Atomically move the oldest queued run to 'running' and return it."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        log = LOG_ROOT / f"run_{row['job']}_{int(time.time())}.log"
+        conn.execute(
+            "UPDATE jobs SET status = 'running', started = ?, worker = ?, log = ? WHERE id = ?",
+            (time.time(), worker, str(log.relative_to(BASE)), row["id"]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    add_event(conn, row["id"], {"type": "status", "status": "running"})
+    return get(row["id"])
+
+
+def finish(conn: sqlite3.Connection, queue_id: int, result: dict) -> None:
+    conn.execute(
+        "UPDATE jobs SET status = ?, finished = ?, error = ?, result = ? WHERE id = ?",
+        (
+            "done" if result.get("ok") else "failed",
+            time.time(),
+            result.get("error") or None,
+            json.dumps(result),
+            queue_id,
+        ),
+    )
+    add_event(
+        conn,
+        queue_id,
+        {
+            "type": "status",
+            "status": "done" if result.get("ok") else "failed",
+            "seconds": result.get("seconds"),
+            "error": result.get("error") or None,
+        },
+    )
+
+
+def _pid_alive(pid: int) -> bool:
+    """True if pid is a live mytools.job_queue process (not a reused PID)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    try:
+        cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+    except OSError:
+        return True  # no /proc here; trust the signal check
+    return b"mytools.job_queue" in cmdline
+
+
+def requeue_stale(conn: sqlite3.Connection) -> int:
+    """Put runs whose worker process died back in the queue."""
+    host = socket.gethostname()
+    stale = []
+    for row in conn.execute("SELECT id, worker FROM jobs WHERE status = 'running'"):
+        w_host, _, w_pid = (row["worker"] or "").rpartition(":")
+        if w_host == host and w_pid.isdigit() and not _pid_alive(int(w_pid)):
+            stale.append(row["id"])
+    for queue_id in stale:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL, worker = NULL WHERE id = ?",
+            (queue_id,),
+        )
+    return len(stale)
+
+
+def fail_worker(conn: sqlite3.Connection, worker: str, error: str) -> int:
+    """Mark the runs a dead worker had claimed as failed."""
+    rows = conn.execute(
+        "SELECT id, job FROM jobs WHERE status = 'running' AND worker = ?", (worker,)
+    ).fetchall()
+    for row in rows:
+        finish(conn, row["id"], {"job": row["job"], "ok": False, "error": error})
+    return len(rows)
+
+
+def execute(entry: dict, conn: sqlite3.Connection) -> dict:
+    """Run one queued pipeline job in this process, recording its events."""
+    if str(BASE) not in sys.path:
+        sys.path.insert(0, str(BASE))
+    import run_batch
+
+    return run_batch.run_job(
+        entry["job_dir"] or entry["job"],
+        out_dir=entry["out_dir"],
+        log=BASE / entry["log"],
+        on_event=lambda event: add_event(conn, entry["id"], event),
+    )
+
+
+def worker_loop(stop_after_idle=None) -> None:
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect()
+    idle_since = time.time()
+    while True:
+        entry = claim_next(conn, worker)
+        if entry is None:
+            if stop_after_idle is not None and time.time() - idle_since > stop_after_idle:
+                return
+            time.sleep(POLL_SECONDS)
+            continue
+        try:
+            result = execute(entry, conn)
+        except Exception as e:
+            result = {"job": entry["job"], "ok": False, "error": f"worker error: {e}"}
+        finish(conn, entry["id"], result)
+        idle_since = time.time()
+
+
+def serve(workers: int = DEFAULT_WORKERS) -> None:
+    """Run `workers` worker processes until interrupted."""
+    QUEUE_DIR.mkdir(parents=True, exist_ok=True)
+    if not service_lock.hold(LOCK_FILE):
+        print(f"⚠️ Pipeline workers already running ({LOCK_FILE.relative_to(BASE)} is locked)")
+        return
+    PID_FILE.write_text(str(os.getpid()))
+    init_db()
+    conn = connect()
+    n = requeue_stale(conn)
+    if n:
+        print(f"♻️ Re-queued {n} run(s) left behind by dead workers")
+
+    def start_worker():
+        p = multiprocessing.Process(target=worker_loop, daemon=True)
+        p.start()
+        return p
+
+    procs = [start_worker() for _ in range(workers)]
+    # Treat `kill` like Ctrl-C so the workers go down with the service
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"🚀 {workers} pipeline worker(s) polling {DB_PATH.relative_to(BASE)}")
+    host = socket.gethostname()
+    try:
+        while True:
+            time.sleep(SUPERVISE_SECONDS)
+            for i, p in enumerate(procs):
+                if p.is_alive():
+                    continue
+                # The run it was on most likely killed it (OOM, segfault), so
+                # fail it rather than re-queue it into the next worker
+                n = fail_worker(
+                    conn, f"{host}:{p.pid}", f"worker exited with code {p.exitcode}"
+                )
+                print(f"💀 Worker {p.pid} exited ({p.exitcode}); failed {n} run(s), restarting")
+                procs[i] = start_worker()
+    except (KeyboardInterrupt, SystemExit):
+        for p in procs:
+            p.terminate()
+    finally:
+        try:
+            if PID_FILE.read_text().strip() == str(os.getpid()):
+                PID_FILE.unlink()
+        except OSError:
+            pass
+        conn.close()
+
+
+def ensure_workers(workers: int = DEFAULT_WORKERS) -> None:
+    """Start the worker service in the background unless one is running."""
+    # The lock, not workers.pid, says whether the service is up: a stale pid
+    # file can name a reused PID, and check-then-spawn must be atomic
+    with service_lock.spawning(SPAWN_LOCK):
+        if service_lock.is_held(LOCK_FILE):
+            return
+        LOG_ROOT.mkdir(parents=True, exist_ok=True)
+        with open(LOG_ROOT / "job_workers.log", "ab") as log:
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "mytools.job_queue", "--workers", str(workers)],
+                cwd=str(BASE),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        # Hold the spawn lock until the service owns its lock so we don't double-start
+        service_lock.wait_held(LOCK_FILE, proc, timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline queue workers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    serve(max(1, args.workers))
+
+
+if __name__ == "__main__":
+    main()
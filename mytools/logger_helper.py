@@ -3,6 +3,8 @@ import pathlib
 
 import yaml
 
+from mytools.metrics import JobMetrics
+
 BASE = pathlib.Path(__file__).resolve().parents[1]
 LOG_ROOT = BASE / "logs"
 LOG_ROOT.mkdir(parents=True, exist_ok=True)
@@ -15,10 +17,13 @@ def get_job_logger(job_id: str) -> logging.Logger:
     if logger.handlers:
         return logger
 
+    # Per-job stage/heavy-call timings ride along with the logger
+    logger.metrics = JobMetrics(job_id)
+
     logger.setLevel(logging.INFO)
 
     # File handler (append)
-    file_handler = logging.FileHandler(LOG_ROOT / f"{job_id}.log", mode="a")
+    file_handler = logging.FileHandler(LOG_ROOT / f"{job_id}.log", mode="a", delay=True)
     formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
@@ -29,3 +34,23 @@ def get_job_logger(job_id: str) -> logging.Logger:
     logger.addHandler(stream_handler)
 
     return logger
+
+
+def get_job_metrics(job_id: str) -> JobMetrics:
+    return get_job_logger(job_id).metrics
+
+
+def release_job_logger(job_id: str) -> None:
+    """Close a finished job's handlers and forget its logger (and metrics).
+
+    Long-lived workers run many jobs; without this every job's logger, file
+    handle and recorded metrics would stay in memory for the process's life.
+    """
+    logger_name = f"claim_ai.{job_id}"
+    logger = logging.Logger.manager.loggerDict.pop(logger_name, None)
+    if not isinstance(logger, logging.Logger):
+        return
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.__dict__.pop("metrics", None)
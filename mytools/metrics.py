@@ -0,0 +1,199 @@
+"""
+Per-job timing and resource metrics.
+
+Every pipeline stage and heavy call (OCR, YOLO, PDF text extraction) is
+wrapped in JobMetrics.measure(), which records wall time, CPU time, memory
+and rows in/out. Memory is per step even in long-lived processes (queue
+workers, batch pools): rss_bytes is the resident set size when the step
+ends, and peak_rss_growth_bytes is how far the step pushed the process's
+lifetime peak (ru_maxrss) up, 0 if it stayed under an earlier peak. JobMetrics.write() merges the records into
+out/<job_id>/metrics.json (one section per script, so separate scripts for
+the same job don't overwrite each other), holding an flock on the sidecar
+metrics.json.lock so concurrent writers can't drop each other's sections.
+
+Set CLAIM_AI_PROM_DIR to also write Prometheus text-format files
+(claim_ai_<job>.prom) there for a node_exporter textfile collector.
+
+Get the instance for a job via mytools.logger_helper.get_job_metrics().
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+    import resource
+except ImportError:  # Windows
+    fcntl = resource = None
+
+PROM_DIR_ENV = "CLAIM_AI_PROM_DIR"
+
+# Records sharing (scope, kind, name), e.g. one "model.predict" per batch,
+# are folded into one series each: (help, "sum" or "max")
+PROM_FIELDS = {
+    "wall_seconds": ("Wall-clock seconds, summed over calls", "sum"),
+    "cpu_seconds": ("Process CPU seconds, summed over calls", "sum"),
+    "rss_bytes": ("Resident set size when the step ended, max over calls", "max"),
+    "peak_rss_growth_bytes": ("Rise in the process's peak RSS during the step, max over calls", "max"),
+    "rows_in": ("Rows (or items) consumed, summed over calls", "sum"),
+    "rows_out": ("Rows (or items) produced, summed over calls", "sum"),
+}
+
+
+def peak_rss_bytes():
+    """The process's peak resident set size so far (its whole lifetime)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def rss_bytes():
+    """Current resident set size; None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class JobMetrics:
+    def __init__(self, job_id: str, scope: str = None):
+        self.job_id = job_id
+        self.scope = scope or Path(sys.argv[0] or "python").stem or "python"
+        self.records = []
+
+    def reset(self, scope: str = None):
+        """Drop recorded timings (e.g. before re-running a job in the same process)."""
+        self.records = []
+        if scope:
+            self.scope = scope
+
+    @contextlib.contextmanager
+    def measure(self, name: str, kind: str = "call", rows_in=None):
+        """
+        Time the enclosed block. The yielded dict can be updated by the
+        caller, e.g. rec["rows_out"] = len(rows).
+        """
+        rec = {
+            "scope": self.scope,
+            "kind": kind,
+            "name": name,
+            "started": time.time(),
+            "rows_in": rows_in,
+            "rows_out": None,
+            "ok": True,
+        }
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        peak0 = peak_rss_bytes()
+        try:
+            yield rec
+        except BaseException:
+            rec["ok"] = False
+            raise
+        finally:
+            rec["wall_seconds"] = round(time.perf_counter() - wall0, 6)
+            rec["cpu_seconds"] = round(time.process_time() - cpu0, 6)
+            rec["rss_bytes"] = rss_bytes()
+            peak = peak_rss_bytes()
+            rec["peak_rss_growth_bytes"] = None if peak is None else peak - peak0
+            self.records.append(rec)
+
+    def call(self, name: str, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) under measure() and return its result."""
+        with self.measure(name, kind="call"):
+            return fn(*args, **kwargs)
+
+    # --- output ---
+    def write(self, path: Path) -> Path:
+        """Merge this scope's records into the job's metrics JSON file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _locked(path.with_suffix(path.suffix + ".lock")):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                data = {}
+            scopes = data.get("scopes", {})
+            scopes[self.scope] = {"updated": time.time(), "records": self.records}
+            data = {"job": self.job_id, "updated": time.time(), "scopes": scopes}
+            tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            os.replace(tmp, path)
+
+            prom_dir = os.environ.get(PROM_DIR_ENV)
+            if prom_dir:
+                write_prometheus(data, Path(prom_dir) / f"claim_ai_{self.job_id}.prom")
+        return path
+
+
+@contextlib.contextmanager
+def _locked(lock_path: Path):
+    """Exclusive flock on lock_path for the block (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _aggregate(data: dict) -> dict:
+    """{(scope, kind, name): {"calls": n, field: sum or max, ...}} over every record."""
+    series = {}
+    for scope in data.get("scopes", {}).values():
+        for rec in scope.get("records", []):
+            agg = series.setdefault((rec["scope"], rec["kind"], rec["name"]), {"calls": 0})
+            agg["calls"] += 1
+            for field, (_, how) in PROM_FIELDS.items():
+                value = rec.get(field)
+                if value is None:
+                    continue
+                if field not in agg:
+                    agg[field] = value
+                elif how == "max":
+                    agg[field] = max(agg[field], value)
+                else:
+                    agg[field] += value
+    return series
+
+
+def to_prometheus(data: dict) -> str:
+    """
+    Render a metrics.json payload in Prometheus text exposition format, one
+    series per (scope, kind, name) so no two samples share a label set.
+    """
+    job = data.get("job", "")
+    series = _aggregate(data)
+    fields = {"calls": ("Number of calls recorded", None), **PROM_FIELDS}
+    lines = []
+    for field, (help_text, _) in fields.items():
+        metric = f"claim_ai_{field}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for (scope, kind, name), agg in series.items():
+            if field not in agg:
+                continue
+            labels = (
+                f'job="{_label(job)}",scope="{_label(scope)}",'
+                f'kind="{_label(kind)}",name="{_label(name)}"'
+            )
+            lines.append(f"{metric}{{{labels}}} {round(agg[field], 6)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(data: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".prom.tmp")
+    tmp.write_text(to_prometheus(data), encoding="utf-8")
+    os.replace(tmp, path)
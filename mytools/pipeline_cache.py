@@ -0,0 +1,112 @@
+"""
+Content-hash cache for run_pipeline.py stages.
+
+Each job keeps a manifest at cache/pipeline/<job_id>/manifest.json with the
+fingerprint of every stage's last run (hash of its code, config, external
+input files and upstream rows) plus the rows it produced. A stage whose
+fingerprint hasn't changed is skipped and its rows are loaded from the cache.
+
+File hashes are remembered by (size, mtime) so unchanged inputs are not
+re-read on every run.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+CACHE_ROOT = BASE / "cache" / "pipeline"
+
+MISSING = "missing"
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_rows(rows) -> str:
+    return hash_bytes(json.dumps(rows, sort_keys=True, default=str).encode("utf-8"))
+
+
+class PipelineCache:
+    def __init__(self, job_id: str, root: Path = CACHE_ROOT):
+        self.dir = root / job_id
+        self.manifest_path = self.dir / "manifest.json"
+        self.manifest = self._load()
+
+    def _load(self) -> dict:
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except Exception:
+            data = {}
+        data.setdefault("files", {})
+        data.setdefault("stages", {})
+        return data
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def file_hash(self, path: Path) -> str:
+        """SHA-256 of a file, reusing the manifest entry while size/mtime match."""
+        key = str(path)
+        try:
+            st = path.stat()
+        except OSError:
+            self.manifest["files"].pop(key, None)
+            return MISSING
+        seen = self.manifest["files"].get(key)
+        if seen and seen["size"] == st.st_size and seen["mtime_ns"] == st.st_mtime_ns:
+            return seen["sha256"]
+        digest = hash_bytes(path.read_bytes())
+        self.manifest["files"][key] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+        }
+        return digest
+
+    def fingerprint(self, files, upstream, extra="") -> str:
+        """Combine file hashes and upstream row hashes into one stage key."""
+        h = hashlib.sha256()
+        for path in files:
+            h.update(f"file:{path}:{self.file_hash(Path(path))}\n".encode("utf-8"))
+        for name, digest in upstream:
+            h.update(f"input:{name}:{digest}\n".encode("utf-8"))
+        h.update(f"extra:{extra}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def lookup(self, stage: str, fingerprint: str):
+        """Return (rows, output_hash) for a cache hit, else None."""
+        entry = self.manifest["stages"].get(stage)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        # Anything the stage wrote to disk must still be there untouched
+        for path, digest in entry.get("products", {}).items():
+            if self.file_hash(Path(path)) != digest:
+                return None
+        try:
+            rows = json.loads((self.dir / f"{stage}.json").read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        return rows, entry["output_hash"]
+
+    def store(self, stage: str, fingerprint: str, rows, products=()) -> str:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(rows, default=str)
+        (self.dir / f"{stage}.json").write_text(payload, encoding="utf-8")
+        output_hash = hash_rows(rows)
+        recorded = {}
+        for path in products:
+            digest = self.file_hash(Path(path))
+            if digest != MISSING:
+                recorded[str(path)] = digest
+        self.manifest["stages"][stage] = {
+            "fingerprint": fingerprint,
+            "output_hash": output_hash,
+            "products": recorded,
+        }
+        return output_hash
@@ -0,0 +1,85 @@
+"""
+flock-based guards for the background services started on demand
+(the job queue workers and the detection server).
+
+A running service holds an exclusive lock on its lock file for as long as
+it lives (hold()). The kernel drops the lock when the process exits, so
+unlike a PID file it can't go stale or point at a PID that has since been
+reused. Clients starting a service take a second lock around the
+"is it running?" check and the Popen (spawning()), so two of them can't
+both decide to start one.
+
+Lock files are never deleted; removing a locked file would let the next
+process lock a fresh inode while the old lock is still held.
+"""
+
+import contextlib
+import fcntl
+import os
+import time
+from pathlib import Path
+
+# Descriptors whose locks this process holds until it exits
+_held = []
+
+
+def _open(path) -> int:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def hold(path, wait: float = 1.0) -> bool:
+    """Lock path for the rest of this process's life; False if another process holds it."""
+    fd = _open(path)
+    deadline = time.monotonic() + wait
+    # is_held() probes take the lock for an instant, so retry briefly
+    while not _try_lock(fd):
+        if time.monotonic() >= deadline:
+            os.close(fd)
+            return False
+        time.sleep(0.05)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    _held.append(fd)
+    return True
+
+
+def is_held(path) -> bool:
+    """True while some process holds path with hold()."""
+    fd = _open(path)
+    try:
+        return not _try_lock(fd)
+    finally:
+        os.close(fd)  # also releases the probe's own lock
+
+
+@contextlib.contextmanager
+def spawning(path):
+    """Exclusive lock on path for the duration of the block (blocks until free)."""
+    fd = _open(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def wait_held(path, proc, timeout: float) -> bool:
+    """Wait for the freshly spawned proc to take path; False if it exits or times out."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_held(path):
+            return True
+        if proc.poll() is not None:
+            return False
+        time.sleep(0.05)
+    return False
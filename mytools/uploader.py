@@ -1,11 +1,18 @@
-import subprocess
+import sys
 from pathlib import Path
 
-from flask import Flask, render_template_string, request
+from flask import Flask, jsonify, render_template_string, request
 
 app = Flask(__name__)
 APP_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = APP_ROOT / "data"
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
+
+from iguide import plan_cache
+from tools.jobs_blueprint import jobsbp, submit
+
+app.register_blueprint(jobsbp)
 
 HTML = """
 <!doctype html>
@@ -45,7 +52,7 @@ HTML = """
     <button type="submit">Upload & Process</button>
   </form>
 
-  <p class="muted">Files will be saved to <code>data/&lt;job_id&gt;/</code>. After upload, the pipeline runs automatically.</p>
+  <p class="muted">Files will be saved to <code>data/&lt;job_id&gt;/</code>. After upload, the pipeline is queued and runs in the background.</p>
 </body>
 </html>
 """
@@ -77,29 +84,20 @@ def upload():
             (ig_dir / floorplan.filename).write_bytes(floorplan.read())
         if xml and xml.filename:
             (ig_dir / xml.filename).write_bytes(xml.read())
+            plan_cache.invalidate(ig_dir)
         for p in photos:
             if p and p.filename:
                 (photos_dir / p.filename).write_bytes(p.read())
 
-        # Auto-run pipeline
-        try:
-            result = subprocess.run(
-                ["python3", str(APP_ROOT / "run_pipeline.py"), job_id],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            stdout = result.stdout or ""
-            stderr = result.stderr or ""
-        except Exception as e:
-            stdout, stderr = "", f"Error running pipeline: {e}"
+        # Queue the pipeline; a background worker picks it up
+        entry = submit(job_id, job_dir=base)
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify(entry), 202
 
         return f"""
-        <h2>✅ Claim {job_id} uploaded & processed</h2>
-        <p>Outputs should be in <code>out/</code> and job data in <code>data/{job_id}/</code>.</p>
-        <h3>Pipeline Output</h3>
-        <pre>{stdout}</pre>
-        {f"<h3 style='color:#b00;'>Errors</h3><pre style='background:#2a0d0d;color:#ffd6d6;'>{stderr}</pre>" if stderr.strip() else ""}
+        <h2>✅ Claim {job_id} uploaded — pipeline queued (#{entry['id']})</h2>
+        <p>Outputs will be in <code>out/{job_id}/</code> and job data in <code>data/{job_id}/</code>.</p>
+        <p>Status: <a href="{entry['url']}">{entry['url']}</a></p>
         <p><a href="/">⬅ Back to upload</a></p>
         """
 
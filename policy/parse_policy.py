@@ -1,39 +1,88 @@
 import json
 import os
+import sys
+from pathlib import Path
 
-import PyPDF2
-
-job_id = "job-0001"
-policy_path = f"data/{job_id}/policy.pdf"
-output_path = f"data/{job_id}/policy_summary.json"
-
-# Read the policy PDF
-with open(policy_path, "rb") as file:
-    reader = PyPDF2.PdfReader(file)
-    full_text = ""
-    for page in reader.pages:
-        full_text += page.extract_text()
-
-# Extract basic coverage terms
-summary = {
-    "ALE_coverage": (
-        "yes" if "additional living expense" in full_text.lower() else "unknown"
-    ),
-    "ordinance_and_law": (
-        "yes" if "ordinance or law" in full_text.lower() else "unknown"
-    ),
-    "mold_limit_found": "yes" if "mold limit" in full_text.lower() else "unknown",
-    "exclusions": [],
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools.job_context import JobContext
+from mytools.logger_helper import get_job_metrics
+from policy import phrase_scanner, policy_cache, policy_index
+
+# Older summary keys (read by estimate/generate_estimate.py) -> phrase keys
+LEGACY_KEYS = {
+    "ALE_coverage": "ALE",
+    "ordinance_and_law": "OrdinanceLaw",
+    "mold_limit_found": "MoldLimit",
 }
 
-# Scan for common exclusions
-for exclusion in ["flood", "earthquake", "wear and tear", "neglect"]:
-    if exclusion in full_text.lower():
-        summary["exclusions"].append(exclusion)
 
-# Save results
-os.makedirs(f"data/{job_id}", exist_ok=True)
-with open(output_path, "w") as f:
-    json.dump(summary, f, indent=2)
+def summarize(conn, policy_path, scanner, metrics, texts):
+    """policy_summary.json contents for a PDF not parsed before; page texts go to texts."""
+
+    def kept(pages):
+        for page in pages:
+            texts.append(page)
+            yield page
+
+    # Read the policy PDF: cached pages reused, the rest extracted in parallel
+    with metrics.measure("PdfReader.pages") as rec:
+        hits, n_pages = scanner.scan_pages(kept(policy_cache.page_texts(conn, policy_path)))
+        rec["rows_out"] = n_pages
+
+    # Coverage, limits ("ALE", "MoldLimit", ...) and exclusions from the phrase hits
+    found = phrase_scanner.summarize(hits, scanner)
+    summary = {
+        old: "yes" if key in found["pages"] else "unknown" for old, key in LEGACY_KEYS.items()
+    }
+    summary.update(found)
+    summary["page_count"] = n_pages
+    summary["hits"] = hits
+    return summary
+
+
+def main():
+    ctx = JobContext.of(sys.argv[1] if len(sys.argv) > 1 else "job-0001")
+    policy_path = ctx.find_input("policy.pdf")
+    output_path = ctx.input_dirs[0] / "policy_summary.json"
+    metrics = get_job_metrics(ctx.job_id)
+
+    scanner = phrase_scanner.load()
+    conn = policy_cache.connect()
+    index = policy_index.connect()
+    try:
+        # Same PDF parsed before (any claim) -> reuse its summary
+        pdf_sha = policy_cache.digest(conn, policy_path)
+        key = policy_cache.document_key(pdf_sha, scanner.digest)
+        summary = policy_cache.get_document(conn, key)
+        texts = []
+        if summary is not None:
+            print("♻️ Policy PDF seen before; reusing its summary")
+        else:
+            summary = summarize(conn, policy_path, scanner, metrics, texts)
+            policy_cache.put_document(conn, key, summary)
+
+        # Page search index (/policy/search)
+        if texts or not policy_index.has_document(index, pdf_sha):
+            with metrics.measure("policy_index.add", rows_in=len(texts)) as rec:
+                texts = texts or list(policy_cache.page_texts(conn, policy_path))
+                policy_index.add_document(index, pdf_sha, texts)
+                rec["rows_out"] = len(texts)
+        policy_index.assign(index, ctx.job_id, pdf_sha, policy_path)
+    finally:
+        index.close()
+        conn.close()
+
+    # Save results
+    os.makedirs(output_path.parent, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    metrics.write(ctx.metrics_json)
+    print(f"✅ Policy summary saved to: {output_path}")
+
 
-print(f"✅ Policy summary saved to: {output_path}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Page-by-page text extraction for policy PDFs.
+
+iter_pages(pdf) yields (page_number, text) in page order as a stream.
+PDFs of PARALLEL_MIN_PAGES or more are split into runs of CHUNK_PAGES
+pages that worker processes extract at the same time (each worker opens
+the PDF itself, so no parsed objects cross process boundaries); smaller
+files are read in-process, where the pool's start-up would cost more than
+it saves. Pass only= to extract a subset of pages.
+
+page_digests(pdf) hashes what extract_text() reads on each page (content
+streams, fonts, form XObjects) without extracting anything, so the same
+form page in two different PDFs gets the same digest.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import PyPDF2
+
+CHUNK_PAGES = 8
+PARALLEL_MIN_PAGES = 16
+# Page entries that affect extracted text (/Parent, /Annots etc. differ per file)
+PAGE_KEYS = ("/Contents", "/Resources", "/Rotate")
+
+
+def page_count(pdf_path) -> int:
+    with open(pdf_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _object_digest(obj, memo) -> bytes:
+    """Stable hash of a PDF object, following references (memoized per object)."""
+    if hasattr(obj, "idnum"):
+        ref = (obj.idnum, obj.generation)
+        if ref not in memo:
+            memo[ref] = b""  # cycle guard
+            memo[ref] = _object_digest(obj.get_object(), memo)
+        return memo[ref]
+    h = hashlib.sha256(type(obj).__name__.encode())
+    if hasattr(obj, "get_data"):
+        h.update(obj.get_data())
+    if isinstance(obj, dict):
+        for key in sorted(obj):
+            if key in ("/Parent", "/P"):
+                continue
+            h.update(key.encode("utf-8", "replace"))
+            h.update(_object_digest(dict.__getitem__(obj, key), memo))
+    elif isinstance(obj, list):
+        for item in list.__iter__(obj):
+            h.update(_object_digest(item, memo))
+    else:
+        h.update(repr(obj).encode("utf-8", "replace"))
+    return h.digest()
+
+
+def page_digests(pdf_path) -> list:
+    """SHA-256 per page of everything its extracted text depends on."""
+    memo = {}
+    digests = []
+    with open(pdf_path, "rb") as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            h = hashlib.sha256()
+            for key in PAGE_KEYS:
+                if key in page:
+                    h.update(key.encode())
+                    h.update(_object_digest(dict.__getitem__(page, key), memo))
+            digests.append(h.hexdigest())
+    return digests
+
+
+def _extract_pages(pdf_path, indexes):
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in indexes]
+
+
+def iter_pages(pdf_path, workers=None, chunk=CHUNK_PAGES, only=None):
+    """Yield (page_number, text), 1-based, in order, as pages are extracted.
+
+    only: 0-based page indexes to extract (default: every page).
+    """
+    pdf_path = str(Path(pdf_path).resolve())
+    indexes = list(range(page_count(pdf_path))) if only is None else sorted(only)
+    if not indexes:
+        return
+    runs = [indexes[i : i + chunk] for i in range(0, len(indexes), chunk)]
+    workers = min(workers or os.cpu_count() or 1, len(runs))
+    if len(indexes) < PARALLEL_MIN_PAGES or workers <= 1:
+        with open(pdf_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            for i in indexes:
+                yield i + 1, reader.pages[i].extract_text() or ""
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_pages, pdf_path, run) for run in runs]
+        for run, future in zip(runs, futures):
+            for i, text in zip(run, future.result()):
+                yield i + 1, text
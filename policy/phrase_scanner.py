@@ -0,0 +1,217 @@
+"""
+Single-pass multi-phrase scanner for policy text.
+
+The phrase dictionary (policy/phrases.yaml) is compiled once into an
+Aho-Corasick automaton, so each page is walked character by character a
+single time however many phrases there are. Matching ignores case, quote
+marks and runs of whitespace (PDF text breaks phrases across lines), and
+only whole words match; hits carry offsets into the original page text.
+
+Every hit is a dict:
+
+  {"kind": "limits", "key": "MoldLimit", "phrase": "mold / fungi",
+   "text": "Mold / Fungi", "page": 12, "offset": 431,
+   "values": [{"text": "$10,000", "amount": 10000.0}, ...]}
+
+"values" (limit phrases only) holds the dollar amounts and percentages
+between the phrase and the next hit on the page, within VALUE_WINDOW chars.
+summarize(hits, scanner) turns them into the keys apply_policy_rules.py reads
+("ALE": true, "MoldLimit": 10000.0, ...).
+"""
+
+import hashlib
+import json
+import re
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+PHRASES_YAML = Path(__file__).with_name("phrases.yaml")
+KINDS = ("coverage", "limits", "exclusions")
+VALUE_WINDOW = 120
+SKIP = frozenset("\"'“”‘’")
+AMOUNT = re.compile(r"\$\s?(?P<amount>\d[\d,]*(?:\.\d+)?)|(?P<percent>\d+(?:\.\d+)?)\s?%")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop quote marks and collapse whitespace, as the scanner sees text."""
+    text = "".join(c for c in text.lower() if c not in SKIP)
+    return " ".join(text.split())
+
+
+def load_dictionary(path=PHRASES_YAML):
+    """[(kind, key, phrase)] in file order."""
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    entries = []
+    for kind in KINDS:
+        for key, phrases in (data.get(kind) or {}).items():
+            for phrase in phrases or []:
+                entries.append((kind, str(key), str(phrase)))
+    return entries
+
+
+class PhraseScanner:
+    def __init__(self, entries):
+        self.entries = []
+        self.lengths = []
+        goto, fail, out = [{}], [0], [[]]
+        seen = set()
+        for kind, key, phrase in entries:
+            norm = normalize(phrase)
+            if not norm or (key, norm) in seen:
+                continue
+            seen.add((key, norm))
+            state = 0
+            for c in norm:
+                nxt = goto[state].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][c] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                state = nxt
+            out[state].append(len(self.entries))
+            self.entries.append((kind, key, phrase))
+            self.lengths.append(len(norm))
+
+        # Failure links, breadth first; each state inherits its fallback's outputs
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for c, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(c, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self.goto, self.fail, self.out = goto, fail, out
+        self.keys = list(dict.fromkeys((kind, key) for kind, key, _ in self.entries))
+        # Identifies the dictionary, for caches of scan results
+        self.digest = hashlib.sha256(json.dumps(self.entries).encode("utf-8")).hexdigest()
+
+    def matches(self, text: str):
+        """[(start, end, entry index)] of whole-word matches, as offsets into text."""
+        lower = text.lower()
+        if len(lower) != len(text):
+            lower = "".join(c.lower()[0] for c in text)
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        found = []
+        pos = []  # original offset of each character the automaton has seen
+        state = 0
+        space = True
+        for i, c in enumerate(lower):
+            if c in SKIP:
+                continue
+            if c.isspace():
+                if space:
+                    continue
+                c = " "
+                space = True
+            else:
+                space = False
+            pos.append(i)
+            while state and c not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(c, 0)
+            for k in out[state]:
+                start, end = pos[-lengths[k]], i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (
+                    end == len(text) or not text[end].isalnum()
+                ):
+                    found.append((start, end, k))
+        return found
+
+    def scan(self, text: str, page=None):
+        """Hit dicts for one page; overlapping synonyms of a key count once (longest)."""
+        found = sorted(self.matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        kept, reach = [], {}
+        for start, end, k in found:
+            key = self.entries[k][:2]
+            if start < reach.get(key, -1):
+                continue
+            reach[key] = end
+            kept.append((start, end, k))
+
+        hits = []
+        for n, (start, end, k) in enumerate(kept):
+            kind, key, phrase = self.entries[k]
+            hit = {
+                "kind": kind,
+                "key": key,
+                "phrase": phrase,
+                "text": text[start:end],
+                "page": page,
+                "offset": start,
+            }
+            if kind == "limits":
+                stop = min([end + VALUE_WINDOW] + [s for s, _, _ in kept[n + 1 :] if s >= end])
+                hit["values"] = values_in(text[end:stop])
+            hits.append(hit)
+        return hits
+
+    def scan_pages(self, pages):
+        """(hits, pages scanned) for a stream of (page_number, text)."""
+        hits = []
+        scanned = 0
+        for number, text in pages:
+            scanned += 1
+            hits.extend(self.scan(text, number))
+        return hits, scanned
+
+
+def values_in(text: str):
+    values = []
+    for m in AMOUNT.finditer(text):
+        if m.group("amount"):
+            values.append({"text": m.group(0), "amount": float(m.group("amount").replace(",", ""))})
+        else:
+            values.append({"text": m.group(0), "percent": float(m.group("percent"))})
+    return values
+
+
+@lru_cache(maxsize=None)
+def _compiled(path: str, mtime_ns: int) -> PhraseScanner:
+    return PhraseScanner(load_dictionary(path))
+
+
+def load(path=PHRASES_YAML) -> PhraseScanner:
+    """Compiled scanner for a phrase file, rebuilt only when the file changes."""
+    path = Path(path).resolve()
+    return _compiled(str(path), path.stat().st_mtime_ns)
+
+
+def summarize(hits, scanner: PhraseScanner):
+    """Policy keys from hits: coverage keys -> True, limit keys -> first $ amount.
+
+    Also {"pages": {key: [page numbers]}, "exclusions": [keys found]}.
+    """
+    pages = {}
+    for h in hits:
+        found = pages.setdefault(h["key"], [])
+        if h["page"] not in found:
+            found.append(h["page"])
+
+    summary = {}
+    for kind, key in scanner.keys:
+        if key not in pages:
+            continue
+        if kind == "coverage":
+            summary[key] = True
+        elif kind == "limits":
+            amounts = [
+                v["amount"]
+                for h in hits
+                if h["key"] == key
+                for v in h.get("values", ())
+                if "amount" in v
+            ]
+            if amounts:
+                summary[key] = amounts[0]
+    summary["exclusions"] = [key for kind, key in scanner.keys if kind == "exclusions" and key in pages]
+    summary["pages"] = pages
+    return summary
@@ -0,0 +1,236 @@
+"""
+Content-addressed cache of policy parsing, shared by every job.
+
+Claims from the same carrier arrive with the same policy forms (HO-3 base
+plus common endorsements), often as the very same PDF. Two levels are kept
+in cache/policy.sqlite3:
+
+  documents: (PDF SHA-256, phrase dictionary) -> finished policy summary
+  pages:     page digest -> extracted text
+
+A PDF seen before is answered from documents without opening it. A new PDF
+is hashed page by page (pdf_pages.page_digests, which is cheap next to
+text extraction); only pages no earlier policy shared, typically the
+declarations, are extracted, and the rest come from pages.
+
+Entries are evicted least recently used first once their total size passes
+CLAIM_AI_POLICY_CACHE_MB (default 128) megabytes. Hit/miss counts per level
+are kept for stats(), served at /policy/cache/stats.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import PyPDF2
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from policy.pdf_pages import iter_pages, page_digests
+
+DB_PATH = ROOT / "cache" / "policy.sqlite3"
+MAX_BYTES = int(os.environ.get("CLAIM_AI_POLICY_CACHE_MB", "128")) * 1024 * 1024
+# Bump when the summary layout changes so old documents are ignored
+FORMAT = 1
+LEVELS = ("document", "page")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    key     TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    bytes   INTEGER NOT NULL,
+    used    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    key   TEXT PRIMARY KEY,
+    text  TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    level  TEXT PRIMARY KEY,
+    hits   INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def digest(conn: sqlite3.Connection, path) -> str:
+    """SHA-256 of a file, reusing the stored one while size/mtime match."""
+    path = Path(path).resolve()
+    st = path.stat()
+    row = conn.execute(
+        "SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (str(path),)
+    ).fetchone()
+    if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+        return row[2]
+    sha = file_sha256(path)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+            (str(path), st.st_size, st.st_mtime_ns, sha),
+        )
+    return sha
+
+
+def _key(**parts) -> str:
+    blob = json.dumps({"format": FORMAT, **parts}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def document_key(pdf_sha: str, dictionary: str) -> str:
+    return _key(pdf=pdf_sha, dictionary=dictionary)
+
+
+def page_key(page_digest: str) -> str:
+    # Text depends on the extractor too
+    return _key(page=page_digest, extractor=getattr(PyPDF2, "__version__", "?"))
+
+
+def count(conn: sqlite3.Connection, level: str, hits: int = 0, misses: int = 0) -> None:
+    with conn:
+        conn.execute(
+            "INSERT INTO stats (level, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT(level) DO UPDATE SET hits = hits + excluded.hits, "
+            "misses = misses + excluded.misses",
+            (level, hits, misses),
+        )
+
+
+def get_document(conn: sqlite3.Connection, key: str):
+    """Cached summary for key, or None. A hit counts as a use for LRU eviction."""
+    row = conn.execute("SELECT summary FROM documents WHERE key = ?", (key,)).fetchone()
+    count(conn, "document", hits=int(row is not None), misses=int(row is None))
+    if row is None:
+        return None
+    with conn:
+        conn.execute("UPDATE documents SET used = ? WHERE key = ?", (time.time(), key))
+    return json.loads(row[0])
+
+
+def put_document(conn: sqlite3.Connection, key: str, summary: dict, max_bytes: int = MAX_BYTES):
+    blob = json.dumps(summary)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (key, summary, bytes, used) VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), time.time()),
+        )
+    evict(conn, max_bytes)
+
+
+def _lookup_pages(conn: sqlite3.Connection, keys) -> dict:
+    found = {}
+    keys = list(dict.fromkeys(keys))
+    for i in range(0, len(keys), 500):
+        chunk = keys[i : i + 500]
+        marks = ",".join("?" * len(chunk))
+        found.update(conn.execute(f"SELECT key, text FROM pages WHERE key IN ({marks})", chunk))
+        with conn:
+            conn.execute(f"UPDATE pages SET used = ? WHERE key IN ({marks})", (time.time(), *chunk))
+    return found
+
+
+def page_texts(conn: sqlite3.Connection, pdf_path, workers=None, max_bytes: int = MAX_BYTES):
+    """Yield (page_number, text) in order, extracting only pages not cached yet."""
+    keys = [page_key(d) for d in page_digests(pdf_path)]
+    known = _lookup_pages(conn, keys)
+    # Identical pages within the PDF are extracted once
+    todo = {}
+    for i, key in enumerate(keys):
+        if key not in known:
+            todo.setdefault(key, i)
+    count(conn, "page", hits=len(keys) - len(todo), misses=len(todo))
+
+    extracted = iter_pages(pdf_path, workers=workers, only=todo.values())
+    new = {}
+    for i, key in enumerate(keys):
+        if key not in known and key not in new:
+            _, new[key] = next(extracted)
+        yield i + 1, known.get(key, new.get(key))
+
+    if new:
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pages (key, text, bytes, used) VALUES (?, ?, ?, ?)",
+                [(k, t, len(t.encode("utf-8")), now) for k, t in new.items()],
+            )
+        evict(conn, max_bytes)
+
+
+def evict(conn: sqlite3.Connection, max_bytes: int = MAX_BYTES) -> int:
+    """Delete least recently used documents/pages until the cache fits max_bytes."""
+    total = sum(
+        conn.execute(f"SELECT COALESCE(SUM(bytes), 0) FROM {t}").fetchone()[0]
+        for t in ("documents", "pages")
+    )
+    if total <= max_bytes:
+        return 0
+    oldest = conn.execute(
+        "SELECT 'documents', key, bytes, used FROM documents "
+        "UNION ALL SELECT 'pages', key, bytes, used FROM pages ORDER BY used"
+    ).fetchall()
+    removed = 0
+    with conn:
+        for table, key, size, _ in oldest:
+            if total <= max_bytes:
+                break
+            conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+    return removed
+
+
+def stats(conn: sqlite3.Connection) -> dict:
+    """Hit rates per level plus what the cache currently holds."""
+    counts = {level: (hits, misses) for level, hits, misses in conn.execute("SELECT * FROM stats")}
+    out = {}
+    for level in LEVELS:
+        hits, misses = counts.get(level, (0, 0))
+        looked = hits + misses
+        out[level] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / looked, 4) if looked else None,
+        }
+    for table in ("documents", "pages"):
+        n, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM {table}").fetchone()
+        out[table] = {"entries": n, "bytes": size}
+    out["max_bytes"] = MAX_BYTES
+    return out
+
+
+if __name__ == "__main__":
+    conn = connect()
+    try:
+        print(json.dumps(stats(conn), indent=2))
+    finally:
+        conn.close()
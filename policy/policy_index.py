@@ -0,0 +1,147 @@
+"""
+Full-text page index over every parsed policy (SQLite FTS5).
+
+parse_policy.py adds each policy's page texts as it parses them, so
+"which page mentions the mold sublimit?" is an index lookup rather than a
+re-read of the PDF:
+
+  cache/policy_index.sqlite3
+    pages(text, pdf, page)   FTS5, porter-stemmed; one row per page per distinct PDF
+    jobs(job, pdf, path)     which PDF each job's policy is
+
+Jobs sharing a policy PDF share its rows. search() takes plain words
+(all must appear) and "quoted phrases", optionally limited to one job,
+and returns ranked pages with a highlighted snippet. It backs
+/policy/search and the chat assistant's policy context.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DB_PATH = ROOT / "cache" / "policy_index.sqlite3"
+LIMIT = 20
+SNIPPET_TOKENS = 16
+TERM = re.compile(r'"([^"]+)"|(\S+)')
+# Ignored when match="any" turns a question into a query
+STOPWORDS = frozenset(
+    "a an and are as at be by does do for from how i in is it my of on or our "
+    "the this to was what when where which who why will with".split()
+)
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text, pdf UNINDEXED, page UNINDEXED, tokenize = 'porter unicode61'
+);
+CREATE TABLE IF NOT EXISTS documents (
+    pdf   TEXT PRIMARY KEY,
+    pages INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    job     TEXT PRIMARY KEY,
+    pdf     TEXT NOT NULL,
+    path    TEXT NOT NULL,
+    indexed REAL NOT NULL
+);
+"""
+
+
+def connect(db_path: Path = DB_PATH) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def has_document(conn: sqlite3.Connection, pdf_sha: str) -> bool:
+    return conn.execute("SELECT 1 FROM documents WHERE pdf = ?", (pdf_sha,)).fetchone() is not None
+
+
+def add_document(conn: sqlite3.Connection, pdf_sha: str, pages) -> None:
+    """Index (page_number, text) pairs for a PDF, replacing any earlier rows."""
+    rows = [(text, pdf_sha, number) for number, text in pages]
+    with conn:
+        conn.execute("DELETE FROM pages WHERE pdf = ?", (pdf_sha,))
+        conn.executemany("INSERT INTO pages (text, pdf, page) VALUES (?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (pdf, pages) VALUES (?, ?)", (pdf_sha, len(rows))
+        )
+
+
+def assign(conn: sqlite3.Connection, job: str, pdf_sha: str, path) -> None:
+    """Point job at an indexed PDF and drop PDFs no job uses any more."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (job, pdf, path, indexed) VALUES (?, ?, ?, ?)",
+            (job, pdf_sha, str(path), time.time()),
+        )
+        orphans = [
+            r[0]
+            for r in conn.execute("SELECT pdf FROM documents WHERE pdf NOT IN (SELECT pdf FROM jobs)")
+        ]
+        for pdf in orphans:
+            conn.execute("DELETE FROM pages WHERE pdf = ?", (pdf,))
+            conn.execute("DELETE FROM documents WHERE pdf = ?", (pdf,))
+
+
+def fts_query(text: str, match: str = "all") -> str:
+    """FTS5 MATCH expression: words and "quoted phrases", all (AND) or any (OR) of them."""
+    terms = []
+    for m in TERM.finditer(text):
+        phrase, word = m.group(1), m.group(2)
+        if word is not None:
+            word = word.strip(".,;:!?()[]{}'\"").lower()
+            if not word or (match == "any" and word in STOPWORDS):
+                continue
+        term = (phrase or word).replace('"', '""')
+        terms.append(f'"{term}"')
+    return (" OR " if match == "any" else " ").join(terms)
+
+
+def search(conn: sqlite3.Connection, text: str, job: str = None, limit: int = LIMIT, match: str = "all"):
+    """Best-matching pages: [{"job", "page", "snippet", "score"}], best first."""
+    query = fts_query(text, match)
+    if not query:
+        return []
+    sql = (
+        "SELECT jobs.job, pages.page, "
+        f"snippet(pages, 0, '[', ']', '…', {SNIPPET_TOKENS}), bm25(pages) "
+        "FROM pages JOIN jobs ON jobs.pdf = pages.pdf WHERE pages MATCH ?"
+    )
+    params = [query]
+    if job:
+        sql += " AND jobs.job = ?"
+        params.append(job)
+    sql += " ORDER BY bm25(pages) LIMIT ?"
+    params.append(limit)
+    return [
+        {"job": j, "page": page, "snippet": " ".join(snip.split()), "score": round(-score, 3)}
+        for j, page, snip, score in conn.execute(sql, params)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search indexed policy pages.")
+    parser.add_argument("query", help='Words and "quoted phrases"')
+    parser.add_argument("--job", help="Only this job's policy")
+    parser.add_argument("--limit", type=int, default=LIMIT)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        print(json.dumps(search(conn, args.query, args.job, args.limit), indent=2, ensure_ascii=False))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
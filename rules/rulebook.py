@@ -0,0 +1,415 @@
+"""
+Compiled rule book: rules/rules.yaml + rules/code_map.yaml.
+
+rules.yaml is data, not code:
+
+  defaults     values used when a room / job doesn't provide one
+  formulas     room quantities, e.g. baseboard_lf: "max(perimeter_lf - door_widths_lf, 0)"
+  room_scopes  line items emitted for every room
+  mappings     line items emitted per detection label (detect/process_images.py)
+  perils       claim assumptions per cause of loss, from job_metadata.json
+
+Every formula / qty_from / peril expression is parsed once and checked
+against a small whitelist (arithmetic, comparisons, and/or/not, x if c else y,
+numbers, strings, names, and calls to FUNCTIONS), then turned into a plain
+Python function taking the names it uses. Those functions are generated as
+one module and compiled together; the marshalled code object and the plan
+around it are cached under cache/rules/, keyed by the YAML contents, so a
+rule book is only checked and compiled once per edit, not per process and
+never per row.
+
+Formulas fill in the quantities a room doesn't already have (rooms carry
+raw measurements such as perimeter_lf; paint_walls_sf etc. are formulas),
+evaluated on first use, so a large rule book only costs what the rooms and
+detections actually touch. A mapping's qty_from sees the detection's
+fields, then its room's quantities. A name nothing provides evaluates as
+None; an expression that then fails (None * 9, division by zero) yields
+None, and the line item falls back to min_if_missing or is skipped. Units
+come from the output, else from code_map.yaml.
+
+  book = rulebook.load()
+  rows = book.estimate(rooms, detections)   # [{"Group", "Item Code", "Qty", "Unit", "Notes"}]
+  book.assumptions(job_metadata)            # claim_assumptions.json contents
+"""
+
+import ast
+import hashlib
+import importlib.util
+import math
+import marshal
+import os
+import pickle
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+RULES_YAML = ROOT / "rules" / "rules.yaml"
+CODE_MAP_YAML = ROOT / "rules" / "code_map.yaml"
+CACHE_ROOT = ROOT / "cache" / "rules"
+# Bump when the plan layout or generated code changes so old entries are ignored
+FORMAT = 2
+FIELDS_OUT = ["Group", "Item Code", "Qty", "Unit", "Notes"]
+
+
+def coalesce(*values):
+    """First value that isn't None."""
+    return next((v for v in values if v is not None), None)
+
+
+FUNCTIONS = {
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "round": round,
+    "ceil": math.ceil,
+    "floor": math.floor,
+    "coalesce": coalesce,
+}
+
+# No ast.Pow: 10 ** 10 ** 10 would hang the compiler's constant folding or the
+# evaluation, and room quantities don't need it
+_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.USub,
+    ast.UAdd,
+    ast.Not,
+    ast.And,
+    ast.Or,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+)
+# Exceptions an expression over missing / odd inputs may raise at run time
+EVAL_ERRORS = (TypeError, ValueError, ZeroDivisionError, OverflowError)
+
+
+class RuleError(ValueError):
+    pass
+
+
+def check_expression(source, where=""):
+    """(normalized source, sorted names) of a whitelisted expression, else RuleError."""
+    try:
+        tree = ast.parse(str(source).strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"{where}: cannot parse {source!r}: {e.msg}") from None
+    calls = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise RuleError(f"{where}: {type(node).__name__} not allowed in {source!r}")
+        if isinstance(node, ast.Constant) and not isinstance(
+            node.value, (int, float, str, bool, type(None))
+        ):
+            raise RuleError(f"{where}: constant {node.value!r} not allowed in {source!r}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise RuleError(f"{where}: only {', '.join(FUNCTIONS)} may be called in {source!r}")
+            if node.keywords:
+                raise RuleError(f"{where}: keyword arguments not allowed in {source!r}")
+            calls.add(id(node.func))
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and id(node) not in calls:
+            if node.id in FUNCTIONS or node.id.startswith("_"):
+                raise RuleError(f"{where}: name {node.id!r} not allowed in {source!r}")
+            names.add(node.id)
+    return ast.unparse(tree), tuple(sorted(names))
+
+
+class _Compiler:
+    """Collects distinct expressions; each becomes one generated function."""
+
+    def __init__(self):
+        self.index = {}
+        self.exprs = []  # (source, args)
+
+    def add(self, source, where):
+        src, args = check_expression(source, where)
+        if src not in self.index:
+            self.index[src] = len(self.exprs)
+            self.exprs.append((src, args))
+        return self.index[src]
+
+    def module_source(self):
+        lines = []
+        for i, (src, args) in enumerate(self.exprs):
+            lines.append(f"def _e{i}({', '.join(args)}):\n    return ({src})\n")
+        return "\n".join(lines)
+
+
+def _code_units(code_map):
+    units = {}
+    for outputs in (code_map or {}).values():
+        for out in outputs or []:
+            if out.get("code") and out.get("unit"):
+                units[str(out["code"])] = str(out["unit"])
+    return units
+
+
+def _outputs(compiler, units, outputs, where):
+    compiled = []
+    for n, out in enumerate(outputs or []):
+        here = f"{where}[{n}]"
+        code = out.get("code")
+        if not code or not out.get("qty_from"):
+            raise RuleError(f"{here}: code and qty_from are required")
+        unit = out.get("unit") or units.get(str(code), "")
+        if out.get("unit") and str(code) in units and units[str(code)] != out["unit"]:
+            print(f"⚠️ {here}: {code} unit {out['unit']} differs from code_map ({units[str(code)]})")
+        compiled.append(
+            {
+                "code": str(code),
+                "qty": compiler.add(out["qty_from"], here),
+                "min": out.get("min_if_missing"),
+                "unit": str(unit),
+                "notes": str(out.get("notes") or ""),
+            }
+        )
+    return compiled
+
+
+def _check_cycles(formulas, args_of):
+    """RuleError if a formula ends up depending on itself."""
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise RuleError(f"formulas: cycle {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in args_of(name):
+            if dep in formulas:
+                visit(dep, path + [name])
+        state[name] = "done"
+
+    for name in formulas:
+        visit(name, [])
+
+
+def build_plan(rules: dict, code_map: dict):
+    """(plan, generated module source) for parsed YAML; raises RuleError."""
+    compiler = _Compiler()
+    units = _code_units(code_map)
+
+    formulas = {}
+    for name, source in (rules.get("formulas") or {}).items():
+        if not str(name).isidentifier() or name in FUNCTIONS:
+            raise RuleError(f"formulas: bad formula name {name!r}")
+        formulas[name] = compiler.add(source, f"formulas.{name}")
+    _check_cycles(formulas, lambda name: compiler.exprs[formulas[name]][1])
+
+    scopes = []
+    for name, scope in (rules.get("room_scopes") or {}).items():
+        scopes += _outputs(compiler, units, (scope or {}).get("outputs"), f"room_scopes.{name}")
+
+    mappings = {}
+    for label, mapping in (rules.get("mappings") or {}).items():
+        mappings[str(label)] = _outputs(
+            compiler, units, (mapping or {}).get("outputs"), f"mappings.{label}"
+        )
+
+    perils = {}
+    for cause, fields in (rules.get("perils") or {}).items():
+        perils[str(cause).lower()] = [
+            (str(field), compiler.add(source, f"perils.{cause}.{field}"))
+            for field, source in (fields or {}).items()
+        ]
+
+    plan = {
+        "defaults": dict(rules.get("defaults") or {}),
+        "formulas": formulas,
+        "scopes": scopes,
+        "mappings": mappings,
+        "perils": perils,
+        "args": [args for _, args in compiler.exprs],
+    }
+    return plan, compiler.module_source()
+
+
+class _Quantities(dict):
+    """
+    A room's values plus defaults; any other name is looked up on first use:
+    a formula is evaluated (once), a detection's scope falls back to its
+    room's quantities, and anything else is None.
+    """
+
+    def __init__(self, book, values, room=None):
+        super().__init__(values)
+        self.book = book
+        self.room = room
+
+    def __missing__(self, name):
+        if self.room is not None:
+            value = self.room[name]
+        else:
+            expr = self.book.formulas.get(name)
+            value = None if expr is None else self.book.value(expr, self)
+        self[name] = value
+        return value
+
+
+class Rulebook:
+    def __init__(self, plan: dict, code):
+        namespace = {"__builtins__": {}, **FUNCTIONS}
+        exec(code, namespace)
+        self.fns = [(namespace[f"_e{i}"], args) for i, args in enumerate(plan["args"])]
+        self.defaults = plan["defaults"]
+        self.formulas = plan["formulas"]
+        self.scopes = plan["scopes"]
+        self.mappings = plan["mappings"]
+        self.perils = plan["perils"]
+
+    def value(self, expr: int, env: dict):
+        fn, args = self.fns[expr]
+        try:
+            return fn(*[env[a] for a in args])
+        except EVAL_ERRORS:
+            return None
+
+    def room_quantities(self, room: dict) -> dict:
+        """
+        Mapping of a room's quantities: its own values, defaults, then formulas
+        for what it lacks, evaluated lazily so only the ones used cost anything.
+        """
+        values = {k: v for k, v in room.items() if v is not None}
+        return _Quantities(self, {**self.defaults, **values})
+
+    def _row(self, group, out, env):
+        qty = self.value(out["qty"], env)
+        if qty is None:
+            qty = out["min"]
+        if qty is None:
+            return None
+        try:
+            qty = round(qty, 2)
+        except EVAL_ERRORS:
+            return None
+        return {
+            "Group": group,
+            "Item Code": out["code"],
+            "Qty": qty,
+            "Unit": out["unit"],
+            "Notes": out["notes"],
+        }
+
+    def estimate(self, rooms, detections=(), room_key="name", id_key="room_id"):
+        """
+        Line items for rooms (dicts of measurements, named by room_key) and
+        detections (dicts with "label", the room under id_key or room_key,
+        and any measurements such as mask_sf): room scopes for every room,
+        then the mapped items for every detection, in input order.
+
+        Rooms are told apart by id_key (else their position), so rooms that
+        share a name (four "Closet"s) keep their own quantities; a detection
+        naming only the room gets the first room of that name.
+        """
+        rows = []
+        by_id, by_name = {}, {}
+        for i, room in enumerate(rooms):
+            env = self.room_quantities(room)
+            group = room.get(room_key, "")
+            by_id[str(room.get(id_key) or f"#{i}")] = (group, env)
+            by_name.setdefault(group, env)
+            for out in self.scopes:
+                row = self._row(group, out, env)
+                if row:
+                    rows.append(row)
+        for det in detections:
+            outputs = self.mappings.get(det.get("label"))
+            if not outputs:
+                continue
+            group = det.get(room_key, "")
+            if det.get(id_key) and str(det[id_key]) in by_id:
+                group, env = by_id[str(det[id_key])]
+            else:
+                env = by_name.get(group)
+                if env is None:
+                    env = by_name[group] = self.room_quantities({})
+            # qty_from sees the detection's fields, then the room's quantities
+            env = _Quantities(self, {k: v for k, v in det.items() if v is not None}, room=env)
+            for out in outputs:
+                row = self._row(group, out, env)
+                if row:
+                    rows.append(row)
+        return rows
+
+    def assumptions(self, metadata: dict) -> dict:
+        """claim_assumptions.json contents for a job's cause of loss."""
+        cause = str(metadata.get("cause") or "").lower()
+        # Job metadata stands in for the room: defaults and formulas apply alike
+        env = self.room_quantities(metadata)
+        return {field: self.value(expr, env) for field, expr in self.perils.get(cause, ())}
+
+
+def _atomic_write(data: bytes, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+_loaded = {}
+
+
+def load(rules_path=RULES_YAML, code_map_path=CODE_MAP_YAML, cache_root: Path = CACHE_ROOT) -> Rulebook:
+    """Compiled rule book for these YAML files, reusing any earlier compile of the same contents."""
+    rules_bytes = Path(rules_path).read_bytes()
+    code_map_bytes = Path(code_map_path).read_bytes() if Path(code_map_path).exists() else b""
+    h = hashlib.sha256(f"{FORMAT}:{importlib.util.MAGIC_NUMBER.hex()}:".encode())
+    h.update(hashlib.sha256(rules_bytes).digest())
+    h.update(hashlib.sha256(code_map_bytes).digest())
+    key = h.hexdigest()
+    if key in _loaded:
+        return _loaded[key]
+
+    cached = cache_root / f"{key}.pickle"
+    try:
+        plan, code = pickle.loads(cached.read_bytes())
+        book = Rulebook(plan, marshal.loads(code))
+    except FileNotFoundError:
+        book = None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable compiled rules {cached.name}: {e}")
+        book = None
+
+    if book is None:
+        plan, source = build_plan(
+            yaml.safe_load(rules_bytes) or {}, yaml.safe_load(code_map_bytes) or {}
+        )
+        code = compile(source, f"<rules {key[:12]}>", "exec")
+        book = Rulebook(plan, code)
+        try:
+            _atomic_write(pickle.dumps((plan, marshal.dumps(code))), cached)
+        except OSError as e:
+            print(f"⚠️ Could not cache compiled rules: {e}")
+    _loaded[key] = book
+    return book
+
+
+if __name__ == "__main__":
+    book = load()
+    print(
+        f"✅ {len(book.formulas)} formulas, {len(book.scopes)} room scope items, "
+        f"{sum(map(len, book.mappings.values()))} mapped items, {len(book.perils)} perils, "
+        f"{len(book.fns)} compiled expressions"
+    )
@@ -0,0 +1,212 @@
+"""
+Run the claim pipeline for many jobs at once.
+
+Usage:
+  python3 run_batch.py "data/job-*" uploads/job-test2 --workers 8
+
+Each argument is a job folder or a glob of job folders (relative to the
+repo root). Jobs fan out across a process pool and write to their own
+out/<job>/ folders. Each job's console output goes to
+logs/run_<job>_<ts>.log and a status line is printed as soon as it
+finishes. An aggregate summary is printed and saved to logs/batch_<ts>.json.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+APP_ROOT = Path(__file__).resolve().parent
+LOGS = APP_ROOT / "logs"
+
+
+def expand_jobs(patterns):
+    """
+    Resolve job folders/globs to a list of directories, one per job id.
+
+    Outputs, the pipeline cache and logs are all keyed by the folder name,
+    so data/job-0001 and uploads/job-0001 can't run in the same batch; the
+    first one listed wins and the other is skipped with a warning.
+    """
+    seen = {}
+    jobs = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if not path.is_absolute():
+            pattern = str(APP_ROOT / pattern)
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for m in matches:
+            p = Path(m).resolve()
+            if not p.is_dir():
+                print(f"⚠️ Not a job folder, skipping: {m}")
+                continue
+            if p.name not in seen:
+                seen[p.name] = p
+                jobs.append(p)
+            elif seen[p.name] != p:
+                print(f"⚠️ Job {p.name} already listed from {seen[p.name]}, skipping: {p}")
+    return jobs
+
+
+class LineTee(io.TextIOBase):
+    """Write-through text stream that also hands each complete line to a callback."""
+
+    def __init__(self, stream, on_line):
+        self.stream = stream
+        self.on_line = on_line
+        self._buf = ""
+
+    def write(self, s):
+        self.stream.write(s)
+        self._buf += s
+        *lines, self._buf = self._buf.split("\n")
+        for line in lines:
+            if line.strip():
+                self.on_line(line)
+        return len(s)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_job(
+    job_dir, debug_csv=False, use_cache=True, out_dir=None, log=None, on_event=None
+):
+    """
+    Worker: run one job in-process, capturing its output to a log file.
+
+    With on_event, stage events from the runner and every printed log line
+    ({"type": "log", "line": ...}) are also passed to the callback as they
+    happen.
+    """
+    import run_pipeline
+    from mytools.job_context import JobContext
+    from mytools.logger_helper import release_job_logger
+
+    job_id = run_pipeline.job_id_from_arg(str(job_dir))
+    job_path = str(job_dir) if "/" in str(job_dir) else None
+    ctx = JobContext(job_id, out_dir=out_dir, job_dir=job_path)
+    LOGS.mkdir(exist_ok=True)
+    log = Path(log) if log else LOGS / f"run_{job_id}_{int(time.time())}.log"
+    start = time.perf_counter()
+    error = ""
+    with log.open("w") as f:
+        out = f
+        if on_event is not None:
+            out = LineTee(f, lambda line: on_event({"type": "log", "line": line}))
+        with contextlib.redirect_stdout(out):
+            try:
+                ok = run_pipeline.run_in_process(
+                    ctx, debug_csv=debug_csv, use_cache=use_cache, on_event=on_event
+                )
+            except Exception as e:
+                ok = False
+                error = str(e)
+                print(f"❌ Exception running pipeline: {e}")
+            finally:
+                # Workers run many jobs; don't keep each one's logger around
+                release_job_logger(job_id)
+    if not ok and not error:
+        error = "pipeline stopped (see log)"
+    return {
+        "job": job_id,
+        "path": str(job_dir),
+        "ok": ok,
+        "seconds": round(time.perf_counter() - start, 3),
+        "log": str(log.relative_to(APP_ROOT)),
+        "error": error,
+    }
+
+
+def summarize(results, wall):
+    times = sorted(r["seconds"] for r in results)
+    failed = [r for r in results if not r["ok"]]
+    summary = {
+        "jobs": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "wall_seconds": round(wall, 3),
+        "jobs_per_minute": round(len(results) / wall * 60, 1) if wall else None,
+        "job_seconds": {
+            "min": times[0] if times else None,
+            "median": times[len(times) // 2] if times else None,
+            "max": times[-1] if times else None,
+        },
+        "failures": [{"job": r["job"], "error": r["error"], "log": r["log"]} for r in failed],
+        "results": results,
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the pipeline for many jobs.")
+    parser.add_argument("jobs", nargs="+", help="Job folders or globs (e.g. 'data/job-*')")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count)",
+    )
+    parser.add_argument("--debug-csv", action="store_true", help="Write intermediate CSVs")
+    parser.add_argument("--force", action="store_true", help="Ignore the stage cache")
+    args = parser.parse_args()
+
+    jobs = expand_jobs(args.jobs)
+    if not jobs:
+        print("❌ No job folders matched.")
+        sys.exit(1)
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"🚀 Running {len(jobs)} job(s) on {workers} worker(s)")
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_job, job, args.debug_csv, not args.force): job
+            for job in jobs
+        }
+        for fut in as_completed(futures):
+            try:
+                res = fut.result()
+            except Exception as e:
+                job = futures[fut]
+                res = {
+                    "job": job.name,
+                    "path": str(job),
+                    "ok": False,
+                    "seconds": 0.0,
+                    "log": "",
+                    "error": f"worker crashed: {e}",
+                }
+            results.append(res)
+            mark = "✅" if res["ok"] else "❌"
+            extra = "" if res["ok"] else f" — {res['error']}"
+            print(
+                f"{mark} [{len(results)}/{len(jobs)}] {res['job']} "
+                f"{res['seconds']:.2f}s (log: {res['log']}){extra}"
+            )
+
+    summary = summarize(results, time.perf_counter() - start)
+    LOGS.mkdir(exist_ok=True)
+    out = LOGS / f"batch_{int(time.time())}.json"
+    out.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    print(
+        f"\n📊 {summary['succeeded']}/{summary['jobs']} succeeded, "
+        f"{summary['failed']} failed in {summary['wall_seconds']}s "
+        f"({summary['jobs_per_minute']} jobs/min)"
+    )
+    for f in summary["failures"]:
+        print(f"   ❌ {f['job']}: {f['error']} ({f['log']})")
+    print(f"📄 Summary saved to: {out.relative_to(APP_ROOT)}")
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,99 @@
+import argparse
+import importlib
 import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import NamedTuple
 
 APP_ROOT = Path(__file__).resolve().parent
+if str(APP_ROOT) not in sys.path:
+    sys.path.insert(0, str(APP_ROOT))
 
-STEPS = [
-    ["python3", str(APP_ROOT / "iguide" / "export_room_data.py")],
-    ["python3", str(APP_ROOT / "estimate" / "generate_room_estimates.py")],
-    ["python3", str(APP_ROOT / "estimate" / "add_justifications.py")],
-    ["python3", str(APP_ROOT / "estimate" / "merge_room_and_estimate.py")],
-    ["python3", str(APP_ROOT / "estimate" / "apply_policy_rules.py")],
-    ["python3", str(APP_ROOT / "estimate" / "export_xactimate_csv.py")],
+from mytools.job_context import JobContext
+from mytools.logger_helper import get_job_metrics
+from mytools.pipeline_cache import PipelineCache
+
+# Config that can change any stage's output; part of every fingerprint
+CONFIG_FILES = [APP_ROOT / "rules" / "rules.yaml", APP_ROOT / "pricing" / "pricing.csv"]
+# Code every stage imports; also part of every fingerprint
+COMMON_DEPS = [APP_ROOT / "mytools" / "job_context.py"]
+
+
+class Stage(NamedTuple):
+    script: Path
+    module: str
+    # (keyword argument of module.run, table name) pairs fed from earlier stages
+    inputs: tuple
+    output: str
+    # Deliverables are always written; intermediates only with --debug-csv
+    keep: bool = False
+    # JobContext path attributes the stage reads from disk
+    files: tuple = ()
+    # JobContext path attributes the stage writes when run with write=True
+    products: tuple = ()
+    # Repo modules / config the stage imports or reads (paths under APP_ROOT)
+    deps: tuple = ()
+
+    @property
+    def name(self):
+        return self.script.stem
+
+
+STAGES = [
+    Stage(
+        APP_ROOT / "iguide" / "export_room_data.py",
+        "iguide.export_room_data",
+        (),
+        "rooms",
+        files=("iguide_xml",),
+        products=("room_data_csv",),
+        deps=("iguide/geometry.py", "iguide/parse_iguide.py", "iguide/plan_cache.py"),
+    ),
+    Stage(
+        APP_ROOT / "estimate" / "generate_room_estimates.py",
+        "estimate.generate_room_estimates",
+        (("rooms", "rooms"),),
+        "estimate",
+        files=("room_data_merged_csv", "detections_csv"),
+        products=("estimate_csv",),
+        deps=("rules/rulebook.py", "rules/code_map.yaml"),
+    ),
+    Stage(
+        APP_ROOT / "estimate" / "add_justifications.py",
+        "estimate.add_justifications",
+        (("rows", "estimate"),),
+        "estimate_with_notes",
+        products=("estimate_notes_csv",),
+    ),
+    Stage(
+        APP_ROOT / "estimate" / "merge_room_and_estimate.py",
+        "estimate.merge_room_and_estimate",
+        (("rows", "estimate"), ("rooms", "rooms")),
+        "estimate_merged",
+        products=("estimate_merged_csv",),
+    ),
+    Stage(
+        APP_ROOT / "estimate" / "apply_policy_rules.py",
+        "estimate.apply_policy_rules",
+        (("rows", "estimate_merged"),),
+        "estimate_final",
+        keep=True,
+        files=("policy_summary_json", "job_metadata_json"),
+        products=("estimate_final_csv", "estimate_qa_csv"),
+    ),
+    Stage(
+        APP_ROOT / "estimate" / "export_xactimate_csv.py",
+        "estimate.export_xactimate_csv",
+        (("rows", "estimate_final"),),
+        "estimate_import",
+        keep=True,
+        products=("estimate_import_csv",),
+    ),
 ]
 
+STEPS = [["python3", str(stage.script)] for stage in STAGES]
+
 
 def run_step(cmd, job_id):
     print(f"\n🔹 Running: {' '.join(cmd)} {job_id}")
@@ -34,15 +115,164 @@ def run_step(cmd, job_id):
         return False
 
 
-def main():
-    job_id = sys.argv[1] if len(sys.argv) > 1 else "job-0001"
+def _ctx_paths(ctx, attrs):
+    return [getattr(ctx, attr) for attr in attrs]
+
+
+def stage_fingerprint(stage, ctx, cache, hashes, write):
+    deps = [APP_ROOT / d for d in stage.deps]
+    files = [stage.script] + CONFIG_FILES + COMMON_DEPS + deps + _ctx_paths(ctx, stage.files)
+    upstream = [(table, hashes[table]) for _, table in stage.inputs]
+    return cache.fingerprint(
+        files, upstream, extra=f"write={write};out={ctx.out_dir}"
+    )
+
+
+def run_stage(stage, ctx, tables, debug_csv=False):
+    """Run one stage in this interpreter, reading and storing rows in `tables`."""
+    name = stage.script.relative_to(APP_ROOT)
+    print(f"\n🔹 Running: {name} {ctx.job_id} (in-process)")
+    try:
+        module = importlib.import_module(stage.module)
+        kwargs = {arg: tables[table] for arg, table in stage.inputs}
+        result = module.run(ctx, write=stage.keep or debug_csv, **kwargs)
+    except (Exception, SystemExit) as e:
+        print(f"❌ Exception running {name}: {e}")
+        return False
+    if result is None:
+        print(f"❌ Step failed: {name}")
+        return False
+    tables[stage.output] = result
+    print(f"✅ Done: {name}")
+    return True
+
+
+def _emit(on_event, **event):
+    if on_event is not None:
+        on_event(event)
+
+
+def run_in_process(job, debug_csv=False, use_cache=True, on_event=None):
+    """
+    Walk STAGES in order. With use_cache, a stage whose fingerprint matches
+    the job's manifest is skipped and its rows come from the cache.
+
+    `job` is a job id, a job folder path or a JobContext. `on_event`, if
+    given, is called with a dict for every stage_start / stage_done.
+    Per-stage timings are written to out/<job>/metrics.json.
+    """
+    ctx = JobContext.of(job)
+    tables = {}
+    hashes = {}
+    cache = PipelineCache(ctx.job_id)
+    metrics = get_job_metrics(ctx.job_id)
+    metrics.reset(scope="pipeline")
+    try:
+        for i, stage in enumerate(STAGES, 1):
+            _emit(
+                on_event,
+                type="stage_start",
+                stage=stage.name,
+                index=i,
+                total=len(STAGES),
+            )
+            start = time.perf_counter()
+            write = stage.keep or debug_csv
+            rows_in = sum(len(tables.get(table, ())) for _, table in stage.inputs)
+            with metrics.measure(stage.name, kind="stage", rows_in=rows_in) as rec:
+                fp = stage_fingerprint(stage, ctx, cache, hashes, write)
+                hit = cache.lookup(stage.name, fp) if use_cache else None
+                rec["cached"] = hit is not None
+                if hit is not None:
+                    tables[stage.output], hashes[stage.output] = hit
+                    print(f"⏭️  Cached: {stage.script.relative_to(APP_ROOT)}")
+                elif run_stage(stage, ctx, tables, debug_csv):
+                    products = _ctx_paths(ctx, stage.products) if write else []
+                    hashes[stage.output] = cache.store(
+                        stage.name, fp, tables[stage.output], products
+                    )
+                else:
+                    rec["ok"] = False
+                if rec["ok"]:
+                    rec["rows_out"] = len(tables[stage.output])
+            if not rec["ok"]:
+                _emit(
+                    on_event,
+                    type="stage_done",
+                    stage=stage.name,
+                    ok=False,
+                    cached=False,
+                    seconds=round(time.perf_counter() - start, 4),
+                )
+                return False
+            _emit(
+                on_event,
+                type="stage_done",
+                stage=stage.name,
+                ok=True,
+                cached=hit is not None,
+                seconds=round(time.perf_counter() - start, 4),
+                rows=rec["rows_out"],
+            )
+    finally:
+        cache.save()
+        metrics.write(ctx.metrics_json)
+    return True
+
+
+def run_subprocess(job_id):
     for cmd in STEPS:
-        ok = run_step(cmd, job_id)
-        if not ok:
-            print("\n⛔ Pipeline stopped due to error above.")
-            break
+        if not run_step(cmd, job_id):
+            return False
+    return True
+
+
+def job_id_from_arg(value):
+    # Accept a bare job id or a job folder path like uploads/job-0001
+    return Path(value.rstrip("/")).name if value else "job-0001"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the claim estimate pipeline.")
+    parser.add_argument("job_id", nargs="?", help="Job ID (default: job-0001)")
+    parser.add_argument("--job", help="Job ID or job folder path")
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Run each step in its own python3 process (legacy mode)",
+    )
+    parser.add_argument(
+        "--debug-csv",
+        action="store_true",
+        help="Also write intermediate CSVs when running in-process",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the stage cache and re-run every step",
+    )
+    parser.add_argument(
+        "--out",
+        help="Output folder for this job (default: out/<job_id>/; not with --subprocess)",
+    )
+    args = parser.parse_args()
+    if args.subprocess and args.out:
+        # The legacy step scripts only take a job id and always write to out/<job_id>/
+        parser.error("--out is not supported with --subprocess")
+    job_arg = args.job or args.job_id or "job-0001"
+    job_id = job_id_from_arg(job_arg)
+    job_dir = job_arg if "/" in job_arg else None
+    ctx = JobContext(job_id, out_dir=args.out, job_dir=job_dir)
+
+    if args.subprocess:
+        ok = run_subprocess(job_arg)
     else:
-        print("\n🎉 All steps complete for", job_id, ". Check the /out folder.")
+        ok = run_in_process(ctx, debug_csv=args.debug_csv, use_cache=not args.force)
+
+    if not ok:
+        print("\n⛔ Pipeline stopped due to error above.")
+        sys.exit(1)
+    print(f"\n🎉 All steps complete for {job_id}. Check {ctx.out_dir}.")
 
 
 if __name__ == "__main__":
@@ -50,14 +50,11 @@ fi
 echo
 echo "[4/5] Running pipeline on $JOB (logging to $LOG)"
 set +e
-python3 run_pipeline.py --job "$JOB" 2>&1 | tee "$LOG"
+python3 run_pipeline.py --job "$JOB" --out "$OUTDIR" 2>&1 | tee "$LOG"
 PIPE_STATUS=${PIPESTATUS[0]}
 set -e
 
-# Gather outputs
-for f in out/estimate_xact*.csv out/*--job*_room_data*.csv; do
-  [ -f "$f" ] && mv -f "$f" "$OUTDIR/$(basename "$f")"
-done
+# Outputs land directly in out/<job>/ (no gathering needed)
 
 echo
 echo "[5/5] Outputs in $OUTDIR (if any):"
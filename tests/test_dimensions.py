@@ -0,0 +1,23 @@
+import pytest
+
+from iguide.dimensions import find_inches, parse_inches
+
+
+@pytest.mark.parametrize(
+    "text, inches",
+    [
+        ("9' 6\"", 114.0),
+        ("9 ft 11 1/2 in", 119.5),
+        ("9'", 108.0),
+        ("9-6\"", 114.0),
+        ("9' 13\"", None),
+        ("9' 12\"", None),
+        ("9-13\"", None),
+    ],
+)
+def test_parse_inches_bounds_the_inches_part(text, inches):
+    assert parse_inches(text) == inches
+
+
+def test_find_inches_skips_out_of_range_feet_inches():
+    assert find_inches("12' 4\" x 9' 13\"") == [148.0]
@@ -0,0 +1,51 @@
+import csv
+
+import pytest
+
+from estimate import generate_room_estimates as gre
+from mytools.job_context import JobContext
+
+
+def write_detections(ctx, rows):
+    fields = ["image", "room", "label", "confidence", "x1", "y1", "x2", "y2"]
+    with ctx.detections_csv.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows({k: row.get(k, "") for k in fields} for row in rows)
+
+
+def test_detection_mapping_fires_for_roomed_detection(tmp_path):
+    ctx = JobContext("job-test", out_dir=tmp_path)
+    rooms = gre._normalize_rooms(
+        [
+            {"Room Name": "Kitchen", "Room ID": "1", "perimeter_lf": "40", "door_widths_lf": "3"},
+            {"Room Name": "Bedroom", "Room ID": "2", "perimeter_lf": "44", "door_widths_lf": "3"},
+        ]
+    )
+    write_detections(
+        ctx,
+        [
+            {"image": "photos/KITCHEN/a.jpg", "room": "KITCHEN", "label": "water_stain_ceiling"},
+            {"image": "loose.jpg", "room": "", "label": "baseboard_rot"},
+        ],
+    )
+
+    rows = gre.build_estimates(rooms, gre.load_detections(ctx, rooms))
+
+    mapped = [r for r in rows if r["Line Item Code"] in ("DW-PATCH", "PRIME-PAINT", "BASEBOARD-RR")]
+    assert mapped == [
+        {"Room": "Kitchen", "Line Item Code": "DW-PATCH",
+         "Description": "From detected ceiling water stain", "Quantity/Length": 4},
+        {"Room": "Kitchen", "Line Item Code": "PRIME-PAINT",
+         "Description": "Finish of patched area", "Quantity/Length": 4},
+    ]
+
+
+def test_photo_room_comes_from_the_room_folder():
+    pytest.importorskip("cv2")
+    from detect.process_images import photo_room
+
+    assert photo_room("photos/Kitchen/IMG_1.jpg") == "Kitchen"
+    assert photo_room("Bedroom 2/IMG_1.jpg") == "Bedroom 2"
+    assert photo_room("Images/IMG_1.jpg") == ""
+    assert photo_room("IMG_1.jpg") == ""
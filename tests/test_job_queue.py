@@ -0,0 +1,21 @@
+import contextlib
+
+from mytools import job_queue
+
+
+def test_fail_worker_fails_only_that_workers_runs(tmp_path):
+    db = tmp_path / "jobs.sqlite3"
+    job_queue.init_db(db)
+    with contextlib.closing(job_queue.connect(db)) as conn:
+        for job, worker in (("a", "host:1"), ("b", "host:2")):
+            conn.execute(
+                "INSERT INTO jobs (job, status, worker, created) VALUES (?, 'running', ?, 0)",
+                (job, worker),
+            )
+
+        assert job_queue.fail_worker(conn, "host:1", "worker exited with code -9") == 1
+
+        rows = {r["job"]: r for r in conn.execute("SELECT * FROM jobs")}
+    assert rows["a"]["status"] == "failed"
+    assert rows["a"]["error"] == "worker exited with code -9"
+    assert rows["b"]["status"] == "running"
@@ -0,0 +1,16 @@
+from mytools.metrics import JobMetrics, to_prometheus
+
+
+def test_prometheus_folds_repeated_records_into_one_series():
+    metrics = JobMetrics("job-test", scope="process_images")
+    for n in (16, 16, 4):
+        with metrics.measure("model.predict", rows_in=n):
+            pass
+    data = {"job": "job-test", "scopes": {"process_images": {"records": metrics.records}}}
+
+    samples = [line for line in to_prometheus(data).splitlines() if not line.startswith("#")]
+
+    series = [line.rsplit(" ", 1)[0] for line in samples]
+    assert len(series) == len(set(series))
+    assert 'claim_ai_rows_in{job="job-test",scope="process_images",kind="call",name="model.predict"} 36' in samples
+    assert 'claim_ai_calls{job="job-test",scope="process_images",kind="call",name="model.predict"} 3' in samples
@@ -0,0 +1,26 @@
+import pytest
+
+from rules import rulebook
+
+
+@pytest.fixture
+def book(tmp_path):
+    return rulebook.load(cache_root=tmp_path)
+
+
+def test_pow_is_rejected():
+    with pytest.raises(rulebook.RuleError, match="Pow"):
+        rulebook.check_expression("10 ** 10 ** 10", "formulas.x")
+
+
+def test_rooms_sharing_a_name_keep_their_own_quantities(book):
+    rooms = [
+        {"name": "Closet", "room_id": "A", "perimeter_lf": 10, "door_widths_lf": 2},
+        {"name": "Closet", "room_id": "B", "perimeter_lf": 30, "door_widths_lf": 2},
+    ]
+    detections = [{"name": "Closet", "room_id": "B", "label": "baseboard_rot"}]
+    rows = book.estimate(rooms, detections)
+    baseboard = [r for r in rows if r["Item Code"] == "DRYBD"]
+    assert [r["Qty"] for r in baseboard] == [8, 28]
+    assert rows[-1]["Item Code"] == "BASEBOARD-RR"
+    assert rows[-1]["Qty"] == 28
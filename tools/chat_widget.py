@@ -29,6 +29,16 @@ except Exception:
     DDGS = None
     SEARCH_OK = False
 
+# --- Policy page index (built by policy/parse_policy.py) ---
+POLICY_OK = False
+try:
+    from policy import policy_index
+
+    POLICY_OK = True
+except Exception:
+    policy_index = None
+    POLICY_OK = False
+
 chatbp = Blueprint("chatbp", __name__)
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 TIME_BUDGET_MS = 2500
@@ -67,6 +77,26 @@ def render_search_context(results: List[Dict[str, Any]]) -> str:
     return out[:2000]
 
 
+def policy_search(query: str, job: str, max_results: int = MAX_RESULTS) -> List[Dict[str, Any]]:
+    """Pages of the job's policy matching any word of the question."""
+    if not POLICY_OK:
+        return []
+    conn = policy_index.connect()
+    try:
+        return policy_index.search(conn, query, job, max_results, match="any")
+    finally:
+        conn.close()
+
+
+def render_policy_context(results: List[Dict[str, Any]]) -> str:
+    if not results:
+        return "No matching policy pages."
+    lines = ["Policy pages:"]
+    for r in results:
+        lines.append(f"[page {r['page']}] {r['snippet']}")
+    return "\n\n".join(lines)[:2000]
+
+
 def call_llm(prompt: str) -> str:
     if OPENAI_OK and _client:
         resp = _client.responses.create(model=DEFAULT_MODEL, input=prompt)
@@ -84,19 +114,27 @@ def chat_api():
     data = request.get_json(silent=True) or {}
     msg = (data.get("message") or "").strip()
     use_web = bool(data.get("web"))
+    job = (data.get("job") or "").strip()
     if not msg:
         return jsonify({"error": "message required"}), 400
     search_results = web_search(msg) if use_web else []
+    policy_pages = policy_search(msg, job) if job else []
+    context = []
+    if job:
+        context.append(render_policy_context(policy_pages))
+    if use_web:
+        context.append(render_search_context(search_results))
     prefix = (
-        render_search_context(search_results)
-        + "\n\nTask: Using the above when relevant, answer succinctly.\n\n"
-        if use_web
+        "\n\n".join(context) + "\n\nTask: Using the above when relevant, answer succinctly.\n\n"
+        if context
         else ""
     )
     reply = call_llm(prefix + msg)
     out = {"reply": reply, "used_web": use_web}
     if search_results:
         out["sources"] = search_results
+    if policy_pages:
+        out["policy_pages"] = policy_pages
     return jsonify(out)
 
 
@@ -124,6 +162,7 @@ def chat_ui():
     <textarea id="msg" placeholder="Ask about perils, building codes, materials, etc."></textarea>
     <div class="row">
       <label><input type="checkbox" id="web"> Use web search (slower)</label>
+      <input id="job" placeholder="Job ID (searches its policy)" style="padding:8px;border:1px solid #ccc;border-radius:12px">
       <button id="send">Send</button>
     </div>
     <div id="reply" class="out" style="display:none"></div>
@@ -134,17 +173,21 @@ def chat_ui():
 async function send() {
   const msg = document.getElementById('msg').value.trim();
   const web = document.getElementById('web').checked;
+  const job = document.getElementById('job').value.trim();
   if (!msg) return;
   const replyEl = document.getElementById('reply');
   const srcEl = document.getElementById('sources');
   replyEl.style.display='block';
   replyEl.textContent='Thinking...';
   srcEl.innerHTML='';
-  const res = await fetch('/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({message:msg, web})});
+  const res = await fetch('/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({message:msg, web, job})});
   const data = await res.json();
   replyEl.textContent = data.reply || data.error || 'No reply';
+  if (data.policy_pages) {
+    srcEl.innerHTML += '<b>Policy pages:</b> ' + data.policy_pages.map(p => '<div>• p.'+p.page+': '+p.snippet.replace(/</g,'&lt;')+'</div>').join('');
+  }
   if (data.sources) {
-    srcEl.innerHTML = '<b>Sources:</b> ' + data.sources.map(s => '<div>• <a href="'+(s.url||'#')+'" target="_blank">'+(s.title||s.url||'source')+'</a></div>').join('');
+    srcEl.innerHTML += '<b>Sources:</b> ' + data.sources.map(s => '<div>• <a href="'+(s.url||'#')+'" target="_blank">'+(s.title||s.url||'source')+'</a></div>').join('');
   }
 }
 document.getElementById('send').addEventListener('click', send);
@@ -100,6 +100,13 @@ try:
 except Exception:
     pass
 
+try:
+    from tools.jobs_blueprint import jobsbp
+
+    app.register_blueprint(jobsbp)
+except Exception:
+    pass
+
 try:
     from tools.scraper_blueprint import scraperbp
 
@@ -107,6 +114,13 @@ try:
 except Exception:
     pass
 
+try:
+    from tools.policy_blueprint import policybp
+
+    app.register_blueprint(policybp)
+except Exception:
+    pass
+
 ALLOWED = {
     "policy": {".pdf"},
     "photos": {
@@ -196,6 +210,49 @@ INDEX = """
     })();
   </script><!-- auto-open -->
 {% endif %}
+{% if flask_request.args.get('queued') %}
+<div class="card" id="run-progress">
+  <h3>Pipeline run #{{ flask_request.args.get('queued')|int }}</h3>
+  <p id="run-status"><small>Waiting for a worker…</small></p>
+  <ul id="run-stages" class="list"></ul>
+  <pre id="run-log" style="max-height:240px;overflow:auto;background:#f4f4f4;padding:8px;border-radius:8px;font-size:12px"></pre>
+</div>
+<script>
+  // live progress from /jobs/<id>/events; keeps Run disabled until it finishes
+  (function(){
+    const id = {{ flask_request.args.get('queued')|int }};
+    const statusEl = document.getElementById("run-status");
+    const stagesEl = document.getElementById("run-stages");
+    const logEl = document.getElementById("run-log");
+    const stages = {};
+    const setRunEnabled = (on) => document.querySelectorAll("#run-form button").forEach(b => b.disabled = !on);
+    setRunEnabled(false);
+    const src = new EventSource("/jobs/" + id + "/events");
+    src.addEventListener("status", (e) => {
+      const d = JSON.parse(e.data);
+      statusEl.textContent = "Status: " + d.status + (d.seconds ? " (" + d.seconds + "s)" : "") + (d.error ? " — " + d.error : "");
+      if (d.status === "done" || d.status === "failed") setRunEnabled(true);
+    });
+    src.addEventListener("stage_start", (e) => {
+      const d = JSON.parse(e.data);
+      const li = document.createElement("li");
+      li.textContent = "⏳ [" + d.index + "/" + d.total + "] " + d.stage;
+      stagesEl.appendChild(li);
+      stages[d.stage] = li;
+    });
+    src.addEventListener("stage_done", (e) => {
+      const d = JSON.parse(e.data);
+      const li = stages[d.stage];
+      if (li) li.textContent = (d.ok ? "✅ " : "❌ ") + d.stage + " — " + (d.cached ? "cached" : d.seconds + "s") + (d.rows !== undefined ? ", " + d.rows + " rows" : "");
+    });
+    src.addEventListener("log", (e) => {
+      logEl.textContent += JSON.parse(e.data).line + "\n";
+      logEl.scrollTop = logEl.scrollHeight;
+    });
+    src.addEventListener("end", () => { src.close(); setRunEnabled(true); });
+  })();
+</script>
+{% endif %}
 
 <div class="card">
   <h3>1) Upload claim files</h3>
@@ -268,7 +325,7 @@ INDEX = """
   </div>
   <div>
     <h3>3) Run pipeline</h3>
-    <form action="{{ url_for('run_pipeline') }}" method="post">
+    <form id="run-form" action="{{ url_for('run_pipeline') }}" method="post">
       <label>Job ID
         <input type="text" name="job" value="job-0001" required>
   <label>Cause of Loss</label>
@@ -284,7 +341,7 @@ INDEX = """
       </label>
       <button type="submit">Run</button>
     </form>
-    <p><small>Reads from <code>uploads/&lt;job&gt;/</code>, writes to <code>out/&lt;job&gt;/</code>.</small></p>
+    <p><small>Reads from <code>uploads/&lt;job&gt;/</code>, writes to <code>out/&lt;job&gt;/</code>. Runs are queued; see <a href="/jobs">/jobs</a>.</small></p>
   </div>
 </div>
 
@@ -315,10 +372,6 @@ def home():
 @app.route("/run", methods=["POST"])
 def run_pipeline():
     cause = (flask_request.form.get("cause") or "other").strip()
-    import shutil
-    import subprocess
-    import time
-
     from flask import flash, redirect, request, url_for
 
     job = slug_job(flask_request.form.get("job"))
@@ -338,41 +391,14 @@ def run_pipeline():
     jobdir.mkdir(parents=True, exist_ok=True)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    rp = ROOT / "run_pipeline.py"
-    log = LOGS / f"run_{job}_{int(time.time())}.log"
-
-    # 1) Run pipeline if present (write to jobdir/outdir)
-    if rp.exists():
-        with open(log, "wb") as L:
-            subprocess.run(
-                ["python3", str(rp), "--job", str(jobdir), "--out", str(outdir)],
-                cwd=str(ROOT),
-                stdout=L,
-                stderr=subprocess.STDOUT,
-            )
-
-    # 2) Sweep any top-level out/*.csv into out/<job>/ (handles misrouted outputs)
-    for f in ROOT.joinpath("out").glob("*.csv"):
-        try:
-            shutil.move(str(f), str(outdir / f.name))
-        except Exception:
-            pass
-
-    # 3) If no CSV present, write a small stub so UI can open something
-    if not any(outdir.glob("*.csv")):
-        (outdir / "estimate_xact_with_notes.csv").write_text(
-            "room,item,qty,notes\nLiving Room,DRY1/2,10,stub run\n", encoding="utf-8"
-        )
+    # Queue the run; a background worker writes into outdir while we return
+    from tools.jobs_blueprint import submit
 
-    # 4) Pick best and redirect with auto-open
-    best = _best_estimate(outdir)
-    if best:
-        flash(f"✅ Final estimate ready: {best}")
-        open_href = url_for("download", job=job, fname=best)
-        return redirect(url_for("home", open=open_href))
-    else:
-        flash("Pipeline finished, but no estimate CSV found.")
-        return redirect(url_for("home"))
+    entry = submit(job, job_dir=jobdir, out_dir=outdir)
+    if flask_request.accept_mimetypes.best == "application/json":
+        return jsonify(entry), 202
+    flash(f"⏳ Pipeline queued for {job} (#{entry['id']}). Status: {entry['url']}")
+    return redirect(url_for("home", queued=entry["id"]))
 
 
 @app.route("/out/<job>/<path:fname>")
@@ -431,6 +457,10 @@ def upload():
     for f in files:
         if f and f.filename:
             (job_dir / f.filename).write_bytes(f.read())
+    if any(f and f.filename.lower().endswith(".xml") for f in files):
+        from iguide import plan_cache
+
+        plan_cache.invalidate(job_dir)
 
     flash(f"Uploaded {len(files)} file(s) to job {job}")
     return redirect(url_for("index"))
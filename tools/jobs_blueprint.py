@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from mytools import job_queue
+
+jobsbp = Blueprint("jobsbp", __name__)
+
+SSE_POLL_SECONDS = 0.25
+SSE_HEARTBEAT_SECONDS = 15
+FINAL_STATUSES = ("done", "failed")
+
+
+def submit(job: str, job_dir=None, out_dir=None) -> dict:
+    """Queue a pipeline run and make sure workers are up to take it."""
+    queue_id = job_queue.enqueue(job, job_dir=job_dir, out_dir=out_dir)
+    job_queue.ensure_workers()
+    return {
+        "id": queue_id,
+        "job": job,
+        "status": "queued",
+        "url": f"/jobs/{queue_id}",
+        "events_url": f"/jobs/{queue_id}/events",
+    }
+
+
+def _status(entry: dict) -> dict:
+    out_dir = Path(entry["out_dir"] or ROOT / "out" / entry["job"])
+    if entry["status"] == "queued":
+        entry["ahead"] = job_queue.position(entry["id"])
+    if entry["status"] in FINAL_STATUSES and out_dir.is_dir():
+        entry["outputs"] = sorted(f.name for f in out_dir.glob("*") if f.is_file())
+    return entry
+
+
+@jobsbp.route("/jobs/<int:queue_id>")
+def job_status(queue_id: int):
+    entry = job_queue.get(queue_id)
+    if entry is None:
+        return jsonify({"error": f"no such job {queue_id}"}), 404
+    return jsonify(_status(entry))
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+@jobsbp.route("/jobs/<int:queue_id>/events")
+def job_events(queue_id: int):
+    """
+    Server-sent events for one run: status changes, stage_start/stage_done
+    (with durations) and log lines, as the worker records them. The stream
+    ends after the run finishes; reconnecting clients resume via Last-Event-ID.
+    """
+    entry = job_queue.get(queue_id)
+    if entry is None:
+        return jsonify({"error": f"no such job {queue_id}"}), 404
+    try:
+        after = int(
+            request.headers.get("Last-Event-ID") or request.args.get("after") or 0
+        )
+    except ValueError:
+        after = 0
+
+    def stream():
+        nonlocal after
+        snapshot = {"id": after, "type": "status", "status": entry["status"]}
+        yield _sse(snapshot)
+        last_sent = time.time()
+        while True:
+            events = job_queue.events_since(queue_id, after)
+            for event in events:
+                after = event["id"]
+                yield _sse(event)
+                last_sent = time.time()
+            if not events:
+                status = job_queue.get(queue_id)["status"]
+                done = status in FINAL_STATUSES
+                if done and not job_queue.events_since(queue_id, after):
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                if time.time() - last_sent > SSE_HEARTBEAT_SECONDS:
+                    yield ": keep-alive\n\n"
+                    last_sent = time.time()
+                time.sleep(SSE_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@jobsbp.route("/jobs")
+def job_list():
+    return jsonify(job_queue.recent())
@@ -22,6 +22,8 @@ from pathlib import Path
 from flask import (Flask, jsonify, redirect, render_template_string, request,
                    send_from_directory, url_for)
 
+from detect import model_server
+from detect.photo_classifier import PredictionService
 from tools.chat_widget import chatbp
 
 app = Flask(__name__)
@@ -32,6 +34,7 @@ INBOX = REPO_ROOT / "data" / "label_inbox"
 DONE = REPO_ROOT / "data" / "label_done"
 SKIP = REPO_ROOT / "data" / "label_skip"
 CSV_PATH = REPO_ROOT / "data" / "labels.csv"
+DETECT_WAIT_SECONDS = 5
 
 # Edit this list to fit your damage types
 LABELS = CLAIM_CAUSES
@@ -60,13 +63,10 @@ def list_images(folder: Path):
     )
 
 
-def dumb_predict(img_path: Path):
-    # Placeholder "AI": guesses based on filename; swap with a real model later.
-    lowname = img_path.name.lower()
-    for k in LABELS:
-        if k != "unknown" and k in lowname:
-            return k, 0.80
-    return "unknown", 0.35
+# Inbox predictions are computed in the background, starting with the first
+# page that asks for one (and again after every upload or label); page
+# handlers only look them up. Importing this module starts no threads.
+predictions = PredictionService(INBOX, CSV_PATH)
 
 
 TEMPLATE = """
@@ -107,6 +107,18 @@ small{color:#666}
     </div>
     <div>
       <p><b>Prediction:</b> {{ pred_label }} ({{ '%.2f' % pred_conf }})</p>
+      <p><small id="detections">Detecting objects…</small></p>
+      <script>
+        fetch("{{ url_for('detections', filename=img_name) }}")
+          .then(r => r.json())
+          .then(d => {
+            const el = document.getElementById("detections");
+            if (d.error) { el.textContent = "Detection unavailable: " + d.error; return; }
+            el.textContent = d.boxes.length
+              ? "Detected: " + d.boxes.map(b => b.label + " " + b.confidence.toFixed(2)).join(", ")
+              : "No objects detected";
+          });
+      </script>
       <form action="{{ url_for('label') }}" method="post">
         <input type="hidden" name="img" value="{{ img_name }}">
         <label>Peril (photo-level):
@@ -141,7 +153,7 @@ def next_image():
     if imgs:
         img_rel = imgs[0].relative_to(INBOX)
         img_name = imgs[0].name
-        pred_label, pred_conf = dumb_predict(imgs[0])
+        pred_label, pred_conf = predictions.get(imgs[0])
     return render_template_string(
         TEMPLATE,
         img_rel=str(img_rel) if img_rel else None,
@@ -149,7 +161,7 @@ def next_image():
         pred_label=pred_label,
         pred_conf=pred_conf,
         labels=LABELS,
-        inbox_count=len(list_images(INBOX)),
+        inbox_count=len(imgs),
         done_count=len(list_images(DONE)),
         skip_count=len(list_images(SKIP)),
     )
@@ -168,6 +180,7 @@ def upload():
             dest = INBOX / f"{base}_{i}{ext}"
             i += 1
         f.save(dest)
+    predictions.refresh_async()
     return redirect(url_for("next_image"))
 
 
@@ -176,6 +189,24 @@ def serve_inbox(filename):
     return send_from_directory(INBOX, filename)
 
 
+@app.route("/detections/<path:filename>")
+def detections(filename):
+    """YOLO boxes for an inbox photo from the shared detection service."""
+    img_path = INBOX / Path(filename).name
+    if not img_path.exists():
+        return jsonify({"error": "no such image"}), 404
+    # Don't hold the page for a full model load; the client can retry
+    if not model_server.ensure_server(timeout=DETECT_WAIT_SECONDS):
+        return jsonify({"error": "detection service is not running"}), 503
+    try:
+        result = model_server.predict([img_path])[0]
+    except (OSError, RuntimeError) as e:
+        return jsonify({"error": str(e)}), 502
+    if result["error"]:
+        return jsonify({"error": result["error"]}), 422
+    return jsonify({"image": img_path.name, "boxes": result["boxes"]})
+
+
 @app.route("/label", methods=["POST"])
 def label():
     img_name = request.form.get("img")
@@ -186,7 +217,7 @@ def label():
         return redirect(url_for("next_image"))
     action = request.form.get("action", "save")
 
-    pred_label, pred_conf = dumb_predict(img_path)
+    pred_label, pred_conf = predictions.get(img_path)
     confirmed = request.form.get("label", "unknown").strip()
     notes = request.form.get("notes", "").strip()
 
@@ -211,6 +242,8 @@ def label():
         target = target_dir / f"{stem}_{i}{ext}"
         i += 1
     img_path.rename(target)
+    # labels.csv changed: retrain and re-predict the rest of the inbox
+    predictions.refresh_async()
     return redirect(url_for("next_image"))
 
 
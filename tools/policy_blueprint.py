@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from flask import Blueprint, jsonify, request
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from policy import policy_cache, policy_index
+
+policybp = Blueprint("policybp", __name__)
+
+
+@policybp.route("/policy/search")
+def policy_search():
+    """
+    Pages of parsed policies matching ?q= (words and "quoted phrases", all
+    must appear), optionally only ?job=<job_id>'s policy. ?any=1 matches
+    any of the words instead, for free-text questions.
+    """
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q required"}), 400
+    job = (request.args.get("job") or "").strip() or None
+    try:
+        limit = max(1, min(int(request.args.get("limit", policy_index.LIMIT)), 100))
+    except ValueError:
+        limit = policy_index.LIMIT
+    match = "any" if request.args.get("any") else "all"
+    conn = policy_index.connect()
+    try:
+        results = policy_index.search(conn, q, job, limit, match)
+    finally:
+        conn.close()
+    return jsonify({"query": q, "job": job, "results": results})
+
+
+@policybp.route("/policy/cache/stats")
+def cache_stats():
+    """Document/page hit rates and size of the shared policy cache."""
+    conn = policy_cache.connect()
+    try:
+        return jsonify(policy_cache.stats(conn))
+    finally:
+        conn.close()